@@ -13,6 +13,12 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
+# מודולי ה-backend (מיובא מתוך השרת או ה-benchmarks, שבהם תיקיית backend כבר בנתיב)
+from core.locations import find_location, resolve_location
+from core.metrics import timed
+from core.tracing import annotate
+from core.startup import LazyService
+
 class CarRentalRAG:
     """RAG System למערכת השכרת רכבים עם Ollama ומאגר רכבים"""
     
@@ -26,6 +32,7 @@ class CarRentalRAG:
         self.db_available = True
         print("RAG Service: גישה לבסיס נתונים זמינה")
     
+    @timed("ollama", "tags")
     def check_ollama_status(self) -> bool:
         """בדיקה שOllama רץ ויש מודל זמין"""
         try:
@@ -159,14 +166,10 @@ class CarRentalRAG:
                 criteria['max_price'] = int(match.group(1))
                 break
         
-        # חיפוש מיקום
-        locations = ['תל אביב', 'tel aviv', 'ירושלים', 'jerusalem', 'חיפה', 'haifa', 
-                    'בן גוריון', 'ben gurion', 'אילת', 'eilat', 'באר שבע', 'beer sheva']
-        
-        for location in locations:
-            if location in question_lower:
-                criteria['location'] = location
-                break
+        # חיפוש מיקום - מזהה קנוני מהמילון (כל הכינויים בעברית ובאנגלית)
+        location_id = find_location(question)
+        if location_id:
+            criteria['location'] = location_id
         
         # חיפוש מספר נוסעים
         passengers_patterns = [
@@ -205,11 +208,11 @@ class CarRentalRAG:
             filtered_cars = [car for car in filtered_cars 
                            if car.get('daily_rate', 0) <= max_price]
         
-        # סינון לפי מיקום
+        # סינון לפי מיקום - השוואת מזהי מיקום קנוניים
         if 'location' in criteria:
-            location_search = criteria['location'].lower()
+            location_id = criteria['location']
             filtered_cars = [car for car in filtered_cars 
-                           if location_search in car.get('location', '').lower()]
+                           if (car.get('location_id') or resolve_location(car.get('location'))) == location_id]
         
         # סינון לפי מספר נוסעים
         if 'min_seats' in criteria:
@@ -264,6 +267,7 @@ class CarRentalRAG:
         
         return result
     
+    @timed("ollama", "generate")
     def generate_ai_response(self, question: str, context: str = "") -> str:
         """יצירת תשובה עם Ollama"""
         if not self.is_initialized:
@@ -291,6 +295,7 @@ class CarRentalRAG:
 """
 
             # שליחה ל-Ollama
+            annotate(llm_model=self.model_name, prompt_chars=len(prompt), question_chars=len(question))
             response = requests.post(
                 f"{self.ollama_url}/api/generate",
                 json={
@@ -309,6 +314,10 @@ class CarRentalRAG:
             if response.status_code == 200:
                 result = response.json()
                 ai_response = result.get("response", "").strip()
+                # מוני טוקנים וזמנים (ננו-שניות) כפי ש-Ollama מחזיר אותם
+                annotate(response_chars=len(ai_response), prompt_tokens=result.get("prompt_eval_count"),
+                         completion_tokens=result.get("eval_count"), ollama_total_ns=result.get("total_duration"),
+                         ollama_load_ns=result.get("load_duration"))
                 
                 if ai_response:
                     return ai_response
@@ -363,8 +372,8 @@ class CarRentalRAG:
         # אם לא מצאנו רכבים או שזו לא שאלת רכבים - תשובה רגילה
         return self.generate_ai_response(question)
 
-# יצירת instance גלובלי
-rag_service = CarRentalRAG()
+# instance גלובלי - בדיקת Ollama רצה בבנייה, ולכן בהפעלת השרת (ברקע) או בשימוש הראשון ולא ביבוא
+rag_service = LazyService("rag_service", CarRentalRAG)
 
 # פונקציות לשירות
 async def get_ai_response(message: str) -> str:
@@ -2,17 +2,24 @@
 Admin Endpoints - מערכת ניהול לרכבים ולקוחות
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date
 import json
 
+from core.auth_service import require_admin
+from models.user_models import User
+
 try:
     from database.postgres_connection import db
-    DATABASE_AVAILABLE = True
 except ImportError:
-    DATABASE_AVAILABLE = False
+    db = None
+
+def database_available() -> bool:
+    """PostgreSQL מחובר - db נבנה בהצלחה בבחירת בסיס הנתונים בהפעלה (main.get_database_service).
+    במצב Event Store הוא לא נבנה, והבקשות מקבלות 503 בלי ניסיון חיבור"""
+    return db is not None and db.is_ready()
 
 router = APIRouter(prefix="/api/admin", tags=["Admin Management"])
 
@@ -57,7 +64,7 @@ class CustomerCreate(BaseModel):
 @router.post("/cars")
 async def create_car(car: CarCreate):
     """הוספת רכב חדש"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -73,7 +80,7 @@ async def create_car(car: CarCreate):
 @router.put("/cars/{car_id}")
 async def update_car(car_id: int, car_update: CarUpdate):
     """עדכון רכב קיים"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -96,7 +103,7 @@ async def update_car(car_id: int, car_update: CarUpdate):
 @router.delete("/cars/{car_id}")
 async def delete_car(car_id: int):
     """מחיקת רכב"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -118,7 +125,7 @@ async def delete_car(car_id: int):
 @router.post("/customers")
 async def create_customer(customer: CustomerCreate):
     """הוספת לקוח חדש"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -134,7 +141,7 @@ async def create_customer(customer: CustomerCreate):
 @router.get("/customers")
 async def get_all_customers():
     """קבלת כל הלקוחות"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -147,7 +154,7 @@ async def get_all_customers():
 @router.post("/init-sample-data")
 async def initialize_sample_data():
     """אתחול נתוני דוגמה"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -191,7 +198,7 @@ async def initialize_sample_data():
 @router.get("/stats")
 async def get_admin_stats():
     """סטטיסטיקות מערכת"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -210,10 +217,31 @@ async def get_admin_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בקבלת סטטיסטיקות: {str(e)}")
 
+@router.get("/slow-queries")
+async def get_slow_queries(sort: str = "total_ms", limit: int = 50, admin_user: User = Depends(require_admin)):
+    """שאילתות PostgreSQL לפי fingerprint (זמן כולל / ממוצע / מקסימלי, קריאות איטיות ותוכנית EXPLAIN),
+    והשאילתות האיטיות האחרונות עם סוגי הפרמטרים (בלי הערכים) ומי קרא להן - למנהלים בלבד"""
+    if not database_available():
+        raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
+    
+    try:
+        return db.slow_queries.report(sort=sort, limit=max(1, min(limit, 500)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/slow-queries")
+async def reset_slow_queries(admin_user: User = Depends(require_admin)):
+    """איפוס הסטטיסטיקות של יומן השאילתות האיטיות - למנהלים בלבד"""
+    if not database_available():
+        raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
+    
+    db.slow_queries.reset()
+    return {"message": "יומן השאילתות האיטיות אופס"}
+
 @router.delete("/clear-all-data")
 async def clear_all_data():
     """ניקוי כל הנתונים (זהירות!)"""
-    if not DATABASE_AVAILABLE:
+    if not database_available():
         raise HTTPException(status_code=503, detail="בסיס הנתונים לא זמין")
     
     try:
@@ -8,6 +8,8 @@ import sys
 import os
 import requests
 
+from core.metrics import track
+
 # הוסף נתיב לai-service
 current_dir = os.path.dirname(os.path.abspath(__file__))
 ai_service_path = os.path.join(current_dir, "..", "..", "ai-service")
@@ -15,7 +17,7 @@ sys.path.insert(0, ai_service_path)
 
 # ייבוא rag_service עם טיפול בשגיאות
 try:
-    from rag_service import get_ai_response_sync, get_car_recommendation, get_ollama_status
+    from rag_service import get_ai_response_sync, get_car_recommendation, get_ollama_status, rag_service
     AI_AVAILABLE = True
     print("✅ RAG Service נטען בהצלחה")
 except ImportError as e:
@@ -34,6 +36,11 @@ except ImportError as e:
 
 router = APIRouter(prefix="/api/ai", tags=["AI Advisor"])
 
+def warm_up_ai():
+    """בניית ה-RAG (כולל בדיקת Ollama) - רץ ברקע בהפעלת השרת, כדי שהשאלה הראשונה לא תחכה לה"""
+    if AI_AVAILABLE:
+        rag_service.get_instance()
+
 # מודלי נתונים
 class ChatMessage(BaseModel):
     message: str
@@ -54,12 +61,17 @@ class AIResponse(BaseModel):
 @router.get("/health")
 async def ai_health():
     """בדיקת זמינות יועץ AI"""
+    return check_ai_health()
+
+def check_ai_health() -> Dict:
+    """בדיקת Ollama, ChromaDB וה-RAG (חוסמת - משמשת גם את ערוץ העדכונים בזמן אמת)"""
     if not AI_AVAILABLE:
         return {"status": "unavailable", "message": "RAG service לא זמין"}
     
     # בדיקת Ollama
     try:
-        ollama_response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        with track("ollama", "tags"):
+            ollama_response = requests.get("http://localhost:11434/api/tags", timeout=5)
         ollama_ok = ollama_response.status_code == 200
         
         if ollama_ok:
@@ -13,6 +13,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.event_store import event_service, EventType, Event
+from core.pricing import booking_price
+from core.booking_calendar import BookingConflictError
 
 router = APIRouter(prefix="/api/commands", tags=["Commands"])
 
@@ -90,18 +92,8 @@ async def update_car(car_id: str, command: UpdateCarCommand):
         # יצירת נתוני עדכון
         update_data = command.dict(exclude_unset=True)
         if update_data:
-            update_data["updated_at"] = datetime.now().isoformat()
-            
-            # יצירת אירוע עדכון
-            from database.event_store import Event
-            event = Event(
-                event_type=EventType.CAR_UPDATED,
-                aggregate_id=car_id,
-                data=update_data,
-                user_id="admin"
-            )
-            
-            if event_service.event_store.append_event(event):
+            # יצירת אירוע עדכון (כולל מזהה מיקום קנוני אם המיקום השתנה)
+            if event_service.update_car(car_id, update_data, user_id="admin"):
                 return {
                     "success": True,
                     "message": "רכב עודכן בהצלחה",
@@ -169,31 +161,30 @@ async def create_booking(command: BookingCommand):
         if days <= 0:
             raise HTTPException(status_code=400, detail="תאריכים לא תקינים")
         
-        total_price = car["daily_rate"] * days
+        # אותם כללי מחיר כמו בהצעת המחיר (מחיר דינמי, סוף שבוע, השכרה ארוכה)
+        daily_rates = event_service.pricing.daily_rates([car], start_date, end_date)
+        price_breakdown = booking_price(
+            car["daily_rate"], start_date, end_date, daily_rates[0] if daily_rates is not None else None
+        )
+        total_price = price_breakdown["total"]
         
         # יצירת נתוני הזמנה
         booking_data = command.dict()
         booking_data.update({
             "days": days,
-            "daily_rate": car["daily_rate"],
+            "daily_rate": price_breakdown["daily_rate"],
             "total_price": total_price,
             "status": "confirmed",
             "created_at": datetime.now().isoformat()
         })
         
-        # יצירת אירוע הזמנה
-        from database.event_store import Event
-        import uuid
-        booking_id = str(uuid.uuid4())
-        
-        event = Event(
-            event_type=EventType.BOOKING_CREATED,
-            aggregate_id=booking_id,
-            data=booking_data,
-            user_id=command.customer_email
-        )
+        # יצירת אירוע הזמנה - בדיקת החפיפה והכתיבה תחת נעילת הרכב
+        try:
+            booking_id = event_service.create_booking(booking_data, user_id=command.customer_email)
+        except BookingConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         
-        if event_service.event_store.append_event(event):
+        if booking_id:
             return {
                 "success": True,
                 "booking_id": booking_id,
@@ -202,7 +193,9 @@ async def create_booking(command: BookingCommand):
                 "customer": command.customer_name,
                 "dates": f"{command.start_date} - {command.end_date}",
                 "days": days,
-                "daily_rate": car["daily_rate"],
+                # ממוצע המחירים היומיים שחויבו (המחיר הדינמי של כל יום נמצא ב-price_breakdown)
+                "daily_rate": price_breakdown["daily_rate"],
+                "price_breakdown": price_breakdown,
                 "total_price": total_price,
                 "message": "ההזמנה אושרה בהצלחה!"
             }
@@ -2,9 +2,9 @@
 CQRS Queries - שאילתות לקבלת נתונים מהמערכת
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
 import sys
 import os
 
@@ -12,6 +12,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.event_store import event_service
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_BATCH_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from core.booking_calendar import InvalidDateRangeError, validate_range
+from core.http_cache import conditional_get
+from core.serialization import BulkCarSerializer, InvalidFieldsError
+from core.car_query import CarQuery, CarQueryEngine
 
 router = APIRouter(prefix="/api/queries", tags=["Queries"])
 
@@ -20,48 +25,104 @@ router = APIRouter(prefix="/api/queries", tags=["Queries"])
 # ====================
 
 class CarSearchQuery(BaseModel):
+    q: Optional[str] = None  # חיפוש חופשי: יצרן, דגם, מיקום, ספק, תכונות
     location: Optional[str] = None
     car_type: Optional[str] = None  
     max_price: Optional[float] = None
     transmission: Optional[str] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+class CarBatchQuery(BaseModel):
+    """שליפה מרוכזת של רכבים לפי מזהים"""
+    ids: List[Union[int, str]] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
 
 class Car(BaseModel):
-    id: str
+    id: Union[int, str]
     make: str
     model: str
     year: int
     car_type: str
     transmission: str
     daily_rate: float
+    effective_rate: Optional[float] = None  # מחיר דינמי ליום תחילת השאילתה (core.dynamic_pricing)
     available: bool
     location: str
+    location_id: Optional[str] = None  # מזהה מיקום קנוני (core.locations)
     fuel_type: str
     seats: int
     image_url: Optional[str] = None
 
+class CarPage(BaseModel):
+    """עמוד רכבים עם cursor לעמוד הבא"""
+    cars: List[Car]
+    next_cursor: Optional[str] = None
+    count: int
+    # פאסט -> ערך -> מספר רכבים (רק כשמבקשים facets=true, בעמוד הראשון)
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+
+# נתוני ה-Event Store הם projection מהימן - נכתבים ישירות ב-orjson בלי ולידציה חוזרת
+car_serializer = BulkCarSerializer(Car)
+
+def get_query_engine() -> CarQueryEngine:
+    """כל השאילתות על רכבים עוברות דרך מנוע השאילתות - הפילטרים נדחפים לאינדקסים של ה-Event Store"""
+    return CarQueryEngine(event_service.get_instance())
+
 # ====================
 # Query Handlers
 # ====================
 
-@router.get("/cars", response_model=List[Car])
-async def get_all_cars():
-    """קבלת כל הרכבים במערכת"""
+@router.get("/cars", response_model=CarPage)
+async def get_all_cars(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """קבלת הרכבים במערכת - בעמודים"""
     try:
-        cars_data = event_service.get_all_cars()
-        cars = []
-        for car_data in cars_data:
-            car = Car(**car_data)
-            cars.append(car)
-        return cars
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        selected = car_serializer.parse_fields(fields)
+        # כל הרכבים, כולל רכבים לא זמינים
+        cars_data, next_cursor = get_query_engine().page(
+            CarQuery(available_only=False, limit=limit, fields=selected), cursor
+        )
+        return car_serializer.page_response(
+            cars_data, next_cursor, trusted=True, headers=response.headers, fields=selected
+        )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בקבלת רכבים: {str(e)}")
 
+@router.post("/cars/batch")
+async def get_cars_batch(
+    query: CarBatchQuery,
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """שליפת כמה רכבים לפי מזהים - בניית כל הרכבים משאילתת אירועים אחת"""
+    try:
+        selected = car_serializer.parse_fields(fields)
+        requested_ids = list(dict.fromkeys(str(car_id) for car_id in query.ids))
+        cars_by_id = event_service.get_cars_by_ids(requested_ids, fields=selected)
+        return car_serializer.batch_response(cars_by_id, requested_ids, trusted=True, fields=selected)
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
+
 @router.get("/cars/{car_id}", response_model=Car)
-async def get_car_by_id(car_id: str):
+async def get_car_by_id(car_id: str, request: Request, response: Response):
     """קבלת פרטי רכב לפי ID"""
     try:
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
         car_data = event_service.get_car_by_id(car_id)
         if not car_data:
             raise HTTPException(status_code=404, detail="רכב לא נמצא")
@@ -71,151 +132,127 @@ async def get_car_by_id(car_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
-@router.post("/cars/search", response_model=List[Car])
-async def search_cars(query: CarSearchQuery):
-    """חיפוש רכבים לפי קריטריונים"""
+@router.post("/cars/search", response_model=CarPage)
+async def search_cars(
+    query: CarSearchQuery,
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)"),
+    facets: bool = Query(False, description="החזרת ספירות פאסטים (סוג, ספק, הילוכים, מיקום, מחיר)")
+):
+    """חיפוש רכבים לפי קריטריונים - בעמודים, עם ספירות פאסטים אופציונליות"""
     try:
-        all_cars = event_service.get_all_cars()
-        results = []
+        window = validate_range(query.start_date, query.end_date)
+        selected = car_serializer.parse_fields(fields)
         
-        for car_data in all_cars:
-            car = Car(**car_data)
-            
-            # סינון לפי זמינות
-            if not car.available:
-                continue
-            
-            # סינון לפי מיקום
-            if query.location and query.location.lower() not in car.location.lower():
-                continue
-            
-            # סינון לפי סוג רכב
-            if query.car_type and car.car_type != query.car_type:
-                continue
-            
-            # סינון לפי מחיר מקסימלי
-            if query.max_price and car.daily_rate > query.max_price:
-                continue
-            
-            # סינון לפי תיבת הילוכים
-            if query.transmission and car.transmission != query.transmission:
-                continue
-            
-            results.append(car)
+        car_query = CarQuery(
+            q=query.q, location=query.location, car_type=query.car_type, transmission=query.transmission,
+            max_price=query.max_price, start_date=window[0] if window else None,
+            end_date=window[1] if window else None, sort="rate", limit=query.limit, fields=selected
+        )
+        engine = get_query_engine()
+        cars_data, next_cursor = engine.page(car_query, query.cursor)
         
-        # רישום פעולת חיפוש
-        query_dict = query.dict(exclude_unset=True)
-        event_service.log_search(query_dict, len(results))
+        # רישום פעולת חיפוש (פעם אחת - בעמוד הראשון בלבד) - נכנס לתור ונכתב ברקע
+        if not query.cursor:
+            query_dict = query.dict(exclude_unset=True, exclude={"cursor", "limit"})
+            event_service.log_search(query_dict, engine.total(car_query, cars_data, next_cursor))
         
-        return results
+        # ספירות הפאסטים - מחיתוך האינדקסים, בעמוד הראשון בלבד
+        extra = {"facets": engine.facets(car_query)} if facets and not query.cursor else None
         
+        return car_serializer.page_response(cars_data, next_cursor, trusted=True, fields=selected, extra=extra)
+        
+    except (InvalidCursorError, InvalidDateRangeError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בחיפוש: {str(e)}")
 
-@router.get("/cars-by-location/{location}")
-async def get_cars_by_location(location: str):
-    """קבלת רכבים לפי מיקום"""
+@router.get("/cars-by-location/{location}", response_model=CarPage)
+async def get_cars_by_location(
+    location: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """קבלת רכבים לפי מיקום - בעמודים"""
     try:
-        all_cars = event_service.get_all_cars()
-        location_cars = [
-            Car(**car_data) for car_data in all_cars 
-            if location.lower() in car_data["location"].lower() and car_data["available"]
-        ]
-        return location_cars
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        selected = car_serializer.parse_fields(fields)
+        cars_data, next_cursor = get_query_engine().page(CarQuery(location=location, limit=limit, fields=selected), cursor)
+        return car_serializer.page_response(
+            cars_data, next_cursor, trusted=True, headers=response.headers, fields=selected
+        )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
-@router.get("/available-cars")
-async def get_available_cars():
-    """קבלת כל הרכבים הזמינים"""
+@router.get("/available-cars", response_model=CarPage)
+async def get_available_cars(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """קבלת הרכבים הזמינים - בעמודים"""
     try:
-        all_cars = event_service.get_all_cars()
-        available_cars = [
-            Car(**car_data) for car_data in all_cars 
-            if car_data["available"]
-        ]
-        return available_cars
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        selected = car_serializer.parse_fields(fields)
+        cars_data, next_cursor = get_query_engine().page(CarQuery(limit=limit, fields=selected), cursor)
+        return car_serializer.page_response(
+            cars_data, next_cursor, trusted=True, headers=response.headers, fields=selected
+        )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
 @router.get("/stats/cars-by-type")
-async def get_cars_stats():
+async def get_cars_stats(request: Request, response: Response):
     """סטטיסטיקות רכבים לפי סוג - לגרפים"""
     try:
-        cars = event_service.get_all_cars()
-        from collections import Counter
-        
-        type_counts = Counter([car["car_type"] for car in cars])
-        
-        return {
-            "data": [
-                {"type": car_type, "count": count} 
-                for car_type, count in type_counts.items()
-            ],
-            "total_cars": len(cars)
-        }
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        return event_service.fleet_stats.cars_by_type()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
 @router.get("/stats/search-analytics")
-async def get_search_analytics():
+async def get_search_analytics(request: Request, response: Response):
     """סטטיסטיקות חיפושים - לגרפים"""
     try:
+        not_modified = conditional_get(request, response, event_service.get_data_version("searches"))
+        if not_modified:
+            return not_modified
         return event_service.get_search_statistics()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
 @router.get("/stats/cars-by-location")
-async def get_cars_by_location_stats():
+async def get_cars_by_location_stats(request: Request, response: Response):
     """סטטיסטיקות רכבים לפי מיקום"""
     try:
-        cars = event_service.get_all_cars()
-        from collections import Counter
-        
-        location_counts = Counter([car["location"] for car in cars])
-        
-        return {
-            "data": [
-                {"location": location, "count": count} 
-                for location, count in location_counts.items()
-            ],
-            "total_locations": len(location_counts)
-        }
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        return event_service.fleet_stats.cars_by_location()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
 
 @router.get("/stats/price-ranges")
-async def get_price_ranges():
+async def get_price_ranges(request: Request, response: Response):
     """סטטיסטיקות רכבים לפי טווחי מחיר"""
     try:
-        cars = event_service.get_all_cars()
-        
-        price_ranges = {
-            "0-150": 0,
-            "150-250": 0,
-            "250-350": 0,
-            "350-450": 0,
-            "450+": 0
-        }
-        
-        for car in cars:
-            price = car["daily_rate"]
-            if price < 150:
-                price_ranges["0-150"] += 1
-            elif price < 250:
-                price_ranges["150-250"] += 1
-            elif price < 350:
-                price_ranges["250-350"] += 1
-            elif price < 450:
-                price_ranges["350-450"] += 1
-            else:
-                price_ranges["450+"] += 1
-        
-        return {
-            "data": [
-                {"range": range_name, "count": count}
-                for range_name, count in price_ranges.items()
-            ]
-        }
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        return event_service.fleet_stats.price_ranges()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה: {str(e)}")
\ No newline at end of file
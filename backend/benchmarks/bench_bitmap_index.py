@@ -0,0 +1,97 @@
+"""
+בנצ'מרק אינדקס ה-bitmap מול סריקת רשימה (100,000 רכבים כברירת מחדל)
+משווה סינון שוויון מרובה (סוג + הילוכים + דלק + מיקום + זמינות) ב-list comprehension
+ל-AND של bitmaps - עם פענוח מזהים וספירה בלבד
+
+הרצה מתיקיית backend:
+    python benchmarks/bench_bitmap_index.py [--cars 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from operator import itemgetter
+from typing import Callable, Dict, List
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bitmap_index import BitmapIndex, popcount
+from core.locations import LOCATIONS
+
+CAR_TYPES = ("economy", "compact", "midsize", "fullsize", "luxury", "suv", "family")
+TRANSMISSIONS = ("manual", "automatic")
+FUEL_TYPES = ("בנזין", "דיזל", "היברידי", "חשמלי")
+SUPPLIERS = ("Hertz", "Avis", "Budget", "Enterprise", "Sixt", "Europcar")
+
+# שאילתות לבדיקה: מסלקטיבית מאוד ועד רחבה
+QUERIES = {
+    "type + transmission + fuel + location": {
+        "car_type": "suv", "transmission": "automatic", "fuel_type": "היברידי", "location": "haifa",
+        "available": True,
+    },
+    "type + transmission": {"car_type": "compact", "transmission": "manual", "available": True},
+    "available only": {"available": True},
+}
+
+
+def make_cars(count: int, seed: int = 42) -> List[Dict]:
+    """רכבים סינתטיים עם התפלגות אחידה של ערכי התכונות"""
+    rng = random.Random(seed)
+    locations = list(LOCATIONS)
+    return [{
+        "id": f"car-{i}",
+        "car_type": rng.choice(CAR_TYPES),
+        "transmission": rng.choice(TRANSMISSIONS),
+        "fuel_type": rng.choice(FUEL_TYPES),
+        "location_id": rng.choice(locations),
+        "supplier": rng.choice(SUPPLIERS),
+        "available": rng.random() < 0.9,
+    } for i in range(count)]
+
+
+def list_scan(cars: List[Dict], equals: Dict) -> List[str]:
+    """הסינון הנוכחי - מעבר על כל הרכבים והשוואת התכונות (itemgetter, בלי תקורה של all())"""
+    key = itemgetter(*("location_id" if attribute == "location" else attribute for attribute in equals))
+    target = tuple(equals.values()) if len(equals) > 1 else next(iter(equals.values()))
+    return [car["id"] for car in cars if key(car) == target]
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> float:
+    """זמן הריצה הטוב ביותר מתוך repeat"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<28} {best * 1000:9.2f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק אינדקס bitmap")
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cars = make_cars(args.cars)
+    index = BitmapIndex()
+    start = time.perf_counter()
+    for car in cars:
+        index.upsert_car(car["id"], car)
+    print(f"בניית האינדקס ל-{args.cars:,} רכבים: {(time.perf_counter() - start) * 1000:,.0f} ms")
+
+    for name, equals in QUERIES.items():
+        expected = sorted(list_scan(cars, equals))
+        assert sorted(index.ids(index.match(equals))) == expected, name
+        print(f"\n{name} ({len(expected):,} רכבים):")
+        baseline = measure("list comprehension", lambda: list_scan(cars, equals), args.repeat)
+        ids = measure("bitmap AND + ids", lambda: index.ids(index.match(equals)), args.repeat)
+        count = measure("bitmap AND + popcount", lambda: popcount(index.match(equals)), args.repeat)
+        print(f"  {'speedup (ids / count)':<28} {baseline / ids:8.1f}x / {baseline / count:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
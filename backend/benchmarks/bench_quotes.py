@@ -0,0 +1,81 @@
+"""
+בנצ'מרק הצעות מחיר לכמה רכבים (500 רכבים כברירת מחדל)
+משווה חישוב רכב-רכב בלולאת Python (מכפיל לכל יום, הנחה, מיון) למעבר הווקטורי של core.pricing
+
+הרצה מתיקיית backend:
+    python benchmarks/bench_quotes.py [--cars 500] [--days 10] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.pricing import WEEKEND_DAYS, WEEKEND_SURCHARGE, long_rental_discount, quote_totals, sorted_quotes
+
+
+def make_cars(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    return [{"id": f"car-{i}", "daily_rate": round(rng.uniform(100, 600), 2)} for i in range(count)]
+
+
+def loop_quotes(cars: List[Dict], start: date, end: date) -> List[Dict]:
+    """חישוב רכב אחרי רכב - כמו חישוב המחיר בכל הזמנה"""
+    days = (end - start).days
+    discount_rate = long_rental_discount(days)
+    quotes = []
+    for car in cars:
+        subtotal = 0.0
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            multiplier = 1.0 + WEEKEND_SURCHARGE if day.weekday() in WEEKEND_DAYS else 1.0
+            subtotal += car["daily_rate"] * multiplier
+        subtotal = round(subtotal, 2)
+        discount = round(subtotal * discount_rate, 2)
+        quotes.append(dict(car, subtotal=subtotal, discount=discount, total=round(subtotal - discount, 2)))
+    quotes.sort(key=lambda quote: quote["total"])
+    return quotes
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> float:
+    """זמן הריצה הטוב ביותר מתוך repeat"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<28} {best * 1000:9.3f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק הצעות מחיר")
+    parser.add_argument("--cars", type=int, default=500)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cars = make_cars(args.cars)
+    start = date.today() + timedelta(days=30)
+    end = start + timedelta(days=args.days)
+    rates = [car["daily_rate"] for car in cars]
+
+    expected = [quote["total"] for quote in loop_quotes(cars, start, end)]
+    actual = [quote["total"] for quote in sorted_quotes(cars, start, end)]
+    assert all(abs(a - b) < 0.011 for a, b in zip(sorted(expected), actual))
+
+    print(f"{args.cars:,} רכבים, {args.days} ימים:")
+    baseline = measure("python loop + sort", lambda: loop_quotes(cars, start, end), args.repeat)
+    totals = measure("numpy totals only", lambda: quote_totals(rates, start, end), args.repeat)
+    full = measure("numpy totals + sorted dicts", lambda: sorted_quotes(cars, start, end), args.repeat)
+    print(f"  {'speedup (totals / full)':<28} {baseline / totals:8.1f}x / {baseline / full:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+בנצ'מרק סריאליזציה של תשובות רכבים בכמות (10,000 רכבים כברירת מחדל)
+משווה את הנתיב הישן (json.loads ל-features + Car(**row) לכל שורה + ולידציה וסריאליזציה נוספת דרך response_model)
+לנתיב החדש: TypeAdapter + orjson, ודילוג על ולידציה לנתוני projection מהימנים
+
+הרצה מתיקיית backend:
+    python benchmarks/bench_serialization.py [--cars 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.serialization import BulkCarSerializer
+
+
+# אותו מבנה כמו Car ב-main.py (יבוא של main מפעיל את כל השירותים)
+class Car(BaseModel):
+    id: int
+    make: str
+    model: str
+    year: int
+    car_type: str
+    transmission: str
+    daily_rate: float
+    available: bool
+    location: str
+    fuel_type: str
+    seats: int
+    image_url: Optional[str] = None
+    features: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class CarPage(BaseModel):
+    cars: List[Car]
+    next_cursor: Optional[str] = None
+    count: int
+
+
+def make_rows(count: int, postgres: bool) -> List[Dict]:
+    """שורות רכבים סינתטיות - postgres=True מחקה שורות PostgreSQL (Decimal ו-features כמחרוזת JSON)"""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(1, count + 1):
+        features = ["מזגן", "GPS", "בלוטות'"]
+        rows.append({
+            "id": i,
+            "make": "טויוטה",
+            "model": "קורולה",
+            "year": 2020 + i % 5,
+            "car_type": "compact",
+            "transmission": "automatic",
+            "daily_rate": Decimal("180.50") if postgres else 180.5,
+            "available": True,
+            "location": "תל אביב",
+            "fuel_type": "hybrid",
+            "seats": 5,
+            "image_url": None,
+            "features": json.dumps(features, ensure_ascii=False) if postgres else features,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return rows
+
+
+def legacy_path(rows: List[Dict]) -> bytes:
+    """הנתיב הישן ב-main.py: Car לכל שורה, ואז ה-response_model מוודא ומסדרת שוב את כל העמוד"""
+    cars = []
+    for car_data in rows:
+        if 'features' in car_data and isinstance(car_data['features'], str):
+            try:
+                import json as json_module
+                car_data['features'] = json_module.loads(car_data['features'])
+            except Exception:
+                car_data['features'] = []
+        cars.append(Car(**car_data))
+    page = CarPage(cars=cars, next_cursor=None, count=len(cars))
+    # FastAPI: ולידציה מול response_model, המרה ל-JSON-able ו-json.dumps ב-JSONResponse
+    adapter = TypeAdapter(CarPage)
+    content = adapter.dump_python(adapter.validate_python(page), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def measure(name: str, func: Callable[[List[Dict]], bytes], make: Callable[[], List[Dict]], repeat: int) -> float:
+    """זמן הריצה הטוב ביותר מתוך repeat (השורות נבנות מחדש בכל ריצה כי הנתיב הישן משנה אותן)"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        rows = make()
+        start = time.perf_counter()
+        body = func(rows)
+        best = min(best, time.perf_counter() - start)
+        size = len(body)
+    print(f"  {name:<38} {best * 1000:9.1f} ms   ({size / 1024:,.0f} KB)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק סריאליזציה של רכבים")
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    serializer = BulkCarSerializer(Car)
+
+    for postgres in (True, False):
+        source = "PostgreSQL" if postgres else "Event Store"
+        print(f"\n{args.cars:,} רכבים - שורות {source}:")
+        make = partial(make_rows, args.cars, postgres)
+        baseline = measure("legacy (Car per row + response_model)", legacy_path, make, args.repeat)
+        validated = measure(
+            "TypeAdapter + orjson",
+            lambda rows: serializer.page_response(rows).body, make, args.repeat
+        )
+        print(f"  {'speedup':<38} {baseline / validated:9.1f}x")
+        if not postgres:
+            trusted = measure(
+                "trusted projection + orjson",
+                lambda rows: serializer.page_response(rows, trusted=True).body, make, args.repeat
+            )
+            print(f"  {'speedup':<38} {baseline / trusted:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
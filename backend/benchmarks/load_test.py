@@ -0,0 +1,412 @@
+"""
+בדיקת עומס ל-API - משתמשים וירטואליים שמריצים תרחישים (עיון, חיפוש, כניסה, הזמנה, צ'אט AI)
+בשלבים של concurrency עולה, ודוח לכל שלב ולכל endpoint: תפוקה, p50/p95/p99 ושיעור שגיאות
+
+ברירת המחדל היא הרצה בתוך התהליך (httpx ASGITransport) מול עותק זמני של ה-Event Store -
+בלי רשת ובלי לשנות את הנתונים. --target מריץ מול שרת פועל (התרחישים login ו-book כותבים אליו).
+כל משתמש וירטואלי מגריל פעולות מ-Random עם seed קבוע, כך שהרצות חוזרות שולחות את אותו תמהיל;
+--output שומר את התוצאות ל-JSON ו---compare משווה לקובץ של הרצה קודמת
+
+הרצה מתיקיית backend:
+    python benchmarks/load_test.py [--mix mixed] [--stages 1,5,10,20] [--stage-seconds 10]
+    python benchmarks/load_test.py --target http://localhost:8000 --mix search=3,browse=1
+    python benchmarks/load_test.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(BACKEND_DIR)
+
+LOAD_USER = {
+    "email": "loadtest@example.com",
+    "password": "load1234",
+    "first_name": "Load",
+    "last_name": "Test",
+}
+
+SEARCH_TERMS = ["טויוטה", "יונדאי", "מאזדה", "automatic", "suv", "luxury", "hybrid", "קיה", "family"]
+CHAT_QUESTIONS = [
+    "איזה רכב משפחתי זול יש בתל אביב?",
+    "אני צריך רכב אוטומטי לשבוע בחיפה",
+    "מה ההבדל בין רכב כלכלי לקומפקטי?",
+    "יש רכב יוקרה פנוי בסוף השבוע?",
+]
+
+# תמהילים מוכנים: תרחיש -> משקל
+MIXES = {
+    "mixed": {"browse": 50, "search": 30, "login": 10, "book": 5, "ai": 5},
+    "read": {"browse": 60, "search": 40},
+    "browse": {"browse": 1},
+    "search": {"search": 1},
+    "login": {"login": 1},
+    "book": {"book": 1},
+    "ai": {"ai": 1},
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """percentile בשיטת nearest-rank (על רשימה ממוינת)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    """זמני התגובה והסטטוסים לכל endpoint בשלב אחד"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, bool]]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, status: int, elapsed: float, ok: bool):
+        self.samples.setdefault(name, []).append((elapsed, ok))
+        statuses = self.statuses.setdefault(name, {})
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def summary(self, duration: float) -> Dict:
+        endpoints = {name: self._summarize(samples, duration) for name, samples in sorted(self.samples.items())}
+        for name, stats in endpoints.items():
+            stats["statuses"] = self.statuses[name]
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        return {"duration_s": round(duration, 3), "total": self._summarize(everything, duration),
+                "endpoints": endpoints}
+
+    @staticmethod
+    def _summarize(samples: List[Tuple[float, bool]], duration: float) -> Dict:
+        latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+        stats = {
+            "requests": len(samples),
+            "rps": round(len(samples) / duration, 2) if duration else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        }
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = round(percentile(latencies, p), 3)
+        return stats
+
+
+class Session:
+    """משתמש וירטואלי: לקוח HTTP משותף, Random משלו ו-token אחרי כניסה"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, context: Dict):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.context = context
+        self.token: Optional[str] = None
+
+    async def request(self, name: str, method: str, url: str, ok: Tuple[int, ...] = (200,),
+                      **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.recorder.add(name, status, time.perf_counter() - started, status in ok)
+        return response
+
+    def car_id(self):
+        return self.rng.choice(self.context["car_ids"])
+
+    def rental_dates(self) -> Tuple[date, date]:
+        start = date.today() + timedelta(days=self.rng.randint(3, 80))
+        return start, start + timedelta(days=self.rng.choice([1, 2, 3, 4, 7, 10, 14]))
+
+
+# ---------- תרחישים ----------
+
+async def browse(session: Session):
+    """רשימת רכבים, עמוד שני, רכב בודד וסטטיסטיקות"""
+    response = await session.request("GET /api/cars", "GET", "/api/cars", params={"limit": 20})
+    cursor = response.json().get("next_cursor") if response is not None and response.status_code == 200 else None
+    if cursor:
+        await session.request("GET /api/cars (page 2)", "GET", "/api/cars", params={"limit": 20, "cursor": cursor})
+    await session.request("GET /api/cars/{car_id}", "GET", f"/api/cars/{session.car_id()}")
+    if session.rng.random() < 0.3:
+        await session.request("GET /api/stats/cars-by-type", "GET", "/api/stats/cars-by-type")
+
+
+async def search(session: Session):
+    """חיפוש עם פילטרים מוגרלים, לפעמים עם תאריכים, וחיפוש לפי קרבה"""
+    rng = session.rng
+    body = {"limit": 20}
+    if rng.random() < 0.5:
+        body["q"] = rng.choice(SEARCH_TERMS)
+    if rng.random() < 0.5 and session.context["locations"]:
+        body["location"] = rng.choice(session.context["locations"])
+    if rng.random() < 0.3:
+        body["max_price"] = rng.choice([150, 200, 300, 500])
+    if rng.random() < 0.4:
+        start, end = session.rental_dates()
+        body.update(start_date=start.isoformat(), end_date=end.isoformat())
+    await session.request("POST /api/cars/search", "POST", "/api/cars/search", json=body)
+    if rng.random() < 0.2 and session.context["locations"]:
+        await session.request("GET /api/cars/nearby", "GET", "/api/cars/nearby",
+                              params={"location": rng.choice(session.context["locations"])})
+
+
+async def login(session: Session):
+    """כניסה (bcrypt) ובדיקת המשתמש עם ה-token"""
+    response = await session.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                     json={"email": LOAD_USER["email"], "password": LOAD_USER["password"]})
+    if response is not None and response.status_code == 200:
+        session.token = response.json().get("access_token")
+    if session.token:
+        await session.request("GET /api/auth/me", "GET", "/api/auth/me",
+                              headers={"Authorization": f"Bearer {session.token}"})
+
+
+async def book(session: Session):
+    """הצעת מחיר לכמה רכבים והזמנה של הזול (409 - הרכב כבר תפוס - הוא תוצאה תקינה בעומס)"""
+    start, end = session.rental_dates()
+    car_ids = session.rng.sample(session.context["car_ids"], min(5, len(session.context["car_ids"])))
+    response = await session.request("POST /api/cars/quote", "POST", "/api/cars/quote", json={
+        "start_date": start.isoformat(), "end_date": end.isoformat(), "car_ids": car_ids
+    })
+    quotes = response.json().get("quotes") if response is not None and response.status_code == 200 else None
+    if not quotes:
+        return
+    car_id = quotes[0]["id"]
+    booking = {
+        "car_id": car_id,
+        "customer_name": "Load Test",
+        "customer_email": LOAD_USER["email"],
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "pickup_location": quotes[0].get("location", ""),
+    }
+    # מזהים מספריים - PostgreSQL (/api/bookings); מזהי Event Store - פקודת ה-CQRS
+    if str(car_id).isdigit():
+        await session.request("POST /api/bookings", "POST", "/api/bookings", ok=(200, 409), json=booking)
+    else:
+        await session.request("POST /api/commands/bookings", "POST", "/api/commands/bookings",
+                              ok=(200, 409), json=booking)
+
+
+async def ai_chat(session: Session):
+    await session.request("POST /api/ai/chat", "POST", "/api/ai/chat",
+                          json={"message": session.rng.choice(CHAT_QUESTIONS)})
+
+
+SCENARIOS: Dict[str, Callable[[Session], Awaitable[None]]] = {
+    "browse": browse,
+    "search": search,
+    "login": login,
+    "book": book,
+    "ai": ai_chat,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """שם תמהיל מוכן (mixed) או משקלים: search=3,browse=1"""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"תרחיש לא מוכר: {name} (אפשרויות: {', '.join(SCENARIOS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ---------- הרצה ----------
+
+async def prepare(client: httpx.AsyncClient, mix: Dict[str, float]) -> Dict:
+    """נתונים לתרחישים: מזהי רכבים ומיקומים, ומשתמש בדיקה אם יש תרחיש כניסה"""
+    car_ids, locations, cursor = [], set(), None
+    while len(car_ids) < 500:
+        params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/cars", params=params)
+        response.raise_for_status()
+        page = response.json()
+        car_ids.extend(car["id"] for car in page["cars"])
+        locations.update(car["location"] for car in page["cars"] if car.get("location"))
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    if not car_ids:
+        raise RuntimeError("אין רכבים בשרת - אין על מה להריץ עומס")
+
+    if "login" in mix:
+        response = await client.post("/api/auth/register", json={**LOAD_USER, "confirm_password": LOAD_USER["password"]})
+        if response.status_code not in (200, 400):
+            raise RuntimeError(f"רישום משתמש הבדיקה נכשל: {response.status_code} {response.text[:200]}")
+    return {"car_ids": car_ids, "locations": sorted(locations)}
+
+
+async def run_user(session: Session, scenarios: List, weights: List[float], stop_at: float, think_s: float):
+    while time.monotonic() < stop_at:
+        await session.rng.choices(scenarios, weights)[0](session)
+        if think_s:
+            await asyncio.sleep(session.rng.expovariate(1 / think_s))
+
+
+async def run_stage(client: httpx.AsyncClient, context: Dict, mix: Dict[str, float], users: int,
+                    seconds: float, seed: int, think_s: float) -> Dict:
+    recorder = Recorder()
+    scenarios, weights = [SCENARIOS[name] for name in mix], list(mix.values())
+    started = time.monotonic()
+    stop_at = started + seconds
+    await asyncio.gather(*(
+        run_user(Session(client, recorder, random.Random(seed * 10007 + user), context),
+                 scenarios, weights, stop_at, think_s)
+        for user in range(users)
+    ))
+    return recorder.summary(time.monotonic() - started)
+
+
+async def run_load(client: httpx.AsyncClient, args) -> Dict:
+    context = await prepare(client, args.mix)
+    if args.warmup:
+        await run_stage(client, context, args.mix, args.stages[0], args.warmup, args.seed + 1, args.think_ms / 1000)
+
+    stages = []
+    for users in args.stages:
+        log(f"שלב: {users} משתמשים, {args.stage_seconds} שניות...")
+        stage = await run_stage(client, context, args.mix, users, args.stage_seconds, args.seed, args.think_ms / 1000)
+        stage["users"] = users
+        stages.append(stage)
+        total = stage["total"]
+        log(f"  {total['rps']:.1f} req/s, p95 {total['p95_ms']:.1f} ms, שגיאות {total['error_rate']:.2%}")
+    return {"cars": len(context["car_ids"]), "stages": stages}
+
+
+@contextlib.asynccontextmanager
+async def in_process_client():
+    """לקוח מול האפליקציה בתוך התהליך, על עותק זמני של ה-Event Store (הכתיבות לא נשמרות).
+    הפלט של האפליקציה מושתק כדי לא להתערבב בדוח"""
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    events_db = os.path.join(BACKEND_DIR, "car_rental_events.db")
+    if os.path.exists(events_db):
+        shutil.copy(events_db, workdir)
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            import main
+            async with main.app.router.lifespan_context(main.app):
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+                    yield client
+            # כתיבת יומן החיפושים שבתור עכשיו - לפני החזרה לתיקייה המקורית (נתיב ה-DB יחסי)
+            main.get_database_service().search_log.close()
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def print_report(result: Dict):
+    header = f"  {'endpoint':<32} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'err%':>7}"
+    for stage in result["stages"]:
+        print(f"\n{stage['users']} משתמשים ({stage['duration_s']:.1f} שניות):")
+        print(header)
+        rows = list(stage["endpoints"].items()) + [("TOTAL", stage["total"])]
+        for name, stats in rows:
+            print(f"  {name:<32} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+                  f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} "
+                  f"{stats['error_rate'] * 100:>6.2f}%")
+
+
+def print_comparison(result: Dict, baseline: Dict):
+    """השוואת p95 ותפוקה לכל endpoint מול הרצה קודמת, בשלבים עם אותו מספר משתמשים"""
+    changed = [key for key in ("target", "mix", "stage_seconds", "think_ms", "seed")
+               if baseline["config"].get(key) != result["config"].get(key)]
+    if changed:
+        print(f"\n⚠️ ההגדרות שונות מההרצה הקודמת ({', '.join(changed)}) - ההשוואה לא מדויקת")
+    previous = {stage["users"]: stage for stage in baseline["stages"]}
+    for stage in result["stages"]:
+        before = previous.get(stage["users"])
+        if before is None:
+            continue
+        print(f"\nהשוואה - {stage['users']} משתמשים (p95 ms / req/s):")
+        rows = list(stage["endpoints"].items()) + [("TOTAL", stage["total"])]
+        for name, stats in rows:
+            old = before["total"] if name == "TOTAL" else before["endpoints"].get(name)
+            if old is None:
+                continue
+            p95_change = (stats["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+            rps_change = (stats["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+            print(f"  {name:<32} {old['p95_ms']:>8.1f} -> {stats['p95_ms']:>8.1f} ({p95_change:+6.1f}%)   "
+                  f"{old['rps']:>8.1f} -> {stats['rps']:>8.1f} ({rps_change:+6.1f}%)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="בדיקת עומס ל-API")
+    parser.add_argument("--target", help="כתובת שרת פועל (ברירת מחדל: הרצה בתוך התהליך)")
+    parser.add_argument("--mix", type=parse_mix, default="mixed",
+                        help=f"תמהיל מוכן ({', '.join(MIXES)}) או משקלים: search=3,browse=1")
+    parser.add_argument("--stages", type=lambda value: [int(users) for users in value.split(",")],
+                        default=[1, 5, 10, 20], help="מספר המשתמשים בכל שלב")
+    parser.add_argument("--stage-seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2, help="שניות חימום לפני השלב הראשון (לא נמדדות)")
+    parser.add_argument("--think-ms", type=float, default=0, help="המתנה ממוצעת בין פעולות של משתמש")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="שמירת התוצאות ל-JSON")
+    parser.add_argument("--compare", help="קובץ JSON של הרצה קודמת להשוואה")
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    if args.target:
+        client_context = httpx.AsyncClient(base_url=args.target, timeout=120,
+                                           limits=httpx.Limits(max_connections=max(args.stages)))
+    else:
+        client_context = in_process_client()
+    started_at = datetime.now().isoformat()
+    async with client_context as client:
+        load = await run_load(client, args)
+
+    result = {
+        "config": {
+            "target": args.target or "in-process",
+            "mix": args.mix,
+            "stages": args.stages,
+            "stage_seconds": args.stage_seconds,
+            "think_ms": args.think_ms,
+            "seed": args.seed,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "started_at": started_at,
+        **load,
+    }
+    print_report(result)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(result, json.load(f))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nהתוצאות נשמרו ב-{args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,289 @@
+"""
+מיקרו-בנצ'מרקים לנתיבים החמים של ה-backend, עם baseline ובדיקת רגרסיה
+- CarAggregate.apply_event / User.apply_event - בניית אגרגטים מאירועים
+- MultiAPICarService._remove_duplicates - איחוד תוצאות הספקים החיצוניים
+- CarRentalRAG.extract_search_criteria / filter_cars_by_criteria - ניתוח שאלה וסינון ביועץ ה-AI
+- Car (pydantic) - בניית המודל משורה, וקידוד JSON של עמוד רכבים
+
+כל בנצ'מרק נמדד כזמן לפעולה (המינימום מכמה חזרות, בלי GC). --save-baseline שומר את התוצאות,
+והרצה רגילה משווה ל-baseline ונכשלת (exit 1) אם בנצ'מרק איטי ביותר מ---threshold אחוזים.
+ה-baseline תלוי במכונה - שומרים אותו מקומית לפני שינוי ומשווים אחריו
+
+הרצה מתיקיית backend:
+    python benchmarks/micro_benchmarks.py --save-baseline
+    python benchmarks/micro_benchmarks.py [--threshold 20] [--filter apply_event]
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_baseline.json")
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(os.path.dirname(BACKEND_DIR), "ai-service"))
+
+MAKES = [("טויוטה", "קורולה"), ("יונדאי", "i20"), ("מאזדה", "3"), ("קיה", "ספורטאז'"), ("סקודה", "אוקטביה")]
+LOCATIONS = ["תל אביב", "Tel Aviv", "חיפה", "ירושלים", "Jerusalem", "אילת", "נתניה", "באר שבע"]
+CAR_TYPES = ["economy", "compact", "midsize", "family", "luxury", "suv"]
+QUESTIONS = [
+    "אני צריך רכב משפחתי ל-5 נוסעים בתל אביב עד 300 שקל ליום",
+    "יש רכב כלכלי זול בחיפה?",
+    "מחפש רכב יוקרה בירושלים, תקציב 800",
+    "רכב שטח עבור 7 אנשים באילת",
+    "מה ההבדל בין רכב ידני לאוטומטי?",
+]
+
+BENCHMARKS: Dict[str, Callable[[random.Random], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    """רישום בנצ'מרק: הפונקציה מכינה נתונים ומחזירה (פונקציה למדידה, מספר הפעולות בכל קריאה)"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def car_row(rng: random.Random, car_id) -> Dict:
+    make, model = rng.choice(MAKES)
+    return {
+        "id": car_id, "make": make, "model": model, "year": rng.randint(2018, 2024),
+        "car_type": rng.choice(CAR_TYPES), "transmission": rng.choice(["manual", "automatic"]),
+        "daily_rate": round(rng.uniform(100, 800), 2), "available": True, "location": rng.choice(LOCATIONS),
+        "location_id": None, "fuel_type": "בנזין", "seats": rng.choice([2, 4, 5, 7]), "image_url": None,
+        "features": ["GPS", "Bluetooth"], "created_at": datetime(2025, 1, 1), "updated_at": None,
+    }
+
+
+# ---------- בנצ'מרקים ----------
+
+@benchmark("CarAggregate.apply_event")
+def bench_car_aggregate(rng):
+    from database.event_store import CarAggregate, Event, EventType
+    events = [Event(EventType.CAR_ADDED, "car-1", car_row(rng, "car-1"))]
+    events += [Event(EventType.CAR_UPDATED, "car-1", {"daily_rate": rng.uniform(100, 800), "updated_at": "2025-01-02"})
+               for _ in range(6)]
+    events += [Event(EventType.CAR_UPDATED, "car-1", {"location": rng.choice(LOCATIONS)}) for _ in range(3)]
+
+    def run():
+        aggregate = CarAggregate("car-1")
+        for event in events:
+            aggregate.apply_event(event)
+    return run, len(events)
+
+
+@benchmark("User.apply_event")
+def bench_user(rng):
+    from database.event_store import Event, EventType
+    from models.user_models import User
+    events = [Event(EventType.USER_REGISTERED, "user-1", {
+        "email": "user@example.com", "first_name": "Dana", "last_name": "Levi", "password_hash": "x",
+        "role": "customer", "status": "active", "created_at": "2025-01-01T00:00:00",
+    })]
+    events += [Event(EventType.USER_LOGIN, "user-1", {"login_time": "2025-01-02T00:00:00", "success": rng.random() < 0.8})
+               for _ in range(9)]
+
+    def run():
+        user = User("user-1")
+        for event in events:
+            user.apply_event(event)
+    return run, len(events)
+
+
+@benchmark("MultiAPICarService._remove_duplicates")
+def bench_remove_duplicates(rng):
+    from services.multi_api_service import CarData, MultiAPICarService
+    suppliers = ["Hertz", "Avis", "Budget", "Sixt"]
+    cars = []
+    for i in range(400):
+        row = car_row(rng, f"ext-{i}")
+        cars.append(CarData(
+            id=row["id"], make=row["make"], model=row["model"], year=row["year"],
+            car_type=row["car_type"], transmission=row["transmission"], daily_rate=row["daily_rate"],
+            location=row["location"], fuel_type=row["fuel_type"], seats=row["seats"],
+            supplier=rng.choice(suppliers), external_api="bench",
+        ))
+    service = MultiAPICarService.__new__(MultiAPICarService)
+    return (lambda: service._remove_duplicates(cars)), len(cars)
+
+
+@benchmark("CarRentalRAG.extract_search_criteria")
+def bench_extract_criteria(rng):
+    from rag_service import CarRentalRAG
+    rag = CarRentalRAG.__new__(CarRentalRAG)
+
+    def run():
+        for question in QUESTIONS:
+            rag.extract_search_criteria(question)
+    return run, len(QUESTIONS)
+
+
+@benchmark("CarRentalRAG.filter_cars_by_criteria")
+def bench_filter_cars(rng):
+    from rag_service import CarRentalRAG
+    rag = CarRentalRAG.__new__(CarRentalRAG)
+    cars = [car_row(rng, i) for i in range(200)]
+    criteria = [rag.extract_search_criteria(question) for question in QUESTIONS]
+
+    def run():
+        for item in criteria:
+            rag.filter_cars_by_criteria(cars, item)
+    return run, len(criteria)
+
+
+@benchmark("Car(**row)")
+def bench_car_model(rng):
+    from main import Car
+    rows = [car_row(rng, i) for i in range(100)]
+
+    def run():
+        for row in rows:
+            Car(**row)
+    return run, len(rows)
+
+
+@benchmark("json: 100-car page")
+def bench_json(rng):
+    from core.serialization import dumps
+    payload = {"cars": [car_row(rng, i) for i in range(100)], "next_cursor": "abc", "count": 100}
+    return (lambda: dumps(payload)), 1
+
+
+# ---------- מדידה ----------
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> float:
+    """זמן לקריאה (שניות): מספר הקריאות בכל חזרה גדל עד min_time, והמינימום מבין החזרות"""
+    func()  # חימום - cache-ים, יבוא עצל וכו'
+    loops = 1
+    while True:
+        elapsed = _time_loops(func, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed * 2 >= min_time else 10
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        best = min(best, _time_loops(func, loops) / loops)
+    return best
+
+
+def _time_loops(func: Callable[[], object], loops: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def run_benchmarks(names: List[str], repeat: int, min_time: float, seed: int) -> Dict[str, Dict]:
+    results = {}
+    for name in names:
+        try:
+            func, ops = BENCHMARKS[name](random.Random(seed))
+        except ImportError as e:
+            print(f"  {name:<40} דילוג - {e}", file=sys.stderr)
+            continue
+        per_op = measure(func, repeat, min_time) / ops
+        results[name] = {"per_op_us": round(per_op * 1e6, 4)}
+    return results
+
+
+@contextlib.contextmanager
+def isolated_app():
+    """יבוא מודולי האפליקציה מדפיס סטטוס, ושירות שנבנה בטעות (core.startup.LazyService) כותב לתיקייה
+    הנוכחית - מריצים בתיקייה זמנית ובלי הפלט שלהם"""
+    workdir = tempfile.mkdtemp(prefix="micro-bench-")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        os.chdir(previous_dir)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """הדפסת התוצאות מול ה-baseline; מחזיר את שמות הבנצ'מרקים שהאטו מעבר לסף"""
+    previous = baseline.get("results", {}) if baseline else {}
+    regressions = []
+    print(f"\n  {'benchmark':<40} {'us/op':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        current = result["per_op_us"]
+        before = previous.get(name, {}).get("per_op_us")
+        if not before:
+            print(f"  {name:<40} {current:>10.3f} {'-':>10} {'new':>8}")
+            continue
+        change = (current / before - 1) * 100
+        status = ""
+        if change > threshold:
+            status = "  ❌ רגרסיה"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "  ✅ שיפור"
+        print(f"  {name:<40} {current:>10.3f} {before:>10.3f} {change:>+7.1f}%{status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="מיקרו-בנצ'מרקים עם בדיקת רגרסיה")
+    parser.add_argument("--filter", help="רק בנצ'מרקים שהשם שלהם מכיל את המחרוזת")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="שמירת התוצאות כ-baseline")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "20")),
+                        help="אחוז האטה מקסימלי מול ה-baseline (ברירת מחדל 20)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="זמן מינימלי לכל חזרה (שניות)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter.lower() in name.lower()]
+    print(f"{len(names)} בנצ'מרקים, {args.repeat} חזרות, Python {platform.python_version()}")
+    with isolated_app():
+        results = run_benchmarks(names, args.repeat, args.min_time, args.seed)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        merged = dict(baseline.get("results", {})) if baseline else {}
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": merged,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nה-baseline נשמר ב-{args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\nאין baseline ב-{args.baseline} - הריצו עם --save-baseline לפני השינוי")
+        return 0
+    if regressions:
+        print(f"\n❌ {len(regressions)} בנצ'מרקים האטו ביותר מ-{args.threshold:.0f}%: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ אין רגרסיות (סף {args.threshold:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
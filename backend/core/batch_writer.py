@@ -0,0 +1,156 @@
+"""
+כתיבה ברקע בקבוצות (batching) - תור חסום, כתיבה כל N רשומות או T מילישניות, מדיניות השלכה ומונים
+משמש לרישום חיפושים, כך שזמן התגובה של חיפוש לא כולל כתיבה לבסיס הנתונים
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# מה עושים כשהתור מלא: משליכים את הרשומה החדשה, או את הוותיקה ביותר בתור
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+
+
+class BatchWriter(Generic[T]):
+    """תור חסום עם thread כותב ברקע.
+
+    write_batch מקבל רשימת רשומות וכותב אותן בפעולה אחת (חיבור ו-commit אחד).
+    submit לא חוסם אף פעם - כשהתור מלא רשומה מושלכת לפי drop_policy ונספרת ב-dropped"""
+
+    def __init__(self, write_batch: Callable[[List[T]], None], name: str = "batch-writer",
+                 max_queue: int = 10_000, batch_size: int = 100, flush_interval_ms: int = 200,
+                 drop_policy: str = DROP_NEWEST):
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"מדיניות השלכה לא מוכרת: {drop_policy}")
+        if max_queue < 1 or batch_size < 1 or flush_interval_ms <= 0:
+            raise ValueError("גודל התור, גודל הקבוצה ומרווח הכתיבה חייבים להיות חיוביים")
+        self.write_batch = write_batch
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.drop_policy = drop_policy
+        self._queue: "queue.Queue[T]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # מונים
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    # ---------- צד הכותב (בקשות) ----------
+
+    def submit(self, item: T) -> bool:
+        """הכנסת רשומה לתור (בלי לחכות לכתיבה). False אם הרשומה החדשה הושלכה"""
+        self._ensure_started()
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.drop_policy == DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+                self._count_dropped()
+                return True
+            except queue.Full:
+                pass
+        self._count_dropped()
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """המתנה עד שכל מה שבתור נכתב (לכיבוי ולבדיקות). False אם עבר ה-timeout"""
+        if self._thread is None:
+            return self._queue.unfinished_tasks == 0
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline or not self._thread.is_alive():
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """כתיבת מה שנשאר בתור ועצירת ה-thread"""
+        self.flush(timeout)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """מוני התור (לניטור)"""
+        return {
+            "name": self.name,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "drop_policy": self.drop_policy,
+        }
+
+    # ---------- thread הכתיבה ----------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _count_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self) -> List[T]:
+        """רשומות עד batch_size, או מה שהגיע עד flush_interval מהרשומה הראשונה"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[T]):
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"שגיאה בכתיבת {len(batch)} רשומות ({self.name}): {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
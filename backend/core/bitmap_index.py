@@ -0,0 +1,206 @@
+"""
+אינדקס bitmap לתכונות קטגוריות של רכבים (סוג, הילוכים, דלק, מיקום, ספק, זמינות)
+לכל רכב מספר סידורי צפוף, ולכל ערך תכונה int של Python שבו ביט לכל רכב - סינון מרובה הוא AND בין מספרים.
+זה גם המבנה שמתחת לאינדקס הפאסטים (core.facets.FacetIndex) - ה-Event Store מחזיק אינדקס אחד
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.locations import resolve_location
+
+# התכונות שנכנסות לאינדקס
+ATTRIBUTES = ("car_type", "transmission", "fuel_type", "location", "supplier", "available")
+
+# פילטרי חיפוש שהם שוויון על תכונה (מיקום עובר דרך LocationIndex, כי הוא מגיע כטקסט חופשי)
+EQUALITY_FILTERS = ("car_type", "transmission", "fuel_type", "supplier")
+
+# בייט -> מיקומי הביטים הדלוקים בו (פענוח bitmap לרשימת מספרים סידוריים)
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def popcount(bits: int) -> int:
+    """מספר הביטים הדלוקים"""
+    return bits.bit_count() if hasattr(bits, "bit_count") else bin(bits).count("1")
+
+
+def attribute_values(car_data: Dict) -> Dict[str, object]:
+    """ערכי התכונות של רכב (מיקום לפי המזהה הקנוני)"""
+    return {
+        "car_type": car_data.get("car_type") or None,
+        "transmission": car_data.get("transmission") or None,
+        "fuel_type": car_data.get("fuel_type") or None,
+        "location": car_data.get("location_id") or car_data.get("location") or None,
+        "supplier": car_data.get("supplier") or None,
+        "available": bool(car_data.get("available", True)),
+    }
+
+
+def equality_filters(filters: Dict) -> Dict[str, object]:
+    """פילטרי השוויון מתוך פילטרי חיפוש (רק רכבים זמינים)"""
+    equals: Dict[str, object] = {"available": True}
+    equals.update({name: filters[name] for name in EQUALITY_FILTERS if filters.get(name)})
+    return equals
+
+
+class BitmapIndex:
+    """אינדקס bitmap: תכונה -> ערך -> int שבו הביט ה-n דלוק אם לרכב עם המספר הסידורי n יש את הערך"""
+
+    def __init__(self, attributes: Iterable[str] = ATTRIBUTES):
+        self.attributes = tuple(attributes)
+        self._bitmaps: Dict[str, Dict[object, int]] = {attribute: {} for attribute in self.attributes}
+        self._ordinals: Dict[object, int] = {}   # מזהה רכב -> מספר סידורי
+        self._car_ids: List[object] = []         # מספר סידורי -> מזהה רכב (None = פנוי)
+        self._free: List[int] = []               # מספרים סידוריים של רכבים שנמחקו, לשימוש חוזר
+        self._values: Dict[object, Dict] = {}    # מזהה רכב -> ערכי התכונות (לעדכון ולמחיקה)
+        self.all_cars = 0                        # bitmap של כל הרכבים באינדקס
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    # ---------- עדכון ----------
+
+    def upsert_car(self, car_id, car_data: Dict):
+        """הוספה או החלפה של רכב (מצב מלא)"""
+        self.set_values(car_id, attribute_values(car_data))
+
+    def set_values(self, car_id, values: Dict[str, object]):
+        """קביעת ערכי התכונות של רכב (מצב מלא, כבר מחושב - למשל ערכי הפאסטים)"""
+        ordinal = self._ordinals.get(car_id)
+        if ordinal is None:
+            ordinal = self._free.pop() if self._free else len(self._car_ids)
+            if ordinal == len(self._car_ids):
+                self._car_ids.append(car_id)
+            else:
+                self._car_ids[ordinal] = car_id
+            self._ordinals[car_id] = ordinal
+            self.all_cars |= 1 << ordinal
+            old: Optional[Dict] = None
+        else:
+            old = self._values[car_id]
+
+        bit = 1 << ordinal
+        for attribute in self.attributes:
+            value = values.get(attribute)
+            if old is not None and old.get(attribute) == value:
+                continue
+            if old is not None:
+                self._clear_bit(attribute, old.get(attribute), ~bit)
+            if value is not None:
+                bitmaps = self._bitmaps[attribute]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        self._values[car_id] = values
+
+    def update_car(self, car_id, changes: Dict):
+        """עדכון חלקי - רק התכונות שהשתנו"""
+        values = self._values.get(car_id)
+        if values is None:
+            return
+        if "location" in changes and "location_id" not in changes:
+            changes = dict(changes, location_id=resolve_location(changes["location"]))
+        changed = attribute_values(changes)
+        updated = dict(values)
+        for attribute in self.attributes:
+            if attribute in changes or (attribute == "location" and "location_id" in changes):
+                updated[attribute] = changed[attribute]
+        self.set_values(car_id, updated)
+
+    def remove_car(self, car_id):
+        """הסרת רכב - המספר הסידורי שלו משוחרר לרכב הבא"""
+        ordinal = self._ordinals.pop(car_id, None)
+        if ordinal is None:
+            return
+        mask = ~(1 << ordinal)
+        for attribute, value in self._values.pop(car_id).items():
+            self._clear_bit(attribute, value, mask)
+        self.all_cars &= mask
+        self._car_ids[ordinal] = None
+        self._free.append(ordinal)
+
+    def clear(self):
+        for bitmaps in self._bitmaps.values():
+            bitmaps.clear()
+        self._ordinals.clear()
+        self._car_ids.clear()
+        self._free.clear()
+        self._values.clear()
+        self.all_cars = 0
+
+    # ---------- שאילתות ----------
+
+    def bitmap(self, attribute: str, value) -> int:
+        """ה-bitmap של ערך תכונה (0 אם אין רכבים עם הערך)"""
+        return self._bitmaps[attribute].get(value, 0)
+
+    def bitmaps(self, attribute: str) -> Dict[object, int]:
+        """כל הערכים של תכונה עם ה-bitmap שלהם"""
+        return self._bitmaps[attribute]
+
+    def values(self, car_id) -> Optional[Dict]:
+        """ערכי התכונות של רכב (None אם אינו באינדקס)"""
+        return self._values.get(car_id)
+
+    def bits(self, car_ids: Iterable) -> int:
+        """bitmap של קבוצת מזהים (מזהים שאינם באינדקס מדולגים)"""
+        bits = 0
+        ordinals = self._ordinals
+        for car_id in car_ids:
+            ordinal = ordinals.get(car_id)
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def match(self, equals: Dict[str, object]) -> int:
+        """AND של ה-bitmaps לכל הפילטרים. ערך שהוא רשימה/קבוצה = OR בין הערכים שלה"""
+        bits = self.all_cars
+        for attribute, value in equals.items():
+            if isinstance(value, (list, tuple, set, frozenset)):
+                any_of = 0
+                for item in value:
+                    any_of |= self.bitmap(attribute, item)
+                bits &= any_of
+            else:
+                bits &= self.bitmap(attribute, value)
+            if not bits:
+                break
+        return bits
+
+    def ids(self, bits: int) -> List:
+        """מזהי הרכבים שהביטים שלהם דלוקים - סריקה לפי בייטים, בלי לולאה על כל ביט"""
+        if not bits:
+            return []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        car_ids = self._car_ids
+        return [car_ids[offset * 8 + bit]
+                for offset, byte in enumerate(data) if byte
+                for bit in _BYTE_BITS[byte]]
+
+    def filter_ids(self, bits: int, car_ids: Iterable) -> Iterator:
+        """המזהים מ-car_ids (לפי הסדר שלהם) שהביט שלהם דלוק - בדיקה בזמן המעבר, בלי לפענח את כל ה-bitmap.
+        מתאים לקריאת עמוד מסדר מיון קיים: עוצרים כשהעמוד מתמלא"""
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        size = len(data)
+        ordinals = self._ordinals
+        for car_id in car_ids:
+            ordinal = ordinals.get(car_id)
+            if ordinal is not None and ordinal >> 3 < size and data[ordinal >> 3] >> (ordinal & 7) & 1:
+                yield car_id
+
+    def match_ids(self, equals: Dict[str, object]) -> set:
+        """מזהי הרכבים שעוברים את כל הפילטרים"""
+        return set(self.ids(self.match(equals)))
+
+    def count(self, equals: Dict[str, object]) -> int:
+        """מספר הרכבים שעוברים את כל הפילטרים (בלי לפענח מזהים)"""
+        return popcount(self.match(equals))
+
+    # ---------- עזרים פנימיים ----------
+
+    def _clear_bit(self, attribute: str, value, mask: int):
+        if value is None:
+            return
+        bitmaps = self._bitmaps[attribute]
+        bits = bitmaps.get(value, 0) & mask
+        if bits:
+            bitmaps[value] = bits
+        else:
+            bitmaps.pop(value, None)
@@ -0,0 +1,128 @@
+"""
+לוח הזמנות לכל רכב - אינדקס מרווחים לבדיקת זמינות בטווח תאריכים
+כל הזמנה היא מרווח חצי-פתוח [start_date, end_date) - רכב שמוחזר ביום X פנוי לאיסוף ביום X
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+DateLike = Union[date, datetime, str]
+
+
+class InvalidDateRangeError(ValueError):
+    """טווח תאריכים לא תקין"""
+
+
+class BookingConflictError(Exception):
+    """הרכב כבר מוזמן בחלק מהטווח (נבדק באותה נעילה / טרנזקציה של יצירת ההזמנה)"""
+
+
+def to_date(value: DateLike) -> date:
+    """המרת תאריך (date / datetime / מחרוזת ISO) ל-date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def validate_range(start: Optional[DateLike], end: Optional[DateLike]) -> Optional[Tuple[date, date]]:
+    """בדיקת טווח תאריכים לחיפוש - None אם לא נשלח טווח; תאריך אחד בלי השני הוא שגיאה"""
+    if not start and not end:
+        return None
+    if not start or not end:
+        raise InvalidDateRangeError("יש לשלוח גם תאריך התחלה וגם תאריך סיום")
+    try:
+        start_date, end_date = to_date(start), to_date(end)
+    except ValueError:
+        raise InvalidDateRangeError("פורמט תאריך לא תקין (YYYY-MM-DD)")
+    if end_date <= start_date:
+        raise InvalidDateRangeError("תאריך הסיום חייב להיות אחרי תאריך ההתחלה")
+    return start_date, end_date
+
+
+class _CarIntervals:
+    """מרווחי ההזמנות של רכב אחד, ממוינים לפי תאריך התחלה"""
+
+    def __init__(self):
+        self.intervals: List[Tuple[date, date, str]] = []
+        self.starts: List[date] = []
+        # max_ends[i] = תאריך הסיום המאוחר ביותר מבין המרווחים 0..i
+        self.max_ends: List[date] = []
+
+    def add(self, start: date, end: date, booking_id: str):
+        insort(self.intervals, (start, end, booking_id))
+        self._rebuild()
+
+    def remove(self, booking_id: str):
+        self.intervals = [interval for interval in self.intervals if interval[2] != booking_id]
+        self._rebuild()
+
+    def overlaps(self, start: date, end: date) -> bool:
+        # המרווחים שמתחילים לפני end הם רצף בתחילת הרשימה - מספיק לבדוק את הסיום המקסימלי שלהם
+        count = bisect_left(self.starts, end)
+        return count > 0 and self.max_ends[count - 1] > start
+
+    def _rebuild(self):
+        self.starts = [interval[0] for interval in self.intervals]
+        self.max_ends = []
+        latest = None
+        for _, end, _ in self.intervals:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+
+class BookingCalendar:
+    """אינדקס הזמנות לפי רכב - בדיקת זמינות ב-O(log k) להזמנות של הרכב.
+    thread-safe: מתעדכן מ-thread הכתיבה ונקרא מבקשות ומ-thread התמחור הדינמי"""
+
+    def __init__(self):
+        self._cars: Dict[str, _CarIntervals] = {}
+        self._bookings: Dict[str, str] = {}  # מזהה הזמנה -> מזהה רכב
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    def add_booking(self, booking_id, car_id, start: DateLike, end: DateLike):
+        """הוספת הזמנה (או החלפה של הזמנה קיימת עם אותו מזהה)"""
+        booking_id, car_id = str(booking_id), str(car_id)
+        with self._lock:
+            self.remove_booking(booking_id)
+            self._cars.setdefault(car_id, _CarIntervals()).add(to_date(start), to_date(end), booking_id)
+            self._bookings[booking_id] = car_id
+
+    def remove_booking(self, booking_id):
+        """הסרת הזמנה (ביטול)"""
+        with self._lock:
+            car_id = self._bookings.pop(str(booking_id), None)
+            if car_id is None:
+                return
+            intervals = self._cars[car_id]
+            intervals.remove(str(booking_id))
+            if not intervals.intervals:
+                del self._cars[car_id]
+
+    def is_free(self, car_id, start: DateLike, end: DateLike) -> bool:
+        """האם הרכב פנוי בכל הטווח [start, end)"""
+        start, end = to_date(start), to_date(end)
+        with self._lock:
+            intervals = self._cars.get(str(car_id))
+            return intervals is None or not intervals.overlaps(start, end)
+
+    def intervals(self, start: DateLike, end: DateLike) -> List[Tuple[str, date, date]]:
+        """כל ההזמנות שחופפות לטווח [start, end) - (מזהה רכב, התחלה, סיום), עותק שנלקח תחת הנעילה"""
+        start, end = to_date(start), to_date(end)
+        with self._lock:
+            return [(car_id, interval_start, interval_end)
+                    for car_id, intervals in self._cars.items()
+                    for interval_start, interval_end, _ in intervals.intervals[:bisect_left(intervals.starts, end)]
+                    if interval_end > start]
+
+    def clear(self):
+        """ריקון הלוח"""
+        with self._lock:
+            self._cars.clear()
+            self._bookings.clear()
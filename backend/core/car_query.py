@@ -0,0 +1,130 @@
+"""
+מנוע שאילתות רכבים אחיד - שאילתה מובנית אחת (פילטרים, מיון, עמוד, שדות) שמתוכננת מול כל backend
+כל backend (PostgreSQL, Event Store) מממש query_cars(CarQuery) ודוחף את הפילטרים למקום הזול ביותר:
+ב-PostgreSQL לתנאי WHERE על האינדקסים, ב-Event Store לאינדקסים בזיכרון לפני בניית רכבים מאירועים
+"""
+
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, split_page
+
+# סדרי מיון -> שדות מפתח המיון (ה-cursor מקודד את הערכים שלהם)
+SORT_KEYS = {
+    "id": ("id",),
+    "rate": ("daily_rate", "id"),
+}
+
+# שדות שלא נשלפים מה-backend אלא מחושבים במנוע (המחיר הדינמי, core.dynamic_pricing)
+COMPUTED_FIELDS = ("effective_rate",)
+
+
+@dataclass
+class CarQuery:
+    """שאילתת רכבים מובנית"""
+    q: Optional[str] = None                      # חיפוש חופשי
+    location: Optional[str] = None               # מיקום (מזהה/כינוי מוכר או טקסט)
+    location_ids: Optional[Sequence[str]] = None # כמה סניפים (חיפוש גאוגרפי)
+    car_ids: Optional[Sequence] = None           # רק הרכבים האלה (הצעת מחיר לרשימת רכבים)
+    car_type: Optional[str] = None
+    transmission: Optional[str] = None
+    max_price: Optional[float] = None
+    start_date: Optional[date] = None            # טווח [start, end) - רק רכבים בלי הזמנה חופפת
+    end_date: Optional[date] = None
+    available_only: bool = True
+    sort: str = "id"
+    after: Optional[List] = None                 # מפתח המיון של הפריט האחרון (מה-cursor)
+    limit: Optional[int] = DEFAULT_PAGE_SIZE     # None = כל התוצאות
+    fields: Optional[Tuple[str, ...]] = None     # None = כל השדות
+    # לכל היותר n רכבים לכל location_id (הראשונים לפי סדר המיון). כל שורה מקבלת location_count -
+    # מספר הרכבים המתאימים באותו מיקום (לפני החיתוך)
+    per_location: Optional[int] = None
+
+    def __post_init__(self):
+        if self.sort not in SORT_KEYS:
+            raise ValueError(f"סדר מיון לא מוכר: {self.sort}")
+        if not (self.start_date and self.end_date):
+            self.start_date = self.end_date = None
+
+    @property
+    def key_fields(self) -> Tuple[str, ...]:
+        return SORT_KEYS[self.sort]
+
+    def columns(self) -> Optional[Tuple[str, ...]]:
+        """השדות לשליפה - השדות המבוקשים ושדות מפתח המיון (המחיר הדינמי נגזר מ-daily_rate)"""
+        if self.fields is None:
+            return None
+        fields = self.fields + self.key_fields
+        if self.per_location is not None:
+            fields += ("location_id",)
+        if "effective_rate" in fields:
+            fields += ("daily_rate",)
+        return tuple(field for field in dict.fromkeys(fields) if field not in COMPUTED_FIELDS)
+
+    def filters(self) -> Dict:
+        """הפילטרים כמילון (למימושים שעובדים עם מילון, כמו ספירת פאסטים)"""
+        return {
+            "q": self.q,
+            "location": self.location,
+            "location_ids": self.location_ids,
+            "car_ids": self.car_ids,
+            "car_type": self.car_type,
+            "transmission": self.transmission,
+            "max_price": self.max_price,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "available_only": self.available_only,
+        }
+
+
+class CarQueryEngine:
+    """הרצת CarQuery מול backend: עימוד keyset, cursor וספירת פאסטים באותה צורה לכל ה-endpoints.
+
+    backend מממש query_cars(CarQuery) -> List[Dict] (עד limit שורות, ממוינות לפי מפתח המיון),
+    count_cars(CarQuery) ו-get_facet_counts(filters). TRUSTED_ROWS על ה-backend מסמן projection שלא צריך ולידציה,
+    ו-pricing (DynamicPricingEngine) מוסיף לכל רכב את effective_rate - המחיר ליום תחילת השאילתה"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.trusted = bool(getattr(backend, "TRUSTED_ROWS", False))
+        self.pricing = getattr(backend, "pricing", None)
+
+    def page(self, query: CarQuery, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """עמוד תוצאות + cursor לעמוד הבא (שולף limit+1 שורות כדי לדעת אם יש עמוד נוסף)"""
+        after = decode_cursor(cursor, query.sort)
+        rows = self.backend.query_cars(replace(query, after=after, limit=query.limit + 1))
+        cars, next_cursor = split_page(rows, query.limit, query.key_fields, query.sort)
+        return self._with_rates(cars, query), next_cursor
+
+    def rows(self, query: CarQuery) -> List[Dict]:
+        """כל התוצאות (או עד limit) בלי cursor"""
+        return self._with_rates(self.backend.query_cars(query), query)
+
+    def count(self, query: CarQuery) -> int:
+        """מספר כל הרכבים שעוברים את הפילטרים (לא רק העמוד) - מהאינדקסים / count(*), בלי לבנות רכבים"""
+        return self.backend.count_cars(replace(query, after=None, limit=None))
+
+    def total(self, query: CarQuery, page: Sequence[Dict], next_cursor: Optional[str]) -> int:
+        """סך ההתאמות לעמוד הראשון - העמוד עצמו כשאין עמוד נוסף, אחרת ספירה"""
+        return len(page) if next_cursor is None else self.count(query)
+
+    def daily_rates(self, cars: Sequence[Dict], start: date, end: date):
+        """מחירים לפי יום (n, ימים) מהמטריצה הדינמית, או None אם אין מחירים דינמיים"""
+        if self.pricing is None:
+            return None
+        return self.pricing.daily_rates(cars, start, end)
+
+    def facets(self, query: CarQuery) -> Dict[str, Dict]:
+        """ספירות הפאסטים של השאילתה (לא תלויות בעמוד)"""
+        return self.backend.get_facet_counts(query.filters())
+
+    def _with_rates(self, rows: List[Dict], query: CarQuery) -> List[Dict]:
+        """effective_rate לכל רכב - קריאה מהמטריצה בלבד (daily_rate כשאין מחיר דינמי לרכב/ליום)"""
+        if query.fields is not None and "effective_rate" not in query.fields:
+            return rows
+        day = query.start_date or date.today()
+        for row in rows:
+            rate = self.pricing.rate(row["id"], day) if self.pricing is not None else None
+            row["effective_rate"] = rate if rate is not None else row.get("daily_rate")
+        return rows
@@ -0,0 +1,248 @@
+"""
+תמחור דינמי - מחיר יומי אפקטיבי לכל רכב ולכל יום בחלון קדימה, לפי תפוסה, ביקוש וזמן עד ההשכרה
+- תפוסה: אחוז הרכבים המוזמנים בסניף של הרכב באותו יום
+- ביקוש: חיפושים לסניף בשבוע האחרון (מאנליטיקת החיפושים, שנבנית מיומן החיפושים) ביחס לממוצע
+- זמן עד ההשכרה: תוספת להזמנות של הרגע האחרון
+החישוב רץ כ-batch וקטורי (NumPy) על כל הצי והלוח ונשמר במטריצה קומפקטית (אגורות, int32):
+שורה לכל רכב, עמודה לכל יום. בקשות רק קוראות מהמטריצה - בלי חישוב לכל בקשה
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.booking_calendar import to_date
+from core.car_query import CarQuery
+
+# חלון המחירים קדימה (ימים) ותדירות החישוב מחדש
+HORIZON_DAYS = 90
+RECOMPUTE_INTERVAL_S = 15 * 60
+
+# תפוסה: כל 10% מעל היעד מוסיפים 5% (ומתחת ליעד מורידים)
+TARGET_OCCUPANCY = 0.6
+OCCUPANCY_WEIGHT = 0.5
+
+# ביקוש: סניף עם פי 2 חיפושים מהממוצע מקבל 10% (היחס מוגבל ל-MAX_DEMAND_RATIO)
+DEMAND_WINDOW_DAYS = 7
+DEMAND_WEIGHT = 0.1
+MAX_DEMAND_RATIO = 3.0
+
+# רגע אחרון: עד 10% ביום ההשכרה, יורד לינארית עד LAST_MINUTE_DAYS ימים לפני
+LAST_MINUTE_DAYS = 7
+LAST_MINUTE_PREMIUM = 0.10
+
+# גבולות המכפיל הכולל ביחס למחיר הבסיס
+MIN_MULTIPLIER = 0.85
+MAX_MULTIPLIER = 1.5
+
+
+class RateMatrix:
+    """מטריצת המחירים האפקטיביים: rates[רכב, יום] באגורות, מהיום start ל-horizon ימים.
+    base - מחיר הבסיס של כל רכב בזמן החישוב (לעדכון שורה כשהמחיר משתנה)"""
+
+    def __init__(self, car_ids: Sequence[str], start: date, rates: np.ndarray, base: np.ndarray,
+                 computed_at: Optional[datetime] = None):
+        self.car_ids = list(car_ids)
+        self.start = start
+        self.rates = rates
+        self.base = base
+        self.computed_at = computed_at or datetime.now()
+        self._index = {car_id: row for row, car_id in enumerate(self.car_ids)}
+
+    @property
+    def horizon(self) -> int:
+        return self.rates.shape[1]
+
+    def rate(self, car_id, day) -> Optional[float]:
+        """המחיר האפקטיבי של רכב ביום (None מחוץ לחלון או לרכב שלא במטריצה)"""
+        row = self._index.get(str(car_id))
+        offset = (to_date(day) - self.start).days
+        if row is None or not 0 <= offset < self.horizon:
+            return None
+        return int(self.rates[row, offset]) / 100
+
+    def daily_rates(self, cars: Sequence[Dict], start, end) -> np.ndarray:
+        """מחירים לפי יום (n, ימים) לרכבים בטווח [start, end).
+        ימים מחוץ לחלון ורכבים שלא במטריצה מקבלים את daily_rate של הרכב"""
+        start, end = to_date(start), to_date(end)
+        offsets = np.arange((start - self.start).days, (end - self.start).days)
+        base = np.fromiter((float(car["daily_rate"]) for car in cars), dtype=np.float64, count=len(cars))
+        rates = np.repeat(base[:, None], len(offsets), axis=1)
+
+        rows = np.fromiter((self._index.get(str(car["id"]), -1) for car in cars), dtype=np.int64, count=len(cars))
+        known = rows >= 0
+        in_window = (offsets >= 0) & (offsets < self.horizon)
+        if known.any() and in_window.any():
+            rates[np.ix_(known, in_window)] = self.rates[np.ix_(rows[known], offsets[in_window])] / 100
+        return rates
+
+    def with_base_rate(self, car_id, daily_rate: float) -> "RateMatrix":
+        """מטריצה חדשה שבה השורה של הרכב מחושבת ממחיר בסיס חדש עם אותם מכפילים (העתקה - קוראים
+        במקביל ממשיכים לראות את המטריצה הקודמת שלמה)"""
+        row = self._index.get(str(car_id))
+        daily_rate = float(daily_rate)
+        if row is None or self.base[row] == daily_rate:
+            return self
+        rates, base = self.rates.copy(), self.base.copy()
+        if base[row] > 0:
+            rates[row] = np.rint(rates[row] * (daily_rate / base[row])).astype(np.int32)
+        else:
+            rates[row] = int(round(daily_rate * 100))
+        base[row] = daily_rate
+        return RateMatrix(self.car_ids, self.start, rates, base, self.computed_at)
+
+    def stats(self) -> Dict:
+        return {
+            "cars": len(self.car_ids),
+            "start": self.start.isoformat(),
+            "horizon_days": self.horizon,
+            "bytes": int(self.rates.nbytes),
+            "computed_at": self.computed_at.isoformat(),
+        }
+
+
+def compute_rate_matrix(cars: Sequence[Dict], bookings: Iterable[Tuple[str, date, date]],
+                        demand: Dict[str, int], today: date, horizon: int = HORIZON_DAYS) -> RateMatrix:
+    """חישוב המטריצה לכל הצי בבת אחת.
+    cars: [{id, daily_rate, location_id}], bookings: (מזהה רכב, התחלה, סיום), demand: מיקום -> חיפושים"""
+    car_ids = [str(car["id"]) for car in cars]
+    base = np.fromiter((float(car["daily_rate"]) for car in cars), dtype=np.float64, count=len(cars))
+    # רכבים בלי מיקום קנוני נספרים יחד בסניף "ריק"
+    locations, car_location = np.unique([car.get("location_id") or "" for car in cars], return_inverse=True)
+    car_location = car_location.reshape(-1)
+    fleet = np.bincount(car_location, minlength=len(locations))
+
+    # תפוסה לפי סניף ויום - מערך הפרשים (+1 ביום ההתחלה, -1 ביום הסיום) ו-cumsum
+    row_of = {car_id: row for row, car_id in enumerate(car_ids)}
+    booked = [(row_of[str(car_id)], (to_date(start) - today).days, (to_date(end) - today).days)
+              for car_id, start, end in bookings if str(car_id) in row_of]
+    delta = np.zeros((len(locations), horizon + 1), dtype=np.int64)
+    if booked:
+        rows, starts, ends = (np.array(column, dtype=np.int64) for column in zip(*booked))
+        booking_location = car_location[rows]
+        np.add.at(delta, (booking_location, np.clip(starts, 0, horizon)), 1)
+        np.add.at(delta, (booking_location, np.clip(ends, 0, horizon)), -1)
+    occupancy = np.cumsum(delta, axis=1)[:, :horizon] / np.maximum(fleet, 1)[:, None]
+    occupancy_factor = 1 + OCCUPANCY_WEIGHT * (np.clip(occupancy, 0, 1) - TARGET_OCCUPANCY)
+
+    # ביקוש לסניף ביחס לממוצע הסניפים (1 כשאין חיפושים)
+    searches = np.array([demand.get(location, 0) for location in locations], dtype=np.float64)
+    mean = searches.mean() if len(searches) else 0.0
+    ratio = np.clip(searches / mean, 0, MAX_DEMAND_RATIO) if mean > 0 else np.ones_like(searches)
+    demand_factor = 1 + DEMAND_WEIGHT * (ratio - 1)
+
+    lead = np.arange(horizon)
+    lead_factor = 1 + LAST_MINUTE_PREMIUM * np.clip(1 - lead / LAST_MINUTE_DAYS, 0, 1)
+
+    multipliers = np.clip(occupancy_factor * demand_factor[:, None] * lead_factor[None, :],
+                          MIN_MULTIPLIER, MAX_MULTIPLIER)
+    rates = np.rint(base[:, None] * multipliers[car_location] * 100).astype(np.int32)
+    return RateMatrix(car_ids, today, rates, base)
+
+
+class DynamicPricingEngine:
+    """חישוב המטריצה ברקע מעל backend (PostgreSQL / Event Store) והגשת המחירים ממנה.
+
+    backend מממש query_cars(CarQuery), get_booked_intervals(start, end) ו-search_analytics.
+    ה-thread מתחיל בגישה הראשונה; עד החישוב הראשון matrix הוא None והמחירים הם daily_rate.
+    שינוי daily_rate של רכב מגיע דרך update_base_rate ומעדכן את השורה שלו מיד"""
+
+    def __init__(self, backend, horizon_days: int = HORIZON_DAYS, interval_s: float = RECOMPUTE_INTERVAL_S):
+        self.backend = backend
+        self.horizon_days = horizon_days
+        self.interval_s = interval_s
+        self.matrix: Optional[RateMatrix] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # עדכוני מחיר בסיס שהגיעו בזמן חישוב - מוחלים על המטריצה החדשה לפני ההחלפה
+        self._rate_updates: Optional[Dict[str, float]] = None
+        # עולה בכל החלפת מטריצה - חלק מגרסת הנתונים של ה-ETag (effective_rate בתשובות)
+        self._matrix_version = 0
+
+    def recompute(self, today: Optional[date] = None) -> RateMatrix:
+        """חישוב מחדש של כל המטריצה (החלפה אטומית של המטריצה הקודמת)"""
+        today = today or date.today()
+        started = time.perf_counter()
+        with self._lock:
+            self._rate_updates = {}
+        # get_booked_intervals ו-location_demand מחזירים עותקים שנלקחו תחת הנעילה של הלוח / האנליטיקה
+        cars = self.backend.query_cars(CarQuery(
+            available_only=False, limit=None, fields=("id", "daily_rate", "location_id")
+        ))
+        bookings = self.backend.get_booked_intervals(today, today + timedelta(days=self.horizon_days))
+        demand = self.backend.search_analytics.location_demand(DEMAND_WINDOW_DAYS)
+        matrix = compute_rate_matrix(cars, bookings, demand, today, self.horizon_days)
+        with self._lock:
+            for car_id, daily_rate in (self._rate_updates or {}).items():
+                matrix = matrix.with_base_rate(car_id, daily_rate)
+            self._rate_updates = None
+            self.matrix = matrix
+            self._matrix_version += 1
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+            self.last_error = None
+        return matrix
+
+    def update_base_rate(self, car_id, daily_rate: float):
+        """daily_rate של רכב השתנה - עדכון השורה שלו במטריצה, כדי שהצעות מחיר, הזמנות ו-effective_rate
+        לא ישתמשו במחיר הישן עד החישוב הבא"""
+        with self._lock:
+            if self._rate_updates is not None:
+                self._rate_updates[str(car_id)] = float(daily_rate)
+            if self.matrix is not None:
+                self.matrix = self.matrix.with_base_rate(car_id, daily_rate)
+                self._matrix_version += 1
+
+    def version(self, today: Optional[date] = None) -> str:
+        """גרסת המחירים ל-ETag: גרסת המטריצה + יום המחיר (effective_rate ללא תאריכים הוא המחיר של היום)"""
+        return f"{self._matrix_version}@{(today or date.today()).isoformat()}"
+
+    def current(self) -> Optional[RateMatrix]:
+        """המטריצה הנוכחית (מפעיל את החישוב ברקע בפעם הראשונה)"""
+        self._ensure_started()
+        return self.matrix
+
+    def rate(self, car_id, day) -> Optional[float]:
+        matrix = self.current()
+        return matrix.rate(car_id, day) if matrix is not None else None
+
+    def daily_rates(self, cars: Sequence[Dict], start, end) -> Optional[np.ndarray]:
+        """מחירים לפי יום לרכבים בטווח, או None אם המטריצה עוד לא חושבה"""
+        matrix = self.current()
+        return matrix.daily_rates(cars, start, end) if matrix is not None else None
+
+    def stats(self) -> Dict:
+        matrix = self.matrix
+        return {
+            "matrix": matrix.stats() if matrix is not None else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "interval_s": self.interval_s,
+        }
+
+    def stop(self):
+        self._stopping.set()
+
+    # ---------- thread החישוב ----------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dynamic-pricing", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.recompute()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"שגיאה בחישוב מחירים דינמיים: {e}")
+            self._stopping.wait(self.interval_s)
@@ -0,0 +1,210 @@
+"""
+ספירות פאסטים לחיפוש רכבים - כמה רכבים יחזרו לכל ערך של סוג, ספק, תיבת הילוכים, מיקום וטווח מחיר
+הספירה נעשית מחיתוך bitmaps (ערך -> רכבים, core.bitmap_index) ולא בשאילתה נפרדת לכל פאסט
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from core.bitmap_index import BitmapIndex, popcount
+from core.fleet_stats import PRICE_BUCKETS, price_bucket_labels
+from core.locations import resolve_location
+
+# הפאסטים שמוחזרים עם תוצאות החיפוש
+FACETS = ("car_type", "supplier", "transmission", "location", "price")
+
+# גדול מכל מזהה רכב (str) - גבול עליון ל-bisect על (מחיר, מזהה)
+_MAX_KEY = "\U0010ffff"
+
+
+def facet_values(car_data: Dict, price_bounds: Sequence[float]) -> Dict[str, object]:
+    """ערכי הפאסטים של רכב - מיקום לפי המזהה הקנוני, מחיר לפי מספר הטווח"""
+    return {
+        "car_type": car_data.get("car_type") or None,
+        "supplier": car_data.get("supplier") or None,
+        "transmission": car_data.get("transmission") or None,
+        "location": car_data.get("location_id") or car_data.get("location") or None,
+        "price": bisect_right(price_bounds, float(car_data.get("daily_rate") or 0)),
+    }
+
+
+def sort_facets(counts: Dict[str, Dict], price_labels: Sequence[str],
+                facets: Sequence[str] = FACETS) -> Dict[str, Dict]:
+    """סידור התשובה: ערכים לפי כמות (יורד), טווחי מחיר לפי סדר הטווחים עם השם שלהם.
+    facets - הפאסטים שה-backend יודע לספור (פאסט שלא מחושב לא מוחזר, במקום ספירה ריקה)"""
+    result = {}
+    for facet in facets:
+        values = counts.get(facet, {})
+        if facet == "price":
+            result[facet] = {label: values.get(bucket, 0) for bucket, label in enumerate(price_labels)}
+        else:
+            result[facet] = dict(sorted(values.items(), key=lambda item: (-item[1], str(item[0]))))
+    return result
+
+
+class FacetIndex:
+    """אינדקס הפאסטים מעל BitmapIndex: פאסט -> ערך -> bitmap של הרכבים עם הערך (הזמינות היא תכונה נוספת).
+
+    הספירה היא "דיסג'נקטיבית": הערכים של כל פאסט נספרים בלי הסינון של הפאסט עצמו,
+    כך שבחירת סוג אחד לא מאפסת את שאר הסוגים - רואים כמה רכבים יחזרו אם מחליפים בחירה.
+    אותם bitmaps משמשים את החיפוש (match), וסדרי המיון השמורים (מזהה, מחיר) מאפשרים לקרוא עמוד
+    בהדרגה מה-cursor והלאה (iter_sorted) בלי לפענח ולמיין את כל הרכבים המתאימים"""
+
+    ATTRIBUTES = FACETS + ("fuel_type", "available")
+
+    def __init__(self, price_buckets: Sequence[float] = PRICE_BUCKETS):
+        self._bitmaps = BitmapIndex(self.ATTRIBUTES)
+        self._prices: Dict[object, float] = {}
+        # סדרי מיון של כל הרכבים באינדקס: [(מזהה,)] ו-[(מחיר, מזהה)] - אותם מפתחות כמו ב-cursor
+        self._by_id: List[tuple] = []
+        self._by_rate: List[tuple] = []
+        self.set_price_buckets(price_buckets)
+
+    def __len__(self) -> int:
+        """כל הרכבים באינדקס (זמינים ולא זמינים) - אורך סדרי המיון שעליהם עובר iter_sorted"""
+        return len(self._by_id)
+
+    def available_count(self) -> int:
+        """מספר הרכבים הזמינים"""
+        return popcount(self.available_bits())
+
+    def set_price_buckets(self, bounds: Sequence[float]):
+        """החלפת גבולות טווחי המחיר וחלוקה מחדש של הרכבים"""
+        self.price_bounds = tuple(sorted(float(bound) for bound in bounds))
+        self.price_labels = price_bucket_labels(self.price_bounds)
+        for car_id, price in self._prices.items():
+            values = dict(self._bitmaps.values(car_id), price=bisect_right(self.price_bounds, price))
+            self._bitmaps.set_values(car_id, values)
+
+    # ---------- עדכון ----------
+
+    def upsert_car(self, car_id, car_data: Dict):
+        """הוספה או החלפה של רכב (מצב מלא)"""
+        price = float(car_data.get("daily_rate") or 0)
+        values = facet_values(car_data, self.price_bounds)
+        values["fuel_type"] = car_data.get("fuel_type") or None
+        values["available"] = bool(car_data.get("available", True))
+        self._bitmaps.set_values(car_id, values)
+
+        old_price = self._prices.get(car_id)
+        if old_price is None:
+            insort(self._by_id, (car_id,))
+        elif old_price != price:
+            self._remove_key(self._by_rate, (old_price, car_id))
+        if old_price != price:
+            insort(self._by_rate, (price, car_id))
+        self._prices[car_id] = price
+
+    def update_car(self, car_id, changes: Dict):
+        """עדכון חלקי - רק אם השתנה שדה של פאסט, הדלק או הזמינות"""
+        values = self._bitmaps.values(car_id)
+        if values is None:
+            return
+        fields = ("car_type", "supplier", "transmission", "fuel_type", "location", "location_id",
+                  "daily_rate", "available")
+        if not any(field in changes for field in fields):
+            return
+        car_data = {facet: value for facet, value in values.items() if facet != "price"}
+        car_data.update(location_id=values["location"], daily_rate=self._prices[car_id])
+        if "location" in changes and "location_id" not in changes:
+            car_data["location_id"] = resolve_location(changes["location"])
+        car_data.update({field: changes[field] for field in fields if field in changes})
+        self.upsert_car(car_id, car_data)
+
+    def remove_car(self, car_id):
+        """הסרת רכב מהאינדקס"""
+        price = self._prices.pop(car_id, None)
+        if price is None:
+            return
+        self._bitmaps.remove_car(car_id)
+        self._remove_key(self._by_id, (car_id,))
+        self._remove_key(self._by_rate, (price, car_id))
+
+    def clear(self):
+        self._bitmaps.clear()
+        self._prices.clear()
+        self._by_id.clear()
+        self._by_rate.clear()
+
+    # ---------- שאילתות ----------
+
+    def available_bits(self) -> int:
+        """bitmap של כל הרכבים הזמינים"""
+        return self._bitmaps.bitmap("available", True)
+
+    def all_bits(self) -> int:
+        """bitmap של כל הרכבים באינדקס (גם לא זמינים)"""
+        return self._bitmaps.all_cars
+
+    def price(self, car_id) -> float:
+        """המחיר היומי של רכב (גם רכב לא זמין)"""
+        return self._prices[car_id]
+
+    def bitmap(self, facet: str, value) -> int:
+        """ה-bitmap של ערך פאסט / תכונה"""
+        return self._bitmaps.bitmap(facet, value)
+
+    def bits(self, car_ids: Iterable) -> int:
+        """bitmap של קבוצת מזהים (תוצאת חיפוש טקסט, רכבים פנויים בתאריכים)"""
+        return self._bitmaps.bits(car_ids)
+
+    def ids(self, bits: int) -> List:
+        return self._bitmaps.ids(bits)
+
+    def match(self, equals: Dict[str, object]) -> int:
+        """AND של ערכי התכונות (core.bitmap_index.BitmapIndex.match)"""
+        return self._bitmaps.match(equals)
+
+    def match_ids(self, equals: Dict[str, object]) -> set:
+        return set(self._bitmaps.ids(self._bitmaps.match(equals)))
+
+    def price_bits(self, max_price: float) -> int:
+        """bitmap של הרכבים במחיר יומי עד max_price (מהסדר לפי מחיר - רק הרכבים שעד המחיר)"""
+        end = bisect_right(self._by_rate, (float(max_price), _MAX_KEY))
+        return self._bitmaps.bits(key[1] for key in self._by_rate[:end])
+
+    def iter_sorted(self, sort: str, bits: int, after: Optional[Sequence] = None,
+                    max_price: Optional[float] = None) -> Iterator:
+        """מזהי הרכבים שב-bits לפי סדר המיון ("id" / "rate"), מהמפתח שאחרי after והלאה.
+        הבדיקה נעשית תוך כדי מעבר - מי שלוקח עמוד עוצר אחרי limit רכבים"""
+        keys = self._by_rate if sort == "rate" else self._by_id
+        start = bisect_right(keys, tuple(after)) if after is not None else 0
+        if max_price is None:
+            ordered = (keys[i][-1] for i in range(start, len(keys)))
+        elif sort == "rate":
+            end = max(start, bisect_right(keys, (float(max_price), _MAX_KEY)))
+            ordered = (keys[i][-1] for i in range(start, end))
+        else:
+            prices = self._prices
+            ordered = (keys[i][0] for i in range(start, len(keys)) if prices[keys[i][0]] <= max_price)
+        return self._bitmaps.filter_ids(bits, ordered)
+
+    def counts(self, base: Optional[int] = None, filters: Optional[Dict[str, int]] = None,
+               available_only: bool = True) -> Dict[str, Dict]:
+        """ספירות הפאסטים (popcount של AND בין bitmaps).
+        base - bitmap של הרכבים שעברו את הסינון שאינו פאסט (חיפוש חופשי, תאריכים), None = כל הרכבים הזמינים.
+        filters - פאסט -> bitmap של הרכבים שעוברים את הסינון שלו (למשל car_type -> bitmap("car_type", "suv"))"""
+        filters = filters or {}
+        universe = self.available_bits() if available_only else self.all_bits()
+        if base is not None:
+            universe &= base
+        counts = {}
+        for facet in FACETS:
+            candidates = universe
+            for other, bits in filters.items():
+                if other != facet:
+                    candidates &= bits
+            counts[facet] = {}
+            if not candidates:
+                continue
+            for value, bits in self._bitmaps.bitmaps(facet).items():
+                count = popcount(bits & candidates)
+                if count:
+                    counts[facet][value] = count
+        return sort_facets(counts, self.price_labels)
+
+    @staticmethod
+    def _remove_key(keys: List[tuple], key: tuple):
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
@@ -0,0 +1,155 @@
+"""
+סטטיסטיקות צי מתוחזקות בהדרגה - מונים לפי סוג, מיקום וטווח מחיר
+המונים מתעדכנים מכל אירוע/כתיבה של רכב, כך שקריאת סטטיסטיקה לא סורקת את הצי
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from core.locations import location_name, resolve_location
+
+# גבולות טווחי המחיר ברירת המחדל (מחיר יומי) - 0-150, 150-250, 250-350, 350-450, 450+
+PRICE_BUCKETS = (150, 250, 350, 450)
+
+
+def price_bucket_labels(bounds: Sequence[float]) -> List[str]:
+    """שמות הטווחים לפי הגבולות"""
+    edges = [0] + list(bounds)
+    labels = [f"{_format_bound(low)}-{_format_bound(high)}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"{_format_bound(edges[-1])}+")
+    return labels
+
+
+def _format_bound(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+class FleetStats:
+    """מונים מצטברים של הצי.
+    available_only=True - סופרים רק רכבים זמינים (כמו הסטטיסטיקות של PostgreSQL)"""
+
+    def __init__(self, price_buckets: Sequence[float] = PRICE_BUCKETS, available_only: bool = False):
+        self.available_only = available_only
+        # מזהה רכב -> (סוג, מיקום, מחיר, זמין) לכל רכב קיים (גם כזה שלא נספר)
+        self._cars: Dict[str, tuple] = {}
+        self._counted = 0
+        self.by_type: Counter = Counter()
+        self.by_location: Counter = Counter()
+        self.by_price: Counter = Counter()
+        self._views: Dict[str, Dict] = {}
+        self.set_price_buckets(price_buckets)
+
+    def __len__(self) -> int:
+        return self._counted
+
+    # ---------- הגדרות ----------
+
+    def set_price_buckets(self, bounds: Sequence[float]):
+        """החלפת גבולות טווחי המחיר (ממוינים, חיוביים) וחלוקה מחדש של הרכבים הקיימים"""
+        bounds = tuple(sorted(float(bound) for bound in bounds))
+        if not bounds or bounds[0] <= 0 or len(set(bounds)) != len(bounds):
+            raise ValueError("גבולות טווחי המחיר חייבים להיות חיוביים ושונים זה מזה")
+        self.price_bounds = bounds
+        self.price_labels = price_bucket_labels(bounds)
+        self.by_price = Counter({label: 0 for label in self.price_labels})
+        for key in self._cars.values():
+            if self._is_counted(key):
+                self.by_price[self.price_label(key[2])] += 1
+        self._views.clear()
+
+    def price_label(self, price) -> str:
+        """שם הטווח של מחיר יומי"""
+        return self.price_labels[bisect_right(self.price_bounds, float(price or 0))]
+
+    # ---------- עדכון ----------
+
+    def upsert_car(self, car_id, car_data: Dict):
+        """הוספה או החלפה של רכב (מצב מלא של הרכב).
+        מיקום מוכר נספר לפי השם הקנוני שלו - "Tel Aviv" ו"תל אביב" באותו מונה"""
+        location = car_data.get("location")
+        canonical = location_name(car_data.get("location_id") or resolve_location(location))
+        self._set(str(car_id), (
+            car_data.get("car_type") or "unknown",
+            canonical or location or "unknown",
+            float(car_data.get("daily_rate") or 0),
+            bool(car_data.get("available", True)),
+        ))
+
+    def update_car(self, car_id, changes: Dict):
+        """עדכון חלקי - רק אם השתנה שדה שנספר (סוג, מיקום, מחיר, זמינות)"""
+        car_id = str(car_id)
+        key = self._cars.get(car_id)
+        if key is None:
+            return
+        fields = ("car_type", "location", "daily_rate", "available")
+        if not any(field in changes for field in fields):
+            return
+        current = dict(zip(fields, key))
+        current.update({field: changes[field] for field in fields if field in changes})
+        self.upsert_car(car_id, current)
+
+    def remove_car(self, car_id):
+        """הסרת רכב מהמונים (מחיקה)"""
+        self._set(str(car_id), None)
+
+    def clear(self):
+        """איפוס כל המונים"""
+        self._cars.clear()
+        self._counted = 0
+        self.by_type.clear()
+        self.by_location.clear()
+        self.by_price = Counter({label: 0 for label in self.price_labels})
+        self._views.clear()
+
+    # ---------- קריאה ----------
+    # כל תצוגה נבנית פעם אחת אחרי שינוי ונשמרת עד השינוי הבא
+
+    def cars_by_type(self) -> Dict:
+        """רכבים לפי סוג - {"data": [{"type", "count"}], "total_cars"}"""
+        return self._view("type", lambda: {
+            "data": [{"type": car_type, "count": count} for car_type, count in self.by_type.most_common()],
+            "total_cars": self._counted,
+        })
+
+    def cars_by_location(self) -> Dict:
+        """רכבים לפי מיקום - {"data": [{"location", "count"}], "total_locations"}"""
+        return self._view("location", lambda: {
+            "data": [{"location": location, "count": count} for location, count in self.by_location.most_common()],
+            "total_locations": len(self.by_location),
+        })
+
+    def price_ranges(self) -> Dict:
+        """רכבים לפי טווח מחיר (בסדר הטווחים) - {"data": [{"range", "count"}]}"""
+        return self._view("price", lambda: {
+            "data": [{"range": label, "count": self.by_price[label]} for label in self.price_labels],
+        })
+
+    # ---------- עזרים פנימיים ----------
+
+    def _is_counted(self, key: tuple) -> bool:
+        return key[3] or not self.available_only
+
+    def _set(self, car_id: str, key: Optional[tuple]):
+        old = self._cars.pop(car_id, None)
+        if old is not None and self._is_counted(old):
+            self._count(old, -1)
+        if key is not None:
+            self._cars[car_id] = key
+            if self._is_counted(key):
+                self._count(key, 1)
+        self._views.clear()
+
+    def _count(self, key: tuple, delta: int):
+        self._counted += delta
+        self.by_price[self.price_label(key[2])] += delta
+        for counter, value in ((self.by_type, key[0]), (self.by_location, key[1])):
+            counter[value] += delta
+            if counter[value] <= 0:
+                del counter[value]
+
+    def _view(self, name: str, build) -> Dict:
+        view: Optional[Dict] = self._views.get(name)
+        if view is None:
+            view = self._views[name] = build()
+        return view
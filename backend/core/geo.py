@@ -0,0 +1,97 @@
+"""
+חיפוש גאוגרפי של סניפים - אינדקס מרחבי (k-d tree) על קואורדינטות המיקומים הקנוניים
+הנקודות נשמרות כווקטורי יחידה תלת-ממדיים, כך שמרחק אוקלידי בעץ מתאים למרחק על פני כדור הארץ
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from core.locations import LOCATIONS
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    # בלי scipy - סריקה לינארית (מספר הסניפים קטן)
+    cKDTree = None
+    SCIPY_AVAILABLE = False
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class InvalidCoordinatesError(ValueError):
+    """קואורדינטות לא תקינות"""
+
+
+def validate_point(lat: float, lon: float) -> Tuple[float, float]:
+    """בדיקת קו רוחב/אורך"""
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise InvalidCoordinatesError("קואורדינטות לא תקינות (קו רוחב -90..90, קו אורך -180..180)")
+    return lat, lon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """מרחק על פני כדור הארץ בק"מ"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_length(distance_km: float) -> float:
+    """מרחק על הכדור -> אורך המיתר על כדור יחידה (המרחק בעץ)"""
+    return 2 * math.sin(min(distance_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class BranchIndex:
+    """אינדקס מרחבי של סניפים: הסניפים הקרובים לנקודה / הסניפים ברדיוס"""
+
+    def __init__(self, locations: Optional[Dict[str, Dict]] = None):
+        locations = LOCATIONS if locations is None else locations
+        self._ids: List[str] = [location_id for location_id, entry in locations.items() if entry.get("coords")]
+        self._coords: List[Tuple[float, float]] = [locations[location_id]["coords"] for location_id in self._ids]
+        self._tree = cKDTree([_unit_vector(*point) for point in self._coords]) if cKDTree and self._ids else None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def nearest(self, lat: float, lon: float, k: Optional[int] = None,
+                max_km: Optional[float] = None) -> List[Tuple[str, float]]:
+        """הסניפים הקרובים ביותר - רשימת (מזהה מיקום, מרחק בק"מ) ממוינת לפי מרחק.
+        k - מספר סניפים מקסימלי (None = כולם), max_km - רק סניפים ברדיוס"""
+        if not self._ids:
+            return []
+        k = len(self._ids) if k is None else min(k, len(self._ids))
+        if k <= 0:
+            return []
+
+        if self._tree is not None:
+            bound = _chord_length(max_km) if max_km is not None else math.inf
+            _, indexes = self._tree.query(_unit_vector(lat, lon), k=k, distance_upper_bound=bound)
+            indexes = [indexes] if k == 1 else list(indexes)
+            # אינדקס == len מסמן "אין עוד סניפים בטווח"
+            candidates = [i for i in indexes if i < len(self._ids)]
+        else:
+            candidates = range(len(self._ids))
+
+        results = []
+        for i in candidates:
+            distance = haversine_km(lat, lon, *self._coords[i])
+            if max_km is None or distance <= max_km:
+                results.append((self._ids[i], round(distance, 2)))
+        results.sort(key=lambda item: item[1])
+        return results[:k]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, float]]:
+        """כל הסניפים ברדיוס radius_km מהנקודה, ממוינים לפי מרחק"""
+        return self.nearest(lat, lon, k=None, max_km=radius_km)
+
+
+# אינדקס הסניפים של המילון הקנוני
+branch_index = BranchIndex()
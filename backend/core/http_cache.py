@@ -0,0 +1,40 @@
+"""
+Conditional GET - ETag חזק לפי גרסת הנתונים ותשובות 304 Not Modified
+כך polling של לקוחות על נתונים שלא השתנו לא מחשב ולא מעביר את התשובה מחדש
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def compute_etag(version: str, request: Request) -> str:
+    """ETag חזק: גרסת הנתונים + גרסת ה-API + הנתיב והפרמטרים של הבקשה"""
+    query = sorted(request.query_params.multi_items())
+    key = f"{version}|{request.app.version}|{request.url.path}|{query}"
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """בדיקת If-None-Match (השוואה חלשה, כנדרש ב-RFC 7232)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def conditional_get(request: Request, response: Response, version: Optional[str]) -> Optional[Response]:
+    """מחזיר תשובת 304 אם ה-ETag של הלקוח עדכני.
+    אחרת מוסיף ETag לתשובה ומחזיר None - וה-endpoint ממשיך כרגיל"""
+    if version is None:
+        return None
+    etag = compute_etag(version, request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,191 @@
+"""
+עדכונים בזמן אמת ללקוחות (Server-Sent Events) במקום polling
+- ChangeFeed: ה-backend מפרסם שינוי (רכב / זמינות) אחרי commit
+- LiveUpdates: מפיץ כל שינוי לכל החיבורים הפתוחים - ההודעה מקודדת פעם אחת לכל המנויים,
+  סטטיסטיקות הצי נשלחות פעם אחת לכל רצף שינויים, וסטטוס שרת ה-AI נבדק בשרת ונשלח רק כשהוא משתנה
+לקוח שמתחבר מחדש עם Last-Event-ID מקבל את ההודעות שפספס מהחוצץ, או resync אם הן כבר לא בחוצץ
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+# סוגי ההודעות בערוץ
+CAR = "car"                    # רכב נוסף / עודכן / נמחק
+AVAILABILITY = "availability"  # הזמנה חדשה או ביטול - שינוי בזמינות רכב בטווח תאריכים
+STATS = "stats"                # מוני הצי (רכבים לפי סוג)
+STATUS = "status"              # סטטוס שרת ה-AI
+RESYNC = "resync"              # הלקוח פספס הודעות - צריך לטעון הכול מחדש
+
+
+def format_event(event_type: str, payload: Dict, event_id: Optional[int] = None) -> bytes:
+    """הודעת SSE אחת (id, event, data)"""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event_type}")
+    lines.append("data: " + json.dumps(payload, ensure_ascii=False, default=str, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class ChangeFeed:
+    """רשימת מנויים לשינויים של backend - publish נקרא מה-thread שביצע את ה-commit"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, change: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"שגיאה בהפצת שינוי: {e}")
+
+
+class LiveUpdates:
+    """מפיץ ההודעות לחיבורי ה-SSE.
+
+    stats_provider - מוני הצי הנוכחיים (נשלחים אחרי שינויים, ובתחילת כל חיבור).
+    status_provider - בדיקת סטטוס AI (חוסמת, רצה ב-thread) כל status_interval שניות כשיש מנויים"""
+
+    def __init__(self, stats_provider: Callable[[], Dict], status_provider: Optional[Callable[[], Dict]] = None,
+                 buffer_size: int = 1000, queue_size: int = 256, stats_delay: float = 0.5,
+                 status_interval: float = 30.0, keepalive: float = 15.0):
+        self.stats_provider = stats_provider
+        self.status_provider = status_provider
+        self.queue_size = queue_size
+        self.stats_delay = stats_delay
+        self.status_interval = status_interval
+        self.keepalive = keepalive
+        self._buffer: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size)
+        self._subscribers: Dict[asyncio.Queue, bool] = {}  # תור -> האם פספס הודעות (התור התמלא)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_id = 0
+        self._stats_pending = False
+        self._status: Optional[Dict] = None
+        self._status_task: Optional[asyncio.Task] = None
+        # מונים
+        self.published = 0
+        self.overflows = 0
+
+    # ---------- צד ה-backend (כל thread) ----------
+
+    def publish(self, change: Dict):
+        """שינוי מה-ChangeFeed - מועבר ללולאת ה-asyncio (בלי מנויים אין מה לשלוח)"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch, change)
+
+    # ---------- צד החיבורים (לולאת ה-asyncio) ----------
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """זרם ה-SSE של חיבור אחד"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = False
+        self._ensure_status_monitor()
+        try:
+            yield b"retry: 3000\n\n"
+            for message in self._replay(last_event_id):
+                yield message
+            # מצב התחלתי - סטטיסטיקות וסטטוס AI (בלי id, לא נשמרים בחוצץ)
+            yield format_event(STATS, self.stats_provider())
+            if self._status is not None:
+                yield format_event(STATUS, self._status)
+
+            while True:
+                if self._subscribers.get(queue):
+                    # התור התמלא - הלקוח איטי, ההודעות שפוספסו לא יישלחו
+                    while not queue.empty():
+                        queue.get_nowait()
+                    self._subscribers[queue] = False
+                    yield format_event(RESYNC, {"reason": "overflow"}, self._last_id)
+                    continue
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self._subscribers.pop(queue, None)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "last_event_id": self._last_id,
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
+
+    # ---------- עזרים פנימיים ----------
+
+    def _replay(self, last_event_id: Optional[str]) -> List[bytes]:
+        """ההודעות שאחרי last_event_id מהחוצץ, או resync אם חלק מהן כבר נזרקו"""
+        if not last_event_id:
+            return []
+        try:
+            last_seen = int(last_event_id)
+        except ValueError:
+            return [format_event(RESYNC, {"reason": "invalid_id"}, self._last_id)]
+        if last_seen >= self._last_id:
+            return []
+        if not self._buffer or self._buffer[0][0] > last_seen + 1:
+            return [format_event(RESYNC, {"reason": "expired"}, self._last_id)]
+        return [message for event_id, message in self._buffer if event_id > last_seen]
+
+    def _dispatch(self, change: Dict):
+        self._broadcast(change.get("type", CAR), change)
+        if change.get("type") in (CAR, AVAILABILITY) and not self._stats_pending:
+            # סטטיסטיקות פעם אחת לכל רצף שינויים
+            self._stats_pending = True
+            self._loop.call_later(self.stats_delay, self._flush_stats)
+
+    def _flush_stats(self):
+        self._stats_pending = False
+        try:
+            self._broadcast(STATS, self.stats_provider())
+        except Exception as e:
+            print(f"שגיאה בשליחת סטטיסטיקות: {e}")
+
+    def _broadcast(self, event_type: str, payload: Dict):
+        self._last_id += 1
+        message = format_event(event_type, payload, self._last_id)
+        self._buffer.append((self._last_id, message))
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                if not self._subscribers[queue]:
+                    self.overflows += 1
+                self._subscribers[queue] = True
+
+    def _ensure_status_monitor(self):
+        if self.status_provider is None or (self._status_task and not self._status_task.done()):
+            return
+        self._status_task = asyncio.get_running_loop().create_task(self._monitor_status())
+
+    async def _monitor_status(self):
+        """בדיקה אחת לכל השרת (ולא לכל לקוח) - רק כשיש מנויים, ושליחה רק כשהסטטוס משתנה"""
+        while self._subscribers:
+            try:
+                status = await asyncio.to_thread(self.status_provider)
+            except Exception as e:
+                status = {"status": "unavailable", "message": str(e)}
+            if status != self._status:
+                self._status = status
+                self._broadcast(STATUS, status)
+            await asyncio.sleep(self.status_interval)
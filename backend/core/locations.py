@@ -0,0 +1,172 @@
+"""
+מילון מיקומים קנוני - מזהה יציב לכל סניף/עיר עם כינויים בעברית ובאנגלית
+כל מיקום נכנס מתורגם למזהה בזמן הכתיבה, והחיפוש משווה מזהים (אינדקס שוויון) במקום התאמת תת-מחרוזת
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.text_index import tokenize
+
+# מזהה -> שם תצוגה, קואורדינטות הסניף (קו רוחב, קו אורך) וכינויים (השם עצמו והמזהה הם כינויים אוטומטית)
+LOCATIONS: Dict[str, Dict] = {
+    "tel-aviv": {
+        "name": "תל אביב",
+        "coords": (32.0853, 34.7818),
+        "aliases": ["תל אביב יפו", "ת\"א", "Tel Aviv", "Tel-Aviv", "Tel Aviv-Yafo", "Tel Aviv Yafo"],
+    },
+    "jerusalem": {
+        "name": "ירושלים",
+        "coords": (31.7683, 35.2137),
+        "aliases": ["י-ם", "Jerusalem", "Yerushalayim"],
+    },
+    "haifa": {
+        "name": "חיפה",
+        "coords": (32.794, 34.9896),
+        "aliases": ["Haifa", "Hefa"],
+    },
+    "ben-gurion-airport": {
+        "name": "נמל התעופה בן גוריון",
+        "coords": (32.0055, 34.8854),
+        "aliases": ["בן גוריון", "נתב\"ג", "נתבג", "שדה התעופה בן גוריון", "Ben Gurion", "Ben Gurion Airport",
+                    "Ben-Gurion Airport", "TLV", "TLV Airport"],
+    },
+    "eilat": {
+        "name": "אילת",
+        "coords": (29.5577, 34.9519),
+        "aliases": ["Eilat", "Elat"],
+    },
+    "beer-sheva": {
+        "name": "באר שבע",
+        "coords": (31.2518, 34.7913),
+        "aliases": ["ב\"ש", "Beer Sheva", "Be'er Sheva", "Beersheba", "Beer-Sheva", "Beersheva"],
+    },
+    "netanya": {
+        "name": "נתניה",
+        "coords": (32.3215, 34.8532),
+        "aliases": ["Netanya", "Natanya"],
+    },
+    "ashdod": {
+        "name": "אשדוד",
+        "coords": (31.8014, 34.6435),
+        "aliases": ["Ashdod"],
+    },
+    "herzliya": {
+        "name": "הרצליה",
+        "coords": (32.1663, 34.8436),
+        "aliases": ["Herzliya", "Herzlia", "Herzliyya"],
+    },
+}
+
+
+def _alias_key(text: Optional[str]) -> str:
+    """מפתח השוואה לכינוי - אותו נרמול כמו אינדקס הטקסט (אותיות סופיות, גרשיים, רישיות, מקפים)"""
+    return " ".join(tokenize(text))
+
+
+def _build_alias_index() -> Dict[str, str]:
+    index = {}
+    for location_id, entry in LOCATIONS.items():
+        for alias in [location_id, entry["name"], *entry["aliases"]]:
+            index[_alias_key(alias)] = location_id
+    return index
+
+
+# כינוי מנורמל -> מזהה מיקום
+_ALIAS_INDEX = _build_alias_index()
+# אורך הכינוי הארוך ביותר בטוקנים - לחיפוש כינויים בתוך טקסט חופשי
+_MAX_ALIAS_TOKENS = max(len(key.split()) for key in _ALIAS_INDEX)
+
+
+def resolve_location(text: Optional[str]) -> Optional[str]:
+    """מזהה המיקום הקנוני של טקסט מיקום (None אם המיקום לא מוכר)"""
+    if not text:
+        return None
+    return _ALIAS_INDEX.get(_alias_key(text))
+
+
+# אותיות שימוש שנצמדות לשם מקום בעברית (בתל אביב, לחיפה, מירושלים, ומאילת, שבנתניה)
+_HEBREW_PREFIXES = "בלמוש"
+# לכל היותר שתי אותיות שימוש רצופות (ומ, שב, ול)
+_MAX_PREFIX_LETTERS = 2
+
+
+def _strip_prefix(word: str, rest: List[str]) -> Optional[str]:
+    """מזהה המיקום אחרי הסרת אותיות שימוש מתחילת המילה - רק כשהשארית (עם הטוקנים שאחריה) היא כינוי מוכר"""
+    for count in range(1, _MAX_PREFIX_LETTERS + 1):
+        if word[count - 1] not in _HEBREW_PREFIXES or len(word) - count < 2:
+            return None
+        location_id = _ALIAS_INDEX.get(" ".join([word[count:], *rest]))
+        if location_id:
+            return location_id
+    return None
+
+
+def find_location(text: Optional[str]) -> Optional[str]:
+    """המיקום הראשון שמוזכר בטקסט חופשי (למשל שאלה ליועץ) - הכינוי הארוך ביותר גובר"""
+    tokens = tokenize(text)
+    for start in range(len(tokens)):
+        word = tokens[start]
+        for length in range(min(_MAX_ALIAS_TOKENS, len(tokens) - start), 0, -1):
+            rest = tokens[start + 1:start + length]
+            location_id = _ALIAS_INDEX.get(" ".join([word, *rest])) or _strip_prefix(word, rest)
+            if location_id:
+                return location_id
+    return None
+
+
+def location_name(location_id: Optional[str]) -> Optional[str]:
+    """שם התצוגה של מזהה מיקום"""
+    entry = LOCATIONS.get(location_id) if location_id else None
+    return entry["name"] if entry else None
+
+
+def location_coords(location_id: Optional[str]) -> Optional[Tuple[float, float]]:
+    """קואורדינטות הסניף (קו רוחב, קו אורך)"""
+    entry = LOCATIONS.get(location_id) if location_id else None
+    return entry["coords"] if entry else None
+
+
+def location_aliases(location_id: str) -> List[str]:
+    """כל הכינויים של מיקום (כולל השם)"""
+    entry = LOCATIONS[location_id]
+    return [entry["name"], *entry["aliases"]]
+
+
+class LocationIndex:
+    """אינדקס שוויון: מזהה מיקום -> מזהי רכבים"""
+
+    def __init__(self):
+        self._cars: Dict[str, Set] = {}
+        self._locations: Dict[object, str] = {}  # מזהה רכב -> מזהה מיקום
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def set_location(self, car_id, location_id: Optional[str]):
+        """קביעת המיקום של רכב (None = מיקום לא מוכר, הרכב יוצא מהאינדקס)"""
+        self.remove_car(car_id)
+        if location_id:
+            self._cars.setdefault(location_id, set()).add(car_id)
+            self._locations[car_id] = location_id
+
+    def remove_car(self, car_id):
+        """הסרת רכב מהאינדקס"""
+        location_id = self._locations.pop(car_id, None)
+        if location_id is None:
+            return
+        ids = self._cars[location_id]
+        ids.discard(car_id)
+        if not ids:
+            del self._cars[location_id]
+
+    def cars_at(self, location_id: str) -> Set:
+        """מזהי הרכבים במיקום"""
+        return self._cars.get(location_id, set())
+
+    def location_of(self, car_id) -> Optional[str]:
+        """מזהה המיקום של רכב (None = לא באינדקס)"""
+        return self._locations.get(car_id)
+
+    def clear(self):
+        self._cars.clear()
+        self._locations.clear()
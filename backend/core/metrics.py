@@ -0,0 +1,298 @@
+"""
+מדדי ביצועים בפורמט Prometheus (טקסט, /metrics) - בלי תלות חיצונית
+- MetricsMiddleware: לכל route - מספר בקשות לפי סטטוס, בקשות בטיפול והיסטוגרמת זמני תגובה
+- timed / track: זמני קריאות ל-backends (Event Store, PostgreSQL, Trawex, Ollama) ושגיאות,
+  וגם span לכל קריאה כש-tracing פעיל (core.tracing)
+- record_error: שגיאה שנתפסה בתוך קריאה מדודה (מודפסת ומוחזר []/None) - נספרת כמו חריגה
+רישום מדידה הוא חיפוש במילון והוספה למונים תחת נעילה - זניח ביחס לבקשה
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.tracing import mark_error, span
+
+# גבולות הדליים (שניות) - מבקשה מהזיכרון ועד קריאה ל-LLM
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# db.system ל-spans של backends שהם בסיסי נתונים
+DB_SYSTEMS = {"event_store": "sqlite", "postgres": "postgresql"}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """המדד לצירוף ערכי labels (נוצר בפעם הראשונה)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: צפויים labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _render_child(self, key, child) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # הדלי האחרון הוא +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, key, child):
+        counts, total = child.snapshot()
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"מדד כפול: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """כל המדדים בפורמט הטקסט של Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("method",)
+)
+BACKEND_LATENCY = REGISTRY.histogram(
+    "backend_call_duration_seconds", "Latency of calls to storage and external services", ("backend", "operation")
+)
+BACKEND_ERRORS = REGISTRY.counter(
+    "backend_call_errors_total", "Calls to storage and external services that raised or reported an error", ("backend", "operation")
+)
+
+
+# הקריאה המדודה הנוכחית (backend, operation) - ל-record_error מתוך except בפונקציה
+_current_call: ContextVar[Optional[Tuple[str, str]]] = ContextVar("current_backend_call", default=None)
+
+
+@contextmanager
+def track(backend: str, operation: str):
+    """מדידת בלוק קוד כקריאה ל-backend"""
+    latency = BACKEND_LATENCY.labels(backend, operation)
+    started = time.perf_counter()
+    token = _current_call.set((backend, operation))
+    try:
+        with span(f"{backend}.{operation}", _span_attributes(backend, operation)):
+            yield
+    except Exception:
+        BACKEND_ERRORS.labels(backend, operation).inc()
+        raise
+    finally:
+        _current_call.reset(token)
+        latency.observe(time.perf_counter() - started)
+
+
+def record_error(error: Optional[BaseException] = None, backend: Optional[str] = None,
+                 operation: Optional[str] = None):
+    """שגיאה שנתפסה ולא עברה הלאה (למשל except שמדפיס ומחזיר None) - נספרת ב-backend_call_errors_total
+    תחת הקריאה המדודה הנוכחית (timed / track), או תחת backend/operation שניתנו, ומסמנת את ה-span"""
+    call = (backend, operation or "unknown") if backend else _current_call.get()
+    if call is not None:
+        BACKEND_ERRORS.labels(*call).inc()
+    mark_error(error)
+
+
+def _span_attributes(backend: str, operation: str) -> Dict[str, str]:
+    attributes = {"backend": backend, "operation": operation}
+    if backend in DB_SYSTEMS:
+        attributes.update({"db.system": DB_SYSTEMS[backend], "db.operation": operation})
+    return attributes
+
+
+def timed(backend: str, operation: Optional[str] = None) -> Callable:
+    """decorator - מדידת כל קריאה לפונקציה (operation ברירת מחדל: שם הפונקציה)"""
+    def decorator(func):
+        name = operation or func.__name__
+        latency = BACKEND_LATENCY.labels(backend, name)
+        span_name, attributes = f"{backend}.{name}", _span_attributes(backend, name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            token = _current_call.set((backend, name))
+            try:
+                with span(span_name, attributes):
+                    return func(*args, **kwargs)
+            except Exception:
+                BACKEND_ERRORS.labels(backend, name).inc()
+                raise
+            finally:
+                _current_call.reset(token)
+                latency.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware (בלי BaseHTTPMiddleware - לא עוטף את גוף התשובה, כך ש-streaming לא נפגע).
+    ה-route נלקח מתבנית הנתיב שנמצאה (/api/cars/{car_id}), כך שמספר הסדרות חסום;
+    בקשות שלא נמצא להן route נספרות תחת "unmatched" """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, status).inc()
@@ -0,0 +1,52 @@
+"""
+עימוד מבוסס cursor (Keyset Pagination) לרשימות רכבים
+ה-cursor הוא מחרוזת אטומה שמקודדת את מפתח המיון של הפריט האחרון בעמוד
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# גודל עמוד ברירת מחדל ומקסימלי
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# מספר המזהים המקסימלי בבקשת שליפה מרוכזת (batch)
+MAX_BATCH_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """cursor לא תקין או שאינו מתאים לסדר המיון המבוקש"""
+
+
+def encode_cursor(key_values: Sequence[Any], order: str) -> str:
+    """קידוד מפתח המיון של הפריט האחרון ל-cursor אטום"""
+    # default=str שומר על ערכי Decimal מ-PostgreSQL בדיוק מלא
+    payload = json.dumps({"o": order, "k": list(key_values)}, ensure_ascii=False,
+                         separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], order: str) -> Optional[List[Any]]:
+    """פענוח cursor לערכי מפתח המיון (None = עמוד ראשון)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        key_values = payload["k"]
+        cursor_order = payload["o"]
+    except Exception:
+        raise InvalidCursorError("cursor לא תקין")
+    if cursor_order != order or not isinstance(key_values, list):
+        raise InvalidCursorError("cursor לא תואם לסדר המיון של הבקשה")
+    return key_values
+
+
+def split_page(rows: List[Dict], limit: int, key_fields: Tuple[str, ...], order: str) -> Tuple[List[Dict], Optional[str]]:
+    """חיתוך תוצאה שנשלפה עם limit+1 שורות לעמוד + next_cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor([last.get(field) for field in key_fields], order)
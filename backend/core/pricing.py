@@ -0,0 +1,122 @@
+"""
+חישוב מחירי השכרה - תוספת סוף שבוע והנחת השכרה ארוכה
+המחירים של כל הרכבים המועמדים מחושבים במעבר וקטורי אחד (NumPy): מכפיל לכל יום בטווח,
+ומכפלה של וקטור המחירים היומיים (או מטריצת מחירים לפי יום) בווקטור המכפילים
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+# ימי סוף השבוע (date.weekday): שישי ושבת
+WEEKEND_DAYS = (4, 5)
+WEEKEND_SURCHARGE = 0.15
+
+# הנחת השכרה ארוכה: מינימום ימים -> שיעור הנחה (מהגבוה לנמוך)
+LONG_RENTAL_DISCOUNTS = ((30, 0.20), (7, 0.10))
+
+# מספר הרכבים המקסימלי בבקשת הצעת מחיר
+MAX_QUOTE_CARS = 1000
+
+DateLike = Union[date, datetime]
+
+
+class InvalidQuoteError(ValueError):
+    """טווח תאריכים לא תקין להצעת מחיר"""
+
+
+def _day(value: DateLike) -> np.datetime64:
+    return np.datetime64(value.date() if isinstance(value, datetime) else value, "D")
+
+
+def rental_days(start_date: DateLike, end_date: DateLike) -> np.ndarray:
+    """ימי ההשכרה [start, end) כמערך datetime64"""
+    days = np.arange(_day(start_date), _day(end_date))
+    if not len(days):
+        raise InvalidQuoteError("תאריך ההחזרה חייב להיות אחרי תאריך האיסוף")
+    return days
+
+
+def day_multipliers(days: np.ndarray) -> np.ndarray:
+    """מכפיל המחיר לכל יום (1 ביום חול, 1 + תוספת בסוף שבוע)"""
+    # 1970-01-01 (יום 0 של datetime64) היה יום חמישי - weekday 3
+    weekdays = (days.astype(np.int64) + 3) % 7
+    return np.where(np.isin(weekdays, WEEKEND_DAYS), 1.0 + WEEKEND_SURCHARGE, 1.0)
+
+
+def long_rental_discount(days: int) -> float:
+    """שיעור ההנחה לפי אורך ההשכרה"""
+    for min_days, discount in LONG_RENTAL_DISCOUNTS:
+        if days >= min_days:
+            return discount
+    return 0.0
+
+
+def quote_totals(daily_rates, start_date: DateLike, end_date: DateLike) -> Dict[str, np.ndarray]:
+    """מחירים לכל הרכבים בבת אחת.
+
+    daily_rates הוא וקטור מחירים יומיים (n,) או מטריצת מחירים לפי יום (n, ימים).
+    מחזיר מערכים: subtotal (אחרי תוספת סוף שבוע), discount, total - מעוגלים לאגורות"""
+    days = rental_days(start_date, end_date)
+    multipliers = day_multipliers(days)
+    rates = np.asarray(daily_rates, dtype=np.float64)
+
+    if rates.ndim == 1:
+        subtotal = rates * multipliers.sum()
+    else:
+        if rates.shape[1] != len(days):
+            raise InvalidQuoteError("מטריצת המחירים לא מתאימה למספר ימי ההשכרה")
+        subtotal = rates @ multipliers
+
+    subtotal = np.round(subtotal, 2)
+    discount = np.round(subtotal * long_rental_discount(len(days)), 2)
+    return {"subtotal": subtotal, "discount": discount, "total": np.round(subtotal - discount, 2)}
+
+
+def quote_car(daily_rate: float, start_date: DateLike, end_date: DateLike) -> Dict:
+    """מחיר לרכב אחד (להזמנה) - אותם כללים כמו בהצעת מחיר"""
+    totals = quote_totals([daily_rate], start_date, end_date)
+    return {name: float(values[0]) for name, values in totals.items()}
+
+
+def booking_price(daily_rate: float, start_date: DateLike, end_date: DateLike, daily_rates=None) -> Dict:
+    """פירוט המחיר של הזמנה: נתוני הטווח, המחירים שחויבו לכל יום, הממוצע שלהם והסכומים.
+    daily_rates אופציונלי: מחירים לפי יום (מהמטריצה הדינמית) במקום daily_rate קבוע"""
+    rates = [float(daily_rate)] * len(rental_days(start_date, end_date)) if daily_rates is None \
+        else np.asarray(daily_rates, dtype=np.float64).tolist()
+    quote = quote_totals([rates], start_date, end_date)
+    return {
+        **rental_summary(start_date, end_date),
+        "daily_rates": rates,
+        "daily_rate": round(sum(rates) / len(rates), 2),
+        **{name: float(values[0]) for name, values in quote.items()},
+    }
+
+
+def rental_summary(start_date: DateLike, end_date: DateLike) -> Dict:
+    """נתוני הטווח שמשותפים לכל הרכבים בהצעה"""
+    days = rental_days(start_date, end_date)
+    return {
+        "days": len(days),
+        "weekend_days": int((day_multipliers(days) > 1.0).sum()),
+        "discount_rate": long_rental_discount(len(days)),
+    }
+
+
+def sorted_quotes(cars: Sequence[Dict], start_date: DateLike, end_date: DateLike,
+                  daily_rates=None) -> List[Dict]:
+    """הצעות מחיר לרכבים, מהזולה ליקרה (יציב - סדר הרכבים נשמר בין מחירים זהים).
+    daily_rates אופציונלי: מחירים במקום daily_rate של הרכבים (וקטור או מטריצה לפי יום)"""
+    if not cars:
+        return []
+    if daily_rates is None:
+        daily_rates = np.fromiter((car["daily_rate"] for car in cars), dtype=np.float64, count=len(cars))
+    totals = quote_totals(daily_rates, start_date, end_date)
+
+    order = np.argsort(totals["total"], kind="stable")
+    subtotal, discount, total = (totals[name][order].tolist() for name in ("subtotal", "discount", "total"))
+    return [
+        dict(cars[index], subtotal=subtotal[rank], discount=discount[rank], total=total[rank])
+        for rank, index in enumerate(order.tolist())
+    ]
@@ -0,0 +1,228 @@
+"""
+אנליטיקת חיפושים בזרימה (streaming) - מתעדכנת מכל חיפוש, בלי לקרוא את היסטוריית החיפושים
+- ספירות מצטברות לפי דקה, שעה ויום (חלון שמירה קבוע לכל רזולוציה)
+- top-K מיקומים וסוגי רכב: count-min sketch + רשימת heavy hitters
+- הערכת מספר השאילתות השונות: HyperLogLog
+הזיכרון קבוע בכל נפח חיפושים, ו-snapshot() מחזיר תצוגה שמורה עד החיפוש הבא
+"""
+
+import hashlib
+import json
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+
+from core.locations import location_name, resolve_location
+
+
+def _hash64(value: str, salt: bytes = b"") -> int:
+    """hash יציב של 64 ביט (לא תלוי ב-PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8, salt=salt).digest(), "big")
+
+
+class CountMinSketch:
+    """count-min sketch: הערכת תדירות של מפתח בזיכרון קבוע (הערכה לא קטנה מהאמת)"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # double hashing - שני hash-ים מייצרים את כל השורות
+        h1 = _hash64(key)
+        h2 = _hash64(key, salt=b"cms") | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """הוספה - מחזיר את ההערכה המעודכנת"""
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += count
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+
+class HeavyHitters:
+    """top-K לפי count-min sketch: שומרים רק את capacity המפתחות עם ההערכה הגבוהה ביותר"""
+
+    def __init__(self, k: int = 10, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.capacity = 2 * k  # מרווח כדי שמפתחות שעולים לא ייפלטו מוקדם מדי
+        self.sketch = CountMinSketch(width, depth)
+        self._candidates: Dict[str, int] = {}
+
+    def add(self, key: str):
+        estimate = self.sketch.add(key)
+        if key in self._candidates or len(self._candidates) < self.capacity:
+            self._candidates[key] = estimate
+            return
+        weakest = min(self._candidates, key=self._candidates.get)
+        if estimate > self._candidates[weakest]:
+            del self._candidates[weakest]
+            self._candidates[key] = estimate
+
+    def top(self, k: Optional[int] = None) -> Dict[str, int]:
+        """המפתחות השכיחים ביותר עם ההערכה שלהם (יורד)"""
+        ranked = sorted(self._candidates.items(), key=lambda item: (-item[1], item[0]))
+        return dict(ranked[:k or self.k])
+
+
+class HyperLogLog:
+    """הערכת מספר ערכים שונים - 2^p אוגרים של בייט (p=12: 4KB, שגיאה של כ-1.6%)"""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self._registers = bytearray(self.m)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value: str):
+        h = _hash64(value, salt=b"hll")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # טווח קטן - linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class TimeRollup:
+    """ספירות לפי חלונות זמן קבועים (resolution שניות), שומר רק את החלונות של retention*resolution
+    השניות האחרונות (לפי השעון, לא לפי מספר החלונות - תקופה בלי חיפושים לא מאריכה את חלון השמירה)"""
+
+    def __init__(self, resolution: int, retention: int):
+        self.resolution = resolution
+        self.retention = retention
+        self._counts: Dict[int, int] = {}
+
+    def add(self, timestamp: datetime, count: int = 1, now: Optional[datetime] = None):
+        bucket = int(timestamp.timestamp()) // self.resolution
+        if bucket not in self._counts:
+            cutoff = self._cutoff(now)
+            if bucket < cutoff:  # ישן מחלון השמירה
+                return
+            # פינוי רק כשנפתח חלון חדש - פעם אחת לכל resolution שניות
+            for expired in [key for key in self._counts if key < cutoff]:
+                del self._counts[expired]
+            self._counts[bucket] = 0
+        self._counts[bucket] += count
+
+    def total_since(self, timestamp: datetime, now: Optional[datetime] = None) -> int:
+        """סכום החלונות שמתחילים מהחלון של timestamp והלאה (בתוך חלון השמירה)"""
+        since = max(int(timestamp.timestamp()) // self.resolution, self._cutoff(now))
+        return sum(count for bucket, count in self._counts.items() if bucket >= since)
+
+    def series(self, now: Optional[datetime] = None) -> List[Dict]:
+        """החלונות השמורים לפי סדר זמן - [{"start", "count"}]"""
+        cutoff = self._cutoff(now)
+        return [{"start": datetime.fromtimestamp(bucket * self.resolution).isoformat(), "count": self._counts[bucket]}
+                for bucket in sorted(self._counts) if bucket >= cutoff]
+
+    def _cutoff(self, now: Optional[datetime]) -> int:
+        """החלון הישן ביותר שנשמר - retention החלונות שמסתיימים בחלון של now"""
+        return int((now or datetime.now()).timestamp()) // self.resolution - self.retention + 1
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+class SearchAnalytics:
+    """כל מבני האנליטיקה של החיפושים, מתעדכנים מ-record().
+    thread-safe: record רץ ב-thread הכתיבה, snapshot ו-location_demand בבקשות וב-thread התמחור"""
+
+    def __init__(self, top_k: int = 10, recent: int = 10):
+        self.total_searches = 0
+        self.empty_searches = 0
+        self.per_minute = TimeRollup(60, retention=24 * 60)      # 24 שעות אחרונות
+        self.hourly = TimeRollup(60 * 60, retention=14 * 24)     # 14 ימים אחרונים
+        self.daily = TimeRollup(24 * 60 * 60, retention=365)     # שנה אחרונה
+        self.daily_results = TimeRollup(24 * 60 * 60, retention=365)  # סכום התוצאות ליום (לממוצע)
+        self.locations = HeavyHitters(top_k)
+        self.car_types = HeavyHitters(top_k)
+        self.distinct_queries = HyperLogLog()
+        # ביקוש לפי מיקום קנוני - חיפושים ליום, 30 ימים אחרונים (לתמחור הדינמי)
+        self.location_daily: Dict[str, TimeRollup] = {}
+        self.recent: Deque[Dict] = deque(maxlen=recent)
+        self._snapshot: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def record(self, query: Dict, results_count: int = 0, timestamp: Optional[datetime] = None):
+        """עדכון מחיפוש אחד"""
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            self._record(query, results_count, timestamp)
+
+    def _record(self, query: Dict, results_count: int, timestamp: datetime):
+        self.total_searches += 1
+        if not results_count:
+            self.empty_searches += 1
+        for rollup in (self.per_minute, self.hourly, self.daily):
+            rollup.add(timestamp)
+        if results_count:
+            self.daily_results.add(timestamp, results_count)
+
+        location = query.get("location")
+        if location:
+            # "Tel Aviv" ו"תל אביב" נספרים יחד
+            location_id = resolve_location(location)
+            self.locations.add(location_name(location_id) or str(location))
+            if location_id:
+                self.location_daily.setdefault(location_id, TimeRollup(24 * 60 * 60, retention=30)).add(timestamp)
+        if query.get("car_type"):
+            self.car_types.add(str(query["car_type"]))
+        self.distinct_queries.add(json.dumps(query, sort_keys=True, ensure_ascii=False, default=str))
+
+        self.recent.appendleft({"query": query, "results_count": results_count, "timestamp": timestamp.isoformat()})
+        self._snapshot = None
+
+    def location_demand(self, days: int = 7, now: Optional[datetime] = None) -> Dict[str, int]:
+        """מספר החיפושים לכל מיקום קנוני ב-days הימים האחרונים"""
+        now = now or datetime.now()
+        since = now - timedelta(days=days - 1)
+        with self._lock:
+            return {location_id: rollup.total_since(since, now) for location_id, rollup in self.location_daily.items()}
+
+    def snapshot(self) -> Dict:
+        """תצוגת האנליטיקה - נבנית פעם אחת אחרי שינוי"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            return self._snapshot
+
+    def daily_summary(self, days: int = 30) -> List[Dict]:
+        """חיפושים וממוצע תוצאות לכל יום, מהחדש לישן - הצורה של daily_searches בתשובה הישנה של PostgreSQL"""
+        with self._lock:
+            searches = self.daily.series()[-days:]
+            results = {entry["start"]: entry["count"] for entry in self.daily_results.series()}
+        return [{
+            "search_date": entry["start"][:10],
+            "daily_searches": entry["count"],
+            "total_searches": entry["count"],
+            "avg_results": round(results.get(entry["start"], 0) / entry["count"], 2),
+        } for entry in reversed(searches)]
+
+    def _build_snapshot(self) -> Dict:
+        return {
+            "total_searches": self.total_searches,
+            "empty_searches": self.empty_searches,
+            "distinct_queries": self.distinct_queries.count(),
+            "popular_locations": self.locations.top(),
+            "popular_car_types": self.car_types.top(),
+            "per_minute": self.per_minute.series()[-60:],
+            "hourly": self.hourly.series()[-24:],
+            "daily": self.daily.series()[-30:],
+            "recent_searches": list(self.recent),
+        }
@@ -0,0 +1,110 @@
+"""
+סריאליזציה מהירה לתשובות רכבים בכמות גדולה
+ולידציה אחת לכל הרשימה עם TypeAdapter (או דילוג עליה לנתוני projection מהימנים) וכתיבת JSON ב-orjson
+"""
+
+import json
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter, create_model
+
+
+class InvalidFieldsError(ValueError):
+    """בחירת שדות (fields=) עם שדה שלא קיים במודל"""
+
+
+def parse_features(car_data: Dict) -> Dict:
+    """המרת features ששמור כמחרוזת JSON (PostgreSQL) לרשימה - במקום"""
+    features = car_data.get("features")
+    if isinstance(features, str):
+        try:
+            car_data["features"] = json.loads(features)
+        except ValueError:
+            car_data["features"] = []
+    return car_data
+
+
+def _orjson_default(value):
+    # NUMERIC של PostgreSQL מגיע כ-Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload) -> bytes:
+    """JSON כ-bytes (datetime/date נתמכים מובנית ב-orjson)"""
+    return orjson.dumps(payload, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(payload, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """תשובת JSON שנכתבת ב-orjson (בלי סריאליזציה נוספת של FastAPI)"""
+    return Response(content=dumps(payload), media_type="application/json", headers=dict(headers or {}))
+
+
+class BulkCarSerializer:
+    """סריאליזציה של רשימות רכבים לפי מודל Pydantic נתון"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self._adapter = TypeAdapter(List[model])
+        # תת-קבוצת שדות -> TypeAdapter של מודל חלקי (נבנה פעם אחת לכל בחירה)
+        self._partial_adapters: Dict[Tuple[str, ...], TypeAdapter] = {self.fields: self._adapter}
+
+    def parse_fields(self, fields: Optional[str], key_fields: Sequence[str] = ("id",)) -> Optional[Tuple[str, ...]]:
+        """פענוח פרמטר fields=make,model,daily_rate לשדות המודל (בסדר המודל).
+        שדות המפתח (id) תמיד נכללים - None = כל השדות"""
+        if not fields:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise InvalidFieldsError(f"שדות לא מוכרים: {', '.join(sorted(unknown))}")
+        requested.update(key_fields)
+        return tuple(field for field in self.fields if field in requested)
+
+    def to_payload(self, rows: Iterable[Dict], trusted: bool = False,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """רשימת מילונים מוכנה ל-JSON.
+        trusted=True - נתונים מה-projection של ה-Event Store, שכבר במבנה הנכון: רק חיתוך לשדות המודל.
+        אחרת - ולידציה אחת של כל הרשימה (המרות טיפוסים ושדות חסרים כמו במודל).
+        fields - רק השדות האלה (מתוך parse_fields)"""
+        fields = tuple(fields) if fields else self.fields
+        if trusted:
+            return [{field: row.get(field) for field in fields} for row in rows]
+        adapter = self._partial_adapter(fields)
+        cars = adapter.validate_python([parse_features(row) for row in rows])
+        return adapter.dump_python(cars)
+
+    def page_response(self, rows: Iterable[Dict], next_cursor: Optional[str] = None,
+                      trusted: bool = False, headers: Optional[Mapping[str, str]] = None,
+                      fields: Optional[Sequence[str]] = None, extra: Optional[Mapping] = None) -> Response:
+        """תשובת עמוד רכבים (מבנה CarPage) - עוקף את ה-response_model של FastAPI.
+        headers - כותרות שכבר נקבעו על ה-Response של ה-endpoint (למשל ETag).
+        extra - שדות נוספים לתשובה (למשל facets)"""
+        cars = self.to_payload(rows, trusted, fields)
+        payload = {"cars": cars, "next_cursor": next_cursor, "count": len(cars)}
+        payload.update(extra or {})
+        return json_response(payload, headers)
+
+    def batch_response(self, cars_by_id: Mapping[str, Dict], requested_ids: Sequence[str],
+                       trusted: bool = False, fields: Optional[Sequence[str]] = None) -> Response:
+        """תשובת שליפה מרוכזת - הרכבים שנמצאו (בסדר הבקשה) ומזהים שלא נמצאו"""
+        found = [car_id for car_id in requested_ids if car_id in cars_by_id]
+        missing = [car_id for car_id in requested_ids if car_id not in cars_by_id]
+        cars = self.to_payload([cars_by_id[car_id] for car_id in found], trusted, fields)
+        return json_response({"cars": cars, "found": found, "missing": missing})
+
+    def _partial_adapter(self, fields: Tuple[str, ...]) -> TypeAdapter:
+        adapter = self._partial_adapters.get(fields)
+        if adapter is None:
+            partial = create_model(
+                f"{self.model.__name__}Fields",
+                **{field: (self.model.model_fields[field].annotation, self.model.model_fields[field])
+                   for field in fields}
+            )
+            adapter = self._partial_adapters[fields] = TypeAdapter(List[partial])
+        return adapter
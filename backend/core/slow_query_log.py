@@ -0,0 +1,239 @@
+"""
+יומן שאילתות איטיות ל-PostgreSQL (מאזין לאירועי ה-cursor של SQLAlchemy - כל statement נמדד)
+- סטטיסטיקות לכל fingerprint (השאילתה בלי ערכים): מספר קריאות, זמן כולל / ממוצע / מקסימלי, קריאות איטיות
+- שאילתה מעל הסף נרשמת ביומן בצורה המנורמלת, עם שמות וסוגי הפרמטרים (בלי הערכים - אימיילים,
+  סיסמאות מגובבות וכו') ומי קרא לה
+- אופציונלית: EXPLAIN (ANALYZE, BUFFERS) לדגימה מהשאילתות האיטיות (SELECT בלבד, ב-thread ברקע)
+הגדרות: SLOW_QUERY_MS (ברירת מחדל 200), SLOW_QUERY_EXPLAIN_RATE (0 - כבוי, 1 - כל שאילתה איטית)
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, Dict, Optional
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+
+# לכל fingerprint לכל היותר EXPLAIN אחד בפרק זמן (ANALYZE מריץ את השאילתה שוב)
+EXPLAIN_INTERVAL_S = 300
+EXPLAIN_TIMEOUT_MS = 10000
+
+MAX_FINGERPRINTS = 500
+SORT_KEYS = ("total_ms", "mean_ms", "max_ms", "calls", "slow_calls", "rows")
+RECENT_SLOW = 100
+MAX_STATEMENT_CHARS = 2000
+
+# פריימים שמדלגים עליהם בחיפוש הקורא (SQLAlchemy, עטיפות המדידה וה-tracing)
+_INTERNAL_FRAMES = (f"{os.sep}sqlalchemy{os.sep}", "contextlib.py", f"core{os.sep}metrics.py", __file__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize(statement: str) -> str:
+    """צורת השאילתה: ערכים ופרמטרים -> ?, רשימות IN -> (...), רווחים מצומצמים"""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode("utf-8")).hexdigest()[:16]
+
+
+def _redact(value) -> str:
+    """סוג הערך בלבד - היומן חשוף דרך ה-API ולא שומרים בו נתוני לקוחות"""
+    return "NULL" if value is None else type(value).__name__
+
+
+def _format_parameters(parameters) -> object:
+    """מבנה הפרמטרים עם מפתחות וסוגים, בלי ערכים"""
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_format_parameters(value) if isinstance(value, (dict, list, tuple)) else _redact(value)
+                for value in parameters[:20]]
+    return _redact(parameters)
+
+
+def _caller() -> str:
+    """הפונקציה הראשונה מחוץ ל-SQLAlchemy ולעטיפות - מי הריץ את השאילתה"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not any(part in filename for part in _INTERNAL_FRAMES):
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class SlowQueryLog:
+    """מדידת כל ה-statements של engine וצבירה לפי fingerprint (מוגבל ל-MAX_FINGERPRINTS, LRU)"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain_rate: float = EXPLAIN_SAMPLE_RATE,
+                 explain_interval_s: float = EXPLAIN_INTERVAL_S):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.explain_interval_s = explain_interval_s
+        self.engine = None
+        self.stats: "OrderedDict[str, Dict]" = OrderedDict()
+        self.recent: Deque[Dict] = deque(maxlen=RECENT_SLOW)
+        self._explained_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        """האזנה ל-statements של ה-engine"""
+        self.engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+
+    # ---------- אירועי SQLAlchemy ----------
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        if conn.info.get("explaining"):
+            return
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        self.record(statement, parameters, (time.perf_counter() - started) * 1000, executemany, rows)
+
+    def _on_error(self, context):
+        starts = context.connection.info.get("query_started") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    # ---------- צבירה ----------
+
+    def record(self, statement: str, parameters, duration_ms: float, executemany: bool = False,
+               rows: Optional[int] = None):
+        key = fingerprint(statement)
+        slow = duration_ms >= self.threshold_ms
+        with self._lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {
+                    "fingerprint": key, "query": normalize(statement)[:MAX_STATEMENT_CHARS],
+                    "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "slow_calls": 0, "rows": 0,
+                    "last_slow": None, "plan": None,
+                }
+                if len(self.stats) > MAX_FINGERPRINTS:
+                    self.stats.popitem(last=False)
+            else:
+                self.stats.move_to_end(key)
+            entry["calls"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["rows"] += rows or 0
+            if slow:
+                entry["slow_calls"] += 1
+        if slow:
+            self._log_slow(key, statement, parameters, duration_ms, executemany, rows)
+
+    def _log_slow(self, key: str, statement: str, parameters, duration_ms: float, executemany: bool,
+                  rows: Optional[int]):
+        sample = {
+            "fingerprint": key,
+            "duration_ms": round(duration_ms, 2),
+            "rows": rows,
+            "statement": normalize(statement)[:MAX_STATEMENT_CHARS],  # ערכים שנכתבו בטקסט -> ?
+            "parameters": _format_parameters(parameters),
+            "executemany": executemany,
+            "caller": _caller(),
+            "at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            self.recent.append(sample)
+            if key in self.stats:
+                self.stats[key]["last_slow"] = sample
+        print(f"🐢 שאילתה איטית {duration_ms:.0f}ms [{key}] {sample['caller']}: {normalize(statement)[:200]}")
+
+        if self._should_explain(key, statement, executemany):
+            threading.Thread(target=self._explain, args=(key, statement, parameters),
+                             name="slow-query-explain", daemon=True).start()
+
+    # ---------- EXPLAIN ----------
+
+    def _should_explain(self, key: str, statement: str, executemany: bool) -> bool:
+        if self.engine is None or executemany or self.explain_rate <= 0:
+            return False
+        if not statement.lstrip().upper().startswith("SELECT") or random.random() >= self.explain_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(key, float("-inf")) < self.explain_interval_s:
+                return False
+            self._explained_at[key] = now
+        return True
+
+    def _explain(self, key: str, statement: str, parameters):
+        """EXPLAIN (ANALYZE, BUFFERS) בחיבור נפרד, בטרנזקציה שמתבטלת ועם statement_timeout"""
+        try:
+            with self.engine.connect() as conn:
+                conn.info["explaining"] = True
+                try:
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                    result = conn.exec_driver_sql(
+                        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters or {}
+                    ).scalar()
+                    conn.rollback()
+                finally:
+                    conn.info.pop("explaining", None)
+            plan = json.loads(result) if isinstance(result, str) else result
+            captured = {"captured_at": datetime.now().isoformat(), "plan": plan}
+            if isinstance(plan, list) and plan:
+                captured["execution_ms"] = plan[0].get("Execution Time")
+                captured["planning_ms"] = plan[0].get("Planning Time")
+        except Exception as e:
+            captured = {"captured_at": datetime.now().isoformat(), "error": str(e)}
+        with self._lock:
+            if key in self.stats:
+                self.stats[key]["plan"] = captured
+
+    # ---------- דוח ----------
+
+    def report(self, sort: str = "total_ms", limit: int = 50) -> Dict:
+        """הסטטיסטיקות לפי fingerprint (ממוינות לפי אחד מ-SORT_KEYS, מהגדול לקטן)"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"מיון לא מוכר: {sort} (אפשרויות: {', '.join(SORT_KEYS)})")
+        with self._lock:
+            entries = [dict(entry) for entry in self.stats.values()]
+            recent = list(self.recent)
+        for entry in entries:
+            entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0.0
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return {
+            "threshold_ms": self.threshold_ms,
+            "explain_rate": self.explain_rate,
+            "fingerprints": len(self.stats),
+            "queries": entries[:limit],
+            "recent_slow": recent[-limit:][::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.recent.clear()
+            self._explained_at.clear()
@@ -0,0 +1,129 @@
+"""
+אתחול השירותים הכבדים בהפעלת השרת במקום ביבוא המודולים, ודוח זמני ההפעלה
+- LazyService - proxy לשירות גלובלי (Event Store, PostgreSQL, RAG) שנבנה בשימוש הראשון או ב-lifespan.
+  `from database.event_store import event_service` ממשיך לעבוד - היבוא עצמו כבר לא מתחבר ולא טוען נתונים
+- STARTUP - זמני היבוא והאתחול לכל רכיב (נמדדים ב-phase), מוצג בסוף ההפעלה וב-GET /api/startup
+- run_in_background - בדיקות ההפעלה רצות ב-threads במקביל
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+IMPORT = "import"
+INIT = "init"
+
+
+class StartupProfile:
+    """זמני יבוא ואתחול לכל רכיב, בסדר ההתחלה (at_ms - מתי התחיל ביחס ליבוא המודול)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_ms: Optional[float] = None
+        self.entries: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, component: str, kind: str = INIT):
+        """מדידת יבוא / אתחול של רכיב (חריגה נרשמת ועוברת הלאה)"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(component, kind, started, time.perf_counter(), error)
+
+    def record(self, component: str, kind: str, started: float, finished: float, error: Optional[str] = None):
+        with self._lock:
+            self.entries.append({
+                "component": component,
+                "phase": kind,
+                "ms": round((finished - started) * 1000, 1),
+                "at_ms": round((started - self.started) * 1000, 1),
+                "thread": threading.current_thread().name,
+                "error": error,
+            })
+
+    def mark_ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def report(self) -> Dict:
+        with self._lock:
+            entries = sorted(self.entries, key=lambda entry: entry["at_ms"])
+        totals: Dict[str, float] = {}
+        for entry in entries:
+            totals[entry["phase"]] = round(totals.get(entry["phase"], 0.0) + entry["ms"], 1)
+        return {"ready_ms": self.ready_ms, "totals_ms": totals, "components": entries}
+
+    def format(self) -> str:
+        """טבלת הדוח להדפסה בסוף ההפעלה"""
+        report = self.report()
+        lines = [f"⏱️ זמני הפעלה (מוכן אחרי {report['ready_ms']}ms):"]
+        for entry in report["components"]:
+            status = f"  ❌ {entry['error']}" if entry["error"] else ""
+            lines.append(f"   {entry['phase']:<6} {entry['component']:<32} {entry['ms']:>8.1f}ms"
+                         f"  (+{entry['at_ms']:.0f}ms, {entry['thread']}){status}")
+        return "\n".join(lines)
+
+
+STARTUP = StartupProfile()
+
+
+class LazyService:
+    """proxy לשירות שנבנה פעם אחת (thread-safe) בגישה הראשונה למאפיין שלו או ב-get_instance().
+    זמן הבנייה נרשם ב-STARTUP. בנייה שנכשלה נזכרת retry_after_s שניות - בפרק הזמן הזה הגישה
+    מחזירה את אותה שגיאה מיד (בלי לחכות שוב ל-timeout של חיבור), ואחריו מנסים שוב"""
+
+    def __init__(self, name: str, factory: Callable[[], object], retry_after_s: float = 30.0):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_retry_after_s", retry_after_s)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_failure", None)
+        object.__setattr__(self, "_failed_at", 0.0)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def get_instance(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._build()
+                instance = self._instance
+        return instance
+
+    def _build(self):
+        if self._failure is not None and time.monotonic() - self._failed_at < self._retry_after_s:
+            raise self._failure
+        try:
+            with STARTUP.phase(self._name, INIT):
+                object.__setattr__(self, "_instance", self._factory())
+        except Exception as e:
+            object.__setattr__(self, "_failure", e)
+            object.__setattr__(self, "_failed_at", time.monotonic())
+            raise
+        object.__setattr__(self, "_failure", None)
+
+    def is_ready(self) -> bool:
+        """האם השירות כבר נבנה בהצלחה (לא מנסה לבנות)"""
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get_instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_instance(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if self._instance is not None else "not loaded"
+        return f"<LazyService {self._name} ({state})>"
+
+
+def run_in_background(func: Callable[[], object]) -> "asyncio.Task":
+    """הרצת בדיקת הפעלה חוסמת ב-thread - כמה בדיקות רצות במקביל"""
+    return asyncio.create_task(asyncio.to_thread(func))
@@ -0,0 +1,188 @@
+"""
+אינדקס טקסט הפוך (Inverted Index) לחיפוש חופשי ברכבים
+נרמול עברית/אנגלית: אותיות סופיות, ניקוד, גרשיים ואותיות גדולות/קטנות
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+# שדות הרכב שנכנסים לאינדקס
+INDEXED_FIELDS = ("make", "model", "location", "supplier", "features")
+
+# אורך prefix מקסימלי שנשמר באינדקס - מילים ארוכות יותר מאומתות מול הטוקנים של הרכב
+MAX_PREFIX_LENGTH = 15
+
+# אותיות סופיות -> אותיות רגילות, והסרת גרש/גרשיים (צה״ל -> צהל)
+_HEBREW_TRANSLATION = str.maketrans({
+    "ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ",
+    "׳": None, "״": None,
+})
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """נרמול טקסט לחיפוש: הסרת ניקוד וטעמים, אותיות סופיות ו-casefold"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    # ניקוד עברי וסימנים דיאקריטיים לטיניים הם תווים צירופיים (combining)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.translate(_HEBREW_TRANSLATION).casefold()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """פירוק טקסט מנורמל לטוקנים"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(normalize_text(str(text)))
+
+
+def field_tokens(value) -> List[str]:
+    """טוקנים של ערך שדה - תומך ברשימת תכונות"""
+    if isinstance(value, (list, tuple)):
+        tokens = []
+        for item in value:
+            tokens.extend(tokenize(item))
+        return tokens
+    return tokenize(value)
+
+
+class CarTextIndex:
+    """אינדקס הפוך מ-prefix של טוקן למזהי רכבים, מתעדכן בהדרגה"""
+
+    def __init__(self, fields: Iterable[str] = INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        # prefix -> מזהי רכבים (כל השדות)
+        self._postings: Dict[str, Set] = {}
+        # prefix -> מזהי רכבים (שדה מיקום בלבד)
+        self._location_postings: Dict[str, Set] = {}
+        # מזהה רכב -> ערכי השדות המאונדקסים (לעדכונים חלקיים)
+        self._documents: Dict[object, Dict] = {}
+        # מזהה רכב -> (כל הטוקנים, טוקני מיקום)
+        self._doc_tokens: Dict[object, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, car_id) -> bool:
+        return car_id in self._documents
+
+    # ---------- עדכון ----------
+
+    def index_car(self, car_id, car_data: Dict):
+        """הוספה או החלפה של רכב באינדקס"""
+        self.remove_car(car_id)
+        document = {field: car_data.get(field) for field in self.fields}
+        self._documents[car_id] = document
+
+        location_tokens = set(field_tokens(document.get("location")))
+        all_tokens = set(location_tokens)
+        for field in self.fields:
+            if field != "location":
+                all_tokens.update(field_tokens(document.get(field)))
+
+        self._doc_tokens[car_id] = (all_tokens, location_tokens)
+        self._add_postings(self._postings, car_id, all_tokens)
+        self._add_postings(self._location_postings, car_id, location_tokens)
+
+    def update_car(self, car_id, changes: Dict):
+        """עדכון חלקי - רק אם אחד מהשדות המאונדקסים השתנה"""
+        document = self._documents.get(car_id)
+        if document is None:
+            return
+        if not any(field in changes for field in self.fields):
+            return
+        merged = dict(document)
+        merged.update({field: changes[field] for field in self.fields if field in changes})
+        self.index_car(car_id, merged)
+
+    def remove_car(self, car_id):
+        """הסרת רכב מהאינדקס"""
+        if car_id not in self._documents:
+            return
+        all_tokens, location_tokens = self._doc_tokens.pop(car_id)
+        del self._documents[car_id]
+        self._remove_postings(self._postings, car_id, all_tokens)
+        self._remove_postings(self._location_postings, car_id, location_tokens)
+
+    def clear(self):
+        """ריקון האינדקס"""
+        self._postings.clear()
+        self._location_postings.clear()
+        self._documents.clear()
+        self._doc_tokens.clear()
+
+    # ---------- חיפוש ----------
+
+    def search(self, text: Optional[str] = None, location: Optional[str] = None) -> Set:
+        """מזהי הרכבים שמתאימים לכל טוקני החיפוש (כל טוקן כ-prefix).
+        text - חיפוש בכל השדות, location - חיפוש בשדה המיקום בלבד"""
+        terms = [(token, False) for token in tokenize(text)]
+        terms += [(token, True) for token in tokenize(location)]
+        if not terms:
+            return set(self._documents)
+
+        candidates = []
+        for token, location_only in terms:
+            postings = self._location_postings if location_only else self._postings
+            ids = postings.get(token[:MAX_PREFIX_LENGTH])
+            if not ids:
+                return set()
+            candidates.append((ids, token, location_only))
+
+        # חיתוך מהקבוצה הקטנה ביותר - העלות יחסית לגודל התוצאה ולא לגודל הצי
+        candidates.sort(key=lambda item: len(item[0]))
+        result = set(candidates[0][0])
+        for ids, _, _ in candidates[1:]:
+            result &= ids
+            if not result:
+                return result
+
+        # טוקנים ארוכים מ-MAX_PREFIX_LENGTH - אימות מול הטוקנים המלאים
+        for _, token, location_only in candidates:
+            if len(token) > MAX_PREFIX_LENGTH:
+                slot = 1 if location_only else 0
+                result = {
+                    car_id for car_id in result
+                    if any(t.startswith(token) for t in self._doc_tokens[car_id][slot])
+                }
+        return result
+
+    # ---------- עזרים פנימיים ----------
+
+    @staticmethod
+    def _prefixes(token: str) -> Iterable[str]:
+        for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+            yield token[:length]
+
+    def _add_postings(self, postings: Dict[str, Set], car_id, tokens: Set[str]):
+        for prefix in {p for token in tokens for p in self._prefixes(token)}:
+            postings.setdefault(prefix, set()).add(car_id)
+
+    def _remove_postings(self, postings: Dict[str, Set], car_id, tokens: Set[str]):
+        for prefix in {p for token in tokens for p in self._prefixes(token)}:
+            ids = postings.get(prefix)
+            if ids is not None:
+                ids.discard(car_id)
+                if not ids:
+                    del postings[prefix]
+
+
+def to_tsquery(text: Optional[str] = None, location: Optional[str] = None) -> Optional[str]:
+    """בניית tsquery של PostgreSQL מטוקנים מנורמלים (prefix, מיקום = משקל A)"""
+    terms = [f"'{token}':*" for token in tokenize(text)]
+    terms += [f"'{token}':*A" for token in tokenize(location)]
+    return " & ".join(terms) if terms else None
+
+
+def to_tsvector_literal(car_data: Dict) -> str:
+    """בניית tsvector של PostgreSQL מטוקנים מנורמלים (מיקום = משקל A, שאר השדות = B).
+    נבנה ב-Python כדי שהנרמול יהיה זהה לאינדקס בזיכרון"""
+    lexemes: Dict[str, List[str]] = {}
+    position = 1
+    for field in INDEXED_FIELDS:
+        weight = "A" if field == "location" else "B"
+        for token in field_tokens(car_data.get(field)):
+            lexemes.setdefault(token, []).append(f"{position}{weight}")
+            position += 1
+    return " ".join(f"'{token}':{','.join(positions)}" for token, positions in lexemes.items())
@@ -0,0 +1,162 @@
+"""
+Tracing (OpenTelemetry) - span לכל בקשה, ומתחתיה span לכל קריאה ל-Event Store, PostgreSQL,
+ספקי רכבים חיצוניים (Trawex ו-MultiAPICarService) ו-Ollama - כדי לראות לאן הולך הזמן בבקשה איטית
+מופעל לפי OTEL_TRACES_EXPORTER:
+    none (ברירת מחדל) - כבוי, span() מחזיר context ריק ואין עלות
+    console - הדפסת ה-spans ל-stdout
+    file - שורת JSON לכל span בקובץ TRACING_FILE (ברירת מחדל traces.jsonl) - לסביבות בלי collector
+    otlp - שליחה ל-collector (OTEL_EXPORTER_OTLP_ENDPOINT)
+"""
+
+import os
+import threading
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+    )
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+    SpanExporter = object
+
+EXPORTER_ENV = "OTEL_TRACES_EXPORTER"
+FILE_ENV = "TRACING_FILE"
+DEFAULT_FILE = "traces.jsonl"
+
+_tracer = None
+_NO_SPAN = nullcontext()
+
+
+class FileSpanExporter(SpanExporter):
+    """שורת JSON לכל span (פורמט ה-SDK, כמו ConsoleSpanExporter) - לניתוח offline"""
+
+    def __init__(self, path: str = DEFAULT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"שגיאה בכתיבת spans לקובץ: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _make_exporter(name: str, path: Optional[str]):
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return FileSpanExporter(path or os.getenv(FILE_ENV, DEFAULT_FILE))
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"exporter לא מוכר: {name}")
+
+
+def setup_tracing(service_name: str, exporter: Optional[str] = None, path: Optional[str] = None) -> bool:
+    """הפעלת tracing לפי exporter (או OTEL_TRACES_EXPORTER). מחזיר האם tracing פעיל"""
+    global _tracer
+    if _tracer is not None:
+        return True
+    exporter = (exporter or os.getenv(EXPORTER_ENV, "none")).strip().lower()
+    if exporter in ("", "none"):
+        return False
+    if not OTEL_AVAILABLE:
+        print("⚠️ Tracing לא זמין - ודא שהחבילה opentelemetry-sdk מותקנת")
+        return False
+    try:
+        span_exporter = _make_exporter(exporter, path)
+    except Exception as e:
+        print(f"⚠️ Tracing לא הופעל: {e}")
+        return False
+
+    resource = Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("car_rental")
+    print(f"✅ Tracing פעיל ({exporter})")
+    return True
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, attributes: Optional[Dict] = None):
+    """span חדש מתחת ל-span הנוכחי (חריגה נרשמת ב-span ומסמנת אותו כשגיאה)"""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def annotate(**attributes):
+    """הוספת attributes ל-span הנוכחי (ערכי None מושמטים)"""
+    if _tracer is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+
+def mark_error(error: Optional[BaseException] = None):
+    """סימון ה-span הנוכחי כשגיאה - לשגיאה שנתפסה ולא עברה הלאה (חריגה שעוברת נרשמת ב-span לבד)"""
+    if _tracer is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        if error is not None:
+            current.record_exception(error)
+        current.set_status(Status(StatusCode.ERROR))
+
+
+class TracingMiddleware:
+    """ASGI middleware - span מסוג SERVER לכל בקשה, כולל המשך trace מ-traceparent של הלקוח.
+    שם ה-span הוא תבנית ה-route (GET /api/cars/{car_id}) אחרי שה-router מצא אותה"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{method} {scope['path']}", context=propagate.extract(carrier), kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"],
+                        "url.query": scope.get("query_string", b"").decode("latin-1")}
+        ) as request_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    request_span.update_name(f"{method} {route}")
+                    request_span.set_attribute("http.route", route)
+                request_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    request_span.set_status(Status(StatusCode.ERROR))
@@ -7,9 +7,28 @@ import sqlite3
 import json
 import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterable, Sequence
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
 from enum import Enum
 import os
+import threading
+
+from core.text_index import CarTextIndex
+from core.booking_calendar import BookingCalendar, BookingConflictError
+from core.fleet_stats import PRICE_BUCKETS, FleetStats
+from core.locations import LocationIndex, resolve_location
+from core.facets import FacetIndex
+from core.bitmap_index import equality_filters, popcount
+from core.car_query import CarQuery
+from core.batch_writer import BatchWriter
+from core.search_analytics import SearchAnalytics
+from core.dynamic_pricing import DynamicPricingEngine
+from core.live_updates import AVAILABILITY, CAR, ChangeFeed
+from core.metrics import timed
+from core.tracing import annotate
+from core.startup import LazyService
 
 class EventType(str, Enum):
     CAR_ADDED = "car_added"
@@ -42,8 +61,38 @@ class EventStore:
     
     def __init__(self, db_path: str = "car_rental_events.db"):
         self.db_path = db_path
+        self._subscribers: List[Callable[[Event], None]] = []
+        # כתיבה והפצה לכל המאזינים תחת נעילה אחת - אירועים מה-thread של רישום החיפושים ומבקשות
+        # מגיעים למאזינים (האינדקסים בזיכרון) אחד אחרי השני ובסדר שבו נשמרו
+        self._write_lock = threading.RLock()
         self.init_database()
     
+    def subscribe(self, callback: Callable[[Event], None]):
+        """רישום מאזין שמקבל כל אירוע אחרי שנשמר בהצלחה"""
+        self._subscribers.append(callback)
+    
+    def _publish(self, event: Event):
+        """הפצת אירוע שנשמר לכל המאזינים"""
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"שגיאה בטיפול באירוע {event.event_type.value}: {e}")
+    
+    @staticmethod
+    def _row_to_event(row) -> Event:
+        """המרת שורה מטבלת events לאובייקט Event"""
+        event = Event(
+            event_type=EventType(row[1]),
+            aggregate_id=row[2],
+            data=json.loads(row[3])
+        )
+        event.event_id = row[0]
+        event.user_id = row[4]
+        event.timestamp = datetime.fromisoformat(row[5])
+        event.version = row[6]
+        return event
+    
     def init_database(self):
         """יצירת מבנה הדאטהבייס"""
         with sqlite3.connect(self.db_path) as conn:
@@ -77,32 +126,67 @@ class EventStore:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_aggregate_id ON events(aggregate_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp)")
+            # אינדקס מורכב לעימוד keyset לפי סוג אירוע ומזהה aggregate
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_type_aggregate ON events(event_type, aggregate_id)")
             
             conn.commit()
     
+    @timed("event_store")
     def append_event(self, event: Event) -> bool:
         """הוספת אירוע למסד הנתונים"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO events (event_id, event_type, aggregate_id, data, user_id, timestamp, version)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    event.event_id,
-                    event.event_type.value,
-                    event.aggregate_id,
-                    json.dumps(event.data, ensure_ascii=False),
-                    event.user_id,
-                    event.timestamp.isoformat(),
-                    event.version
-                ))
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"שגיאה בהוספת אירוע: {e}")
-            return False
+        annotate(event_type=event.event_type.value, aggregate_id=event.aggregate_id)
+        with self._write_lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        INSERT INTO events (event_id, event_type, aggregate_id, data, user_id, timestamp, version)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        event.event_id,
+                        event.event_type.value,
+                        event.aggregate_id,
+                        json.dumps(event.data, ensure_ascii=False),
+                        event.user_id,
+                        event.timestamp.isoformat(),
+                        event.version
+                    ))
+                    conn.commit()
+            except Exception as e:
+                print(f"שגיאה בהוספת אירוע: {e}")
+                return False
+        
+            self._publish(event)
+            return True
+    
+    @timed("event_store")
+    def append_events(self, events: List[Event]) -> bool:
+        """הוספת כמה אירועים בטרנזקציה אחת (חיבור ו-commit אחד) - לכתיבה בקבוצות"""
+        with self._write_lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.executemany("""
+                        INSERT INTO events (event_id, event_type, aggregate_id, data, user_id, timestamp, version)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, [(
+                        event.event_id,
+                        event.event_type.value,
+                        event.aggregate_id,
+                        json.dumps(event.data, ensure_ascii=False),
+                        event.user_id,
+                        event.timestamp.isoformat(),
+                        event.version
+                    ) for event in events])
+                    conn.commit()
+            except Exception as e:
+                print(f"שגיאה בהוספת אירועים: {e}")
+                return False
+        
+            for event in events:
+                self._publish(event)
+            return True
     
+    @timed("event_store")
     def get_events(self, aggregate_id: str) -> List[Event]:
         """קבלת כל האירועים של aggregate מסויים"""
         events = []
@@ -117,22 +201,103 @@ class EventStore:
                 """, (aggregate_id,))
                 
                 for row in cursor.fetchall():
-                    event = Event(
-                        event_type=EventType(row[1]),
-                        aggregate_id=row[2],
-                        data=json.loads(row[3])
-                    )
-                    event.event_id = row[0]
-                    event.user_id = row[4]
-                    event.timestamp = datetime.fromisoformat(row[5])
-                    event.version = row[6]
-                    events.append(event)
+                    events.append(self._row_to_event(row))
                     
         except Exception as e:
             print(f"שגיאה בקבלת אירועים: {e}")
             
         return events
     
+    @timed("event_store")
+    def get_events_for_aggregates(self, aggregate_ids: List[str]) -> Dict[str, List[Event]]:
+        """קבלת האירועים של מספר aggregates בשאילתה אחת"""
+        events_by_aggregate = {aggregate_id: [] for aggregate_id in aggregate_ids}
+        if not aggregate_ids:
+            return events_by_aggregate
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in aggregate_ids)
+                cursor.execute(f"""
+                    SELECT event_id, event_type, aggregate_id, data, user_id, timestamp, version
+                    FROM events 
+                    WHERE aggregate_id IN ({placeholders})
+                    ORDER BY timestamp
+                """, list(aggregate_ids))
+                
+                for row in cursor.fetchall():
+                    event = self._row_to_event(row)
+                    events_by_aggregate[event.aggregate_id].append(event)
+                    
+        except Exception as e:
+            print(f"שגיאה בקבלת אירועים: {e}")
+            
+        return events_by_aggregate
+    
+    @timed("event_store")
+    def get_aggregate_ids_page(self, event_type: EventType, after: Optional[str] = None, limit: int = 100) -> List[str]:
+        """עימוד keyset על מזהי aggregates (משתמש באינדקס idx_type_aggregate)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if after is None:
+                    cursor.execute("""
+                        SELECT DISTINCT aggregate_id FROM events
+                        WHERE event_type = ?
+                        ORDER BY aggregate_id
+                        LIMIT ?
+                    """, (event_type.value, limit))
+                else:
+                    cursor.execute("""
+                        SELECT DISTINCT aggregate_id FROM events
+                        WHERE event_type = ? AND aggregate_id > ?
+                        ORDER BY aggregate_id
+                        LIMIT ?
+                    """, (event_type.value, after, limit))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"שגיאה בעימוד אירועים: {e}")
+            return []
+    
+    @timed("event_store")
+    def get_last_position(self, event_types: Iterable[EventType]) -> int:
+        """המיקום (rowid) של האירוע האחרון מהסוגים המבוקשים - 0 אם אין"""
+        type_values = [event_type.value for event_type in event_types]
+        if not type_values:
+            return 0
+        placeholders = ",".join("?" for _ in type_values)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                # שאילתה אחת לכל הסוגים - טווחי האינדקס idx_event_type של הסוגים המבוקשים
+                row = conn.execute(f"SELECT MAX(rowid) FROM events WHERE event_type IN ({placeholders})",
+                                   type_values).fetchone()
+                return row[0] or 0
+        except Exception as e:
+            print(f"שגיאה בקבלת מיקום אירועים: {e}")
+            return 0
+    
+    @timed("event_store")
+    def replay(self, callback: Callable[[Event], None], event_types: Iterable[EventType]):
+        """הזנת כל האירועים מהסוגים המבוקשים לפי סדר כרונולוגי (לבניית projections)"""
+        type_values = [event_type.value for event_type in event_types]
+        placeholders = ",".join("?" for _ in type_values)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT event_id, event_type, aggregate_id, data, user_id, timestamp, version
+                    FROM events 
+                    WHERE event_type IN ({placeholders})
+                    ORDER BY timestamp, rowid
+                """, type_values)
+                
+                for row in cursor:
+                    callback(self._row_to_event(row))
+                    
+        except Exception as e:
+            print(f"שגיאה בהזנת אירועים: {e}")
+    
+    @timed("event_store")
     def get_all_events(self, event_type: EventType = None) -> List[Event]:
         """קבלת כל האירועים במערכת"""
         events = []
@@ -155,16 +320,7 @@ class EventStore:
                     """)
                 
                 for row in cursor.fetchall():
-                    event = Event(
-                        event_type=EventType(row[1]),
-                        aggregate_id=row[2],
-                        data=json.loads(row[3])
-                    )
-                    event.event_id = row[0]
-                    event.user_id = row[4]
-                    event.timestamp = datetime.fromisoformat(row[5])
-                    event.version = row[6]
-                    events.append(event)
+                    events.append(self._row_to_event(row))
                     
         except Exception as e:
             print(f"שגיאה בקבלת אירועים: {e}")
@@ -174,6 +330,9 @@ class EventStore:
 class CarAggregate:
     """אגרגט רכב - בונה את מצב הרכב מהאירועים"""
     
+    DICT_FIELDS = ("id", "make", "model", "year", "car_type", "transmission", "daily_rate",
+                   "available", "location", "location_id", "fuel_type", "seats", "image_url")
+    
     def __init__(self, car_id: str):
         self.car_id = car_id
         self.make = ""
@@ -184,6 +343,7 @@ class CarAggregate:
         self.daily_rate = 0.0
         self.available = True
         self.location = ""
+        self.location_id = None  # מזהה קנוני מ-core.locations
         self.fuel_type = ""
         self.seats = 0
         self.image_url = None
@@ -209,6 +369,8 @@ class CarAggregate:
         self.daily_rate = data.get("daily_rate", 0.0)
         self.available = data.get("available", True)
         self.location = data.get("location", "")
+        # אירועים ישנים נכתבו בלי מזהה מיקום - מתרגמים בזמן הבנייה
+        self.location_id = data.get("location_id") or resolve_location(self.location)
         self.fuel_type = data.get("fuel_type", "")
         self.seats = data.get("seats", 0)
         self.image_url = data.get("image_url")
@@ -218,14 +380,32 @@ class CarAggregate:
         for key, value in data.items():
             if hasattr(self, key):
                 setattr(self, key, value)
+        if "location" in data and "location_id" not in data:
+            self.location_id = resolve_location(self.location)
         self.updated_at = data.get("updated_at")
     
     def _apply_car_deleted(self, data):
         self.deleted = True
         self.available = False
     
-    def to_dict(self):
-        """המרה למילון"""
+    # גישה בסגנון מילון - לשדות בודדים (to_dict עם fields) בלי לבנות מילון מלא
+    def __getitem__(self, key: str):
+        if key == "id":
+            return self.car_id
+        if key not in self.DICT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self, fields: Optional[Iterable[str]] = None):
+        """המרה למילון (fields - רק השדות המבוקשים)"""
+        if fields is not None:
+            return {field: self.get(field) for field in fields}
         return {
             "id": self.car_id,
             "make": self.make,
@@ -236,6 +416,7 @@ class CarAggregate:
             "daily_rate": self.daily_rate,
             "available": self.available,
             "location": self.location,
+            "location_id": self.location_id,
             "fuel_type": self.fuel_type,
             "seats": self.seats,
             "image_url": self.image_url
@@ -244,9 +425,124 @@ class CarAggregate:
 class EventSourcingService:
     """שירות ניהול Event Sourcing"""
     
-    def __init__(self):
+    # הרכבים נבנים מה-projection במבנה הנכון - בלי ולידציה חוזרת (core.serialization)
+    TRUSTED_ROWS = True
+    
+    CAR_EVENT_TYPES = (EventType.CAR_ADDED, EventType.CAR_UPDATED, EventType.CAR_DELETED)
+    BOOKING_EVENT_TYPES = (EventType.BOOKING_CREATED, EventType.BOOKING_CONFIRMED, EventType.BOOKING_CANCELLED)
+    
+    # סדרי מיון של תוצאות שאילתות שנשמרים (שאילתה -> מפתחות ממוינים) עד השינוי הבא ברכבים / בהזמנות
+    SORTED_KEYS_CACHE_SIZE = 128
+    
+    def __init__(self, price_buckets: Sequence[float] = PRICE_BUCKETS):
         self.event_store = EventStore()
         self._init_sample_data()
+        
+        # אינדקסים בזיכרון - נבנים פעם אחת מהאירועים ומתעדכנים מכל אירוע חדש
+        self.search_index = CarTextIndex()
+        self.booking_calendar = BookingCalendar()
+        # נעילה לכל רכב - בדיקת הזמינות וכתיבת ההזמנה הן פעולה אחת (create_booking)
+        self._booking_locks: Dict[str, threading.Lock] = {}
+        self._booking_locks_guard = threading.Lock()
+        self.fleet_stats = FleetStats(price_buckets)
+        # גרסת האינדקסים - עולה בכל אירוע רכב / הזמנה ופוסלת את סדרי המיון השמורים
+        self._index_version = 0
+        self._sorted_keys: "OrderedDict[tuple, List[tuple]]" = OrderedDict()
+        self._sorted_keys_lock = threading.Lock()
+        self.location_index = LocationIndex()
+        # bitmaps לפאסטים ולסינון השוויון, וסדרי המיון לפי מזהה / מחיר (core.facets)
+        self.facet_index = FacetIndex(price_buckets)
+        # רישום חיפושים ברקע - חיפוש לא מחכה לכתיבה
+        self.search_log = BatchWriter(self._write_search_events, name="search-log")
+        self.search_analytics = SearchAnalytics()
+        # מחירים דינמיים - מטריצה שמחושבת ברקע מלוח ההזמנות ומאנליטיקת החיפושים (לפני ה-replay,
+        # כי שינויי מחיר מעדכנים אותה)
+        self.pricing = DynamicPricingEngine(self)
+        self.event_store.replay(
+            self._update_indexes, self.CAR_EVENT_TYPES + self.BOOKING_EVENT_TYPES + (EventType.SEARCH_PERFORMED,)
+        )
+        self.event_store.subscribe(self._update_indexes)
+        # שינויים לערוץ העדכונים בזמן אמת - אחרי שהאירוע נשמר והאינדקסים עודכנו
+        self.changes = ChangeFeed()
+        self.event_store.subscribe(self._publish_change)
+    
+    def _write_search_events(self, events: List[Event]):
+        if not self.event_store.append_events(events):
+            raise RuntimeError("כתיבת אירועי החיפוש נכשלה")
+    
+    def get_data_version(self, scope: str = "cars") -> str:
+        """גרסת הנתונים לפי מיקום האירוע האחרון (ל-ETag).
+        cars = רכבים, הזמנות והמחירים הדינמיים (effective_rate), searches = חיפושים"""
+        if scope == "searches":
+            return f"es:{self.event_store.get_last_position((EventType.SEARCH_PERFORMED,))}"
+        event_types = self.CAR_EVENT_TYPES + self.BOOKING_EVENT_TYPES
+        return f"es:{self.event_store.get_last_position(event_types)}|{self.pricing.version()}"
+    
+    def _update_indexes(self, event: Event):
+        """עדכון האינדקסים בזיכרון מאירוע"""
+        if event.event_type in self.CAR_EVENT_TYPES:
+            self._index_car_event(event)
+            self._index_version += 1
+        elif event.event_type in self.BOOKING_EVENT_TYPES:
+            self._index_booking_event(event)
+            self._index_version += 1
+        elif event.event_type == EventType.SEARCH_PERFORMED:
+            self.search_analytics.record(
+                event.data.get("query", {}), event.data.get("results_count", 0), event.timestamp
+            )
+    
+    def _publish_change(self, event: Event):
+        """אירוע רכב או הזמנה -> שינוי בערוץ העדכונים (core.live_updates)"""
+        data = event.data
+        if event.event_type in self.CAR_EVENT_TYPES:
+            operation = {EventType.CAR_ADDED: "added", EventType.CAR_UPDATED: "updated",
+                         EventType.CAR_DELETED: "deleted"}[event.event_type]
+            self.changes.publish({"type": CAR, "op": operation, "id": event.aggregate_id, "data": data})
+        elif event.event_type in (EventType.BOOKING_CREATED, EventType.BOOKING_CANCELLED):
+            self.changes.publish({
+                "type": AVAILABILITY,
+                "op": "booked" if event.event_type == EventType.BOOKING_CREATED else "released",
+                "booking_id": event.aggregate_id,
+                "car_id": data.get("car_id"),
+                "start_date": data.get("start_date"),
+                "end_date": data.get("end_date"),
+            })
+    
+    def _index_booking_event(self, event: Event):
+        """עדכון לוח ההזמנות מאירוע הזמנה"""
+        if event.event_type == EventType.BOOKING_CREATED:
+            data = event.data
+            if data.get("status") != "cancelled" and data.get("start_date") and data.get("end_date"):
+                self.booking_calendar.add_booking(
+                    event.aggregate_id, data.get("car_id"), data["start_date"], data["end_date"]
+                )
+        elif event.event_type == EventType.BOOKING_CANCELLED:
+            self.booking_calendar.remove_booking(event.aggregate_id)
+    
+    def _index_car_event(self, event: Event):
+        """עדכון אינדקס הטקסט, מוני הצי, המיקומים והפאסטים מאירוע רכב"""
+        data = event.data
+        if event.event_type == EventType.CAR_ADDED:
+            location_id = data.get("location_id") or resolve_location(data.get("location"))
+            self.search_index.index_car(event.aggregate_id, data)
+            self.fleet_stats.upsert_car(event.aggregate_id, data)
+            self.location_index.set_location(event.aggregate_id, location_id)
+            self.facet_index.upsert_car(event.aggregate_id, dict(data, location_id=location_id))
+        elif event.event_type == EventType.CAR_UPDATED:
+            self.search_index.update_car(event.aggregate_id, data)
+            self.fleet_stats.update_car(event.aggregate_id, data)
+            self.facet_index.update_car(event.aggregate_id, data)
+            if "daily_rate" in data:
+                self.pricing.update_base_rate(event.aggregate_id, data["daily_rate"])
+            if "location" in data or "location_id" in data:
+                self.location_index.set_location(
+                    event.aggregate_id, data.get("location_id") or resolve_location(data.get("location"))
+                )
+        elif event.event_type == EventType.CAR_DELETED:
+            self.search_index.remove_car(event.aggregate_id)
+            self.fleet_stats.remove_car(event.aggregate_id)
+            self.location_index.remove_car(event.aggregate_id)
+            self.facet_index.remove_car(event.aggregate_id)
     
     def _init_sample_data(self):
         """יצירת נתונים לדוגמא אם הדאטהבייס ריקה"""
@@ -281,6 +577,7 @@ class EventSourcingService:
         
         for car_data in sample_cars:
             car_id = car_data.pop("id")
+            car_data["location_id"] = resolve_location(car_data["location"])
             car_data["created_at"] = datetime.now().isoformat()
             event = Event(
                 event_type=EventType.CAR_ADDED,
@@ -293,6 +590,7 @@ class EventSourcingService:
     def add_car(self, car_data: Dict, user_id: str = "system") -> str:
         """הוספת רכב חדש"""
         car_id = str(uuid.uuid4())
+        car_data["location_id"] = resolve_location(car_data.get("location"))
         car_data["created_at"] = datetime.now().isoformat()
         
         event = Event(
@@ -306,20 +604,64 @@ class EventSourcingService:
             return car_id
         return None
     
-    def get_all_cars(self) -> List[Dict]:
-        """קבלת כל הרכבים הפעילים"""
-        cars = []
+    def update_car(self, car_id: str, update_data: Dict, user_id: str = "system") -> bool:
+        """עדכון רכב (אירוע CAR_UPDATED) - שינוי מיקום מתורגם למזהה המיקום הקנוני"""
+        data = dict(update_data)
+        if "location" in data:
+            data["location_id"] = resolve_location(data["location"])
+        data.setdefault("updated_at", datetime.now().isoformat())
         
-        # קבלת כל אירועי הרכבים
-        car_events = self.event_store.get_all_events(EventType.CAR_ADDED)
-        car_ids = set(event.aggregate_id for event in car_events)
+        event = Event(
+            event_type=EventType.CAR_UPDATED,
+            aggregate_id=car_id,
+            data=data,
+            user_id=user_id
+        )
+        return self.event_store.append_event(event)
+    
+    def get_all_cars(self) -> List[Dict]:
+        """קבלת כל הרכבים הפעילים - המזהים מאינדקס הפאסטים (רכבים שנמחקו לא בו) ובנייה בשאילתה אחת"""
+        index = self.facet_index
+        return self._matching_cars(sorted(index.ids(index.all_bits())))
+    
+    def is_car_free(self, car_id: str, start_date, end_date) -> bool:
+        """האם הרכב פנוי בטווח התאריכים (לפי לוח ההזמנות)"""
+        return self.booking_calendar.is_free(car_id, start_date, end_date)
+    
+    def get_booked_intervals(self, start_date, end_date) -> List[tuple]:
+        """ההזמנות שחופפות לטווח - (מזהה רכב, התחלה, סיום), ללוח ההזמנות בזיכרון"""
+        return self.booking_calendar.intervals(start_date, end_date)
+    
+    def _booking_lock(self, car_id: str) -> threading.Lock:
+        with self._booking_locks_guard:
+            lock = self._booking_locks.get(car_id)
+            if lock is None:
+                lock = self._booking_locks[car_id] = threading.Lock()
+            return lock
+    
+    def create_booking(self, booking_data: Dict, user_id: str = None) -> Optional[str]:
+        """יצירת הזמנה חדשה (אירוע BOOKING_CREATED). בדיקת הזמינות והכתיבה רצות תחת נעילת הרכב -
+        לוח ההזמנות מתעדכן מהאירוע לפני שהנעילה משתחררת, כך ששתי בקשות מקבילות לא יזמינו את אותו טווח.
+        BookingConflictError אם הרכב כבר מוזמן בחלק מהטווח"""
+        booking_id = str(uuid.uuid4())
+        data = dict(booking_data)
+        data["car_id"] = str(data["car_id"])
+        data.setdefault("status", "confirmed")
+        data.setdefault("created_at", datetime.now().isoformat())
         
-        for car_id in car_ids:
-            car = self._rebuild_car_from_events(car_id)
-            if car and not car.deleted:
-                cars.append(car.to_dict())
+        event = Event(
+            event_type=EventType.BOOKING_CREATED,
+            aggregate_id=booking_id,
+            data=data,
+            user_id=user_id or data.get("customer_email")
+        )
         
-        return cars
+        with self._booking_lock(data["car_id"]):
+            if not self.is_car_free(data["car_id"], data["start_date"], data["end_date"]):
+                raise BookingConflictError("הרכב כבר מוזמן בתאריכים אלו")
+            if self.event_store.append_event(event):
+                return booking_id
+        return None
     
     def get_car_by_id(self, car_id: str) -> Optional[Dict]:
         """קבלת רכב לפי ID"""
@@ -328,9 +670,189 @@ class EventSourcingService:
             return car.to_dict()
         return None
     
-    def _rebuild_car_from_events(self, car_id: str) -> Optional[CarAggregate]:
-        """בנייה מחדש של רכב מהאירועים"""
-        events = self.event_store.get_events(car_id)
+    def get_cars_by_ids(self, car_ids: Iterable[str], fields: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """שליפה מרוכזת של רכבים לפי מזהים - שאילתת אירועים אחת לכל הרכבים (מזהה -> רכב)"""
+        car_ids = list(dict.fromkeys(str(car_id) for car_id in car_ids))
+        if not car_ids:
+            return {}
+        return {car["id"]: car for car in self._matching_cars(car_ids, fields=fields)}
+    
+    def get_facet_counts(self, filters: Dict) -> Dict[str, Dict]:
+        """ספירות הפאסטים לחיפוש (אותם פילטרים כמו בחיפוש) - מחיתוך bitmaps, בלי לבנות רכבים מהאירועים.
+        כמו ב-PostgreSQL: סוג, תיבת הילוכים, מחיר ומיקום מוכר הם פאסטים (נספרים בלי הסינון של עצמם),
+        וחיפוש חופשי, מיקום שלא במילון, סניפים, רשימת רכבים ותאריכים מצמצמים את כל הספירות"""
+        index = self.facet_index
+        location_id = resolve_location(filters.get('location'))
+        text_location = None if location_id else filters.get('location')
+        
+        # סינון שאינו פאסט - bitmap לכל פילטר, וה-AND שלהם הוא הבסיס לכל הספירות
+        narrowing = []
+        if filters.get('location_ids'):
+            narrowing.append(index.bits(set().union(*(self.location_index.cars_at(branch)
+                                                      for branch in filters['location_ids']))))
+        if filters.get('car_ids') is not None:
+            narrowing.append(index.bits(str(car_id) for car_id in filters['car_ids']))
+        if filters.get('q') or text_location:
+            narrowing.append(index.bits(self.search_index.search(text=filters.get('q'), location=text_location)))
+        base = None
+        for bits in narrowing:
+            base = bits if base is None else base & bits
+        available_only = filters.get('available_only', True)
+        if filters.get('start_date') and filters.get('end_date'):
+            universe = index.available_bits() if available_only else index.all_bits()
+            cars = index.ids(universe if base is None else universe & base)
+            base = index.bits(car_id for car_id in cars
+                              if self.is_car_free(car_id, filters['start_date'], filters['end_date']))
+
+        facet_filters = {}
+        if filters.get('car_type'):
+            facet_filters['car_type'] = index.bitmap('car_type', filters['car_type'])
+        if filters.get('transmission'):
+            facet_filters['transmission'] = index.bitmap('transmission', filters['transmission'])
+        if filters.get('max_price'):
+            facet_filters['price'] = index.price_bits(filters['max_price'])
+        if location_id:
+            facet_filters['location'] = index.bitmap('location', location_id)
+        return index.counts(base, facet_filters, available_only=available_only)
+    
+    @timed("event_store")
+    def query_cars(self, query: CarQuery) -> List[Dict]:
+        """הרצת CarQuery (core.car_query) מול האינדקסים בזיכרון - רק הרכבים של העמוד נבנים מהאירועים.
+        שאילתה שכולה שוויון על bitmaps (ומחיר) עם הרבה התאמות נקראת בהדרגה מסדר המיון השמור, מה-cursor
+        ועד שהעמוד מתמלא. אחרת הפילטרים נפתרים באינדקסים (bitmaps, מיקומים, טקסט, לוח ההזמנות) לקבוצת
+        מזהים, והמועמדים הממוינים נשמרים לכל שאילתה (_sorted_candidates) כך שעמוד נוסף הוא bisect בלבד"""
+        if query.per_location is None:
+            bits = self._equality_bits(query)
+            if bits is not None and self._lazy_page_is_cheaper(popcount(bits), query.limit):
+                annotate(query_sort=query.sort, query_plan="sorted-walk")
+                car_ids = self.facet_index.iter_sorted(query.sort, bits, query.after, query.max_price)
+                return self._matching_cars(list(islice(car_ids, query.limit)), fields=query.columns())
+        
+        keys = self._sorted_candidates(query)
+        annotate(query_sort=query.sort, query_plan="candidates", query_candidates=len(keys))
+        start = bisect_right(keys, tuple(query.after)) if query.after is not None else 0
+        if query.per_location is not None:
+            return self._first_per_location(keys[start:], query)
+        end = len(keys) if query.limit is None else start + query.limit
+        return self._matching_cars([key[-1] for key in keys[start:end]], fields=query.columns())
+    
+    @timed("event_store")
+    def count_cars(self, query: CarQuery) -> int:
+        """מספר הרכבים שעוברים את כל הפילטרים - popcount כשהכול ב-bitmaps, אחרת המועמדים (מה-cache)"""
+        bits = self._equality_bits(query)
+        if bits is not None:
+            if query.max_price:
+                bits &= self.facet_index.price_bits(query.max_price)
+            return popcount(bits)
+        return len(self._sorted_candidates(query))
+    
+    def _equality_bits(self, query: CarQuery) -> Optional[int]:
+        """bitmap הרכבים לשאילתה שכל הפילטרים שלה הם תכונות באינדקס (מחיר נבדק במעבר),
+        None אם יש פילטר שנפתר מחוץ ל-bitmaps (טקסט, מיקום לא מוכר, סניפים, רשימת רכבים, תאריכים)"""
+        location_id = resolve_location(query.location)
+        if (query.q or (query.location and not location_id) or query.location_ids
+                or query.car_ids is not None or query.start_date):
+            return None
+        equals = equality_filters(query.filters())
+        if not query.available_only:
+            del equals["available"]
+        if location_id:
+            equals["location"] = location_id
+        return self.facet_index.match(equals)
+    
+    def _lazy_page_is_cheaper(self, matches: int, limit: Optional[int]) -> bool:
+        """מעבר על סדר המיון עולה בערך limit * total / matches בדיקות, ופענוח ומיון - matches.
+        total הוא כל הרכבים באינדקס - סדר המיון כולל גם רכבים לא זמינים, לכל מצב זמינות.
+        כשההתאמות דלילות עדיף לפענח (והתוצאה נשמרת ב-cache לעמודים הבאים)"""
+        total = len(self.facet_index)
+        return bool(matches) and matches * matches >= (limit or matches) * total
+    
+    def _sorted_candidates(self, query: CarQuery) -> List[tuple]:
+        """מפתחות המיון של כל הרכבים המתאימים, ממוינים - מה-cache כל עוד לא היה אירוע רכב / הזמנה"""
+        filters = tuple((name, tuple(value) if isinstance(value, (list, tuple, set)) else value)
+                        for name, value in query.filters().items())
+        version = self._index_version
+        cache_key = (version, query.sort, filters)
+        with self._sorted_keys_lock:
+            keys = self._sorted_keys.get(cache_key)
+            if keys is not None:
+                self._sorted_keys.move_to_end(cache_key)
+                return keys
+        
+        car_ids = self._query_candidates(query)
+        if query.sort == "rate":
+            keys = sorted((self.facet_index.price(car_id), car_id) for car_id in car_ids)
+        else:
+            keys = sorted((car_id,) for car_id in car_ids)
+        
+        with self._sorted_keys_lock:
+            # רשומות מגרסאות קודמות כבר לא יוחזרו - מפנים אותן
+            for stale in [key for key in self._sorted_keys if key[0] != self._index_version]:
+                del self._sorted_keys[stale]
+            if version == self._index_version:
+                self._sorted_keys[cache_key] = keys
+                if len(self._sorted_keys) > self.SORTED_KEYS_CACHE_SIZE:
+                    self._sorted_keys.popitem(last=False)
+        return keys
+    
+    def _first_per_location(self, keys: List[tuple], query: CarQuery) -> List[Dict]:
+        """per_location הרכבים הראשונים (לפי סדר המיון) בכל מיקום, עם location_count לכל שורה"""
+        counts: Dict[Optional[str], int] = {}
+        selected = []
+        for key in keys:
+            location_id = self.location_index.location_of(key[-1])
+            counts[location_id] = counts.get(location_id, 0) + 1
+            if counts[location_id] <= query.per_location:
+                selected.append(key[-1])
+        if query.limit is not None:
+            selected = selected[:query.limit]
+        
+        cars = self._matching_cars(selected, fields=query.columns())
+        for car in cars:
+            car["location_count"] = counts[self.location_index.location_of(car["id"])]
+        return cars
+    
+    def _query_candidates(self, query: CarQuery) -> set:
+        """מזהי הרכבים שעוברים את כל הפילטרים"""
+        equals = equality_filters(query.filters())
+        if not query.available_only:
+            del equals["available"]
+        
+        # שוויון על תכונות קטגוריות - AND של bitmaps
+        car_ids = self.facet_index.match_ids(equals)
+        
+        if query.car_ids is not None:
+            car_ids &= {str(car_id) for car_id in query.car_ids}
+        
+        # מיקום מוכר - אינדקס המיקומים; מיקום שלא במילון - חיפוש prefix בשדה המיקום
+        location_id = resolve_location(query.location)
+        text_location = None if location_id else query.location
+        if car_ids and location_id:
+            car_ids &= self.location_index.cars_at(location_id)
+        if car_ids and query.location_ids:
+            car_ids &= set().union(*(self.location_index.cars_at(branch) for branch in query.location_ids))
+        if car_ids and (query.q or text_location):
+            car_ids &= self.search_index.search(text=query.q, location=text_location)
+        
+        # מחיר ותאריכים - בדיקה לכל מועמד מול המחירים ולוח ההזמנות בזיכרון
+        if car_ids and query.max_price:
+            car_ids = {car_id for car_id in car_ids if self.facet_index.price(car_id) <= query.max_price}
+        if car_ids and query.start_date:
+            car_ids = {car_id for car_id in car_ids if self.is_car_free(car_id, query.start_date, query.end_date)}
+        return car_ids
+    
+    def _matching_cars(self, car_ids: List[str], fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """בניית הרכבים (בשאילתה אחת) לפי הסדר שניתן - הסינון כבר נעשה באינדקסים"""
+        cars = []
+        events_by_car = self.event_store.get_events_for_aggregates(car_ids)
+        for car_id in car_ids:
+            car = self._apply_events(car_id, events_by_car.get(car_id, []))
+            if car and not car.deleted:
+                cars.append(car.to_dict(fields))
+        return cars
+    
+    def _apply_events(self, car_id: str, events: List[Event]) -> Optional[CarAggregate]:
+        """בניית אגרגט רכב מרשימת אירועים"""
         if not events:
             return None
         
@@ -340,10 +862,15 @@ class EventSourcingService:
         
         return car
     
+    def _rebuild_car_from_events(self, car_id: str) -> Optional[CarAggregate]:
+        """בנייה מחדש של רכב מהאירועים"""
+        return self._apply_events(car_id, self.event_store.get_events(car_id))
+    
     def log_search(self, query_data: Dict, results_count: int, user_id: str = "anonymous"):
-        """רישום פעולת חיפוש"""
+        """רישום פעולת חיפוש - האירוע נכנס לתור ונכתב ברקע בקבוצה (search_log)"""
         search_data = {
-            "query": query_data,
+            # תאריכים בשאילתה נשמרים כמחרוזות - אירוע שלא ניתן לסדר היה מפיל את כל הקבוצה
+            "query": json.loads(json.dumps(query_data, ensure_ascii=False, default=str)),
             "results_count": results_count,
             "timestamp": datetime.now().isoformat()
         }
@@ -355,33 +882,11 @@ class EventSourcingService:
             user_id=user_id
         )
         
-        self.event_store.append_event(event)
+        self.search_log.submit(event)
     
     def get_search_statistics(self) -> Dict:
-        """קבלת סטטיסטיקות חיפושים"""
-        search_events = self.event_store.get_all_events(EventType.SEARCH_PERFORMED)
-        
-        total_searches = len(search_events)
-        popular_locations = {}
-        popular_car_types = {}
-        
-        for event in search_events:
-            query = event.data.get("query", {})
-            
-            location = query.get("location")
-            if location:
-                popular_locations[location] = popular_locations.get(location, 0) + 1
-            
-            car_type = query.get("car_type")
-            if car_type:
-                popular_car_types[car_type] = popular_car_types.get(car_type, 0) + 1
-        
-        return {
-            "total_searches": total_searches,
-            "popular_locations": popular_locations,
-            "popular_car_types": popular_car_types,
-            "recent_searches": search_events[:10]  # 10 חיפושים אחרונים
-        }
+        """קבלת סטטיסטיקות חיפושים - מהאנליטיקה שמתעדכנת מכל אירוע חיפוש (בלי לקרוא את האירועים)"""
+        return self.search_analytics.snapshot()
 
-# יצירת instance גלובלי
-event_service = EventSourcingService()
\ No newline at end of file
+# instance גלובלי - נבנה (כולל טעינת האירועים והאינדקסים) בהפעלת השרת או בשימוש הראשון, לא ביבוא
+event_service = LazyService("event_store", EventSourcingService)
\ No newline at end of file
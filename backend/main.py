@@ -3,12 +3,40 @@
 מממש תבנית CQRS ו-Gateway עם PostgreSQL + Trawex API
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Optional
+# דוח זמני ההפעלה (core.startup) - נמדד מכאן: יבוא כל רכיב, ואתחול השירותים ב-lifespan
+from core.startup import IMPORT, STARTUP, run_in_background
+
+with STARTUP.phase("fastapi", IMPORT):
+    from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, StreamingResponse
+    import uvicorn
+from typing import Dict, List, Optional, Union
 from datetime import datetime, date
-import uvicorn
+from dataclasses import replace
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import threading
+
+# כמה זמן ההפעלה מחכה לבדיקת Ollama - אחרי זה השרת עולה והבדיקה ממשיכה ברקע
+STARTUP_AI_WAIT_S = float(os.getenv("STARTUP_AI_WAIT_S", "1"))
+
+@asynccontextmanager
+async def lifespan(app):
+    """אתחול השירותים במקביל (ב-threads) במקום ביבוא: בסיס הנתונים - השרת לא מקבל בקשות לפני שהוא מוכן;
+    ה-RAG ובדיקת Ollama - עד STARTUP_AI_WAIT_S, ואם לא הסתיימה היא ממשיכה ברקע"""
+    database = run_in_background(get_database_service)
+    ai = run_in_background(warm_up_ai) if warm_up_ai else None
+    await database
+    if ai is not None:
+        await asyncio.wait([ai], timeout=STARTUP_AI_WAIT_S)
+    STARTUP.mark_ready()
+    print(STARTUP.format())
+    yield
+    if _database_service is not None:
+        _database_service.search_log.close()
+        _database_service.pricing.stop()
 
 # יצירת אפליקציית FastAPI
 app = FastAPI(
@@ -16,13 +44,22 @@ app = FastAPI(
     description="מערכת ניהול השכרת רכבים עם PostgreSQL ו-Trawex API",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI
-    redoc_url="/redoc"  # ReDoc
+    redoc_url="/redoc",  # ReDoc
+    lifespan=lifespan
 )
 
-# יבוא הrouters והוספתם
-from api.commands.car_commands import router as commands_router
-from api.queries.car_queries import router as queries_router
-from api.auth_endpoints import router as auth_router
+# Tracing (core.tracing) - כבוי אלא אם OTEL_TRACES_EXPORTER מוגדר (console / file / otlp)
+with STARTUP.phase("tracing", IMPORT):
+    from core.tracing import TracingMiddleware, setup_tracing
+    setup_tracing("car-rental-api")
+
+# יבוא הrouters והוספתם - היבוא לא מאתחל שירותים (core.startup.LazyService)
+with STARTUP.phase("router.commands", IMPORT):
+    from api.commands.car_commands import router as commands_router
+with STARTUP.phase("router.queries", IMPORT):
+    from api.queries.car_queries import router as queries_router
+with STARTUP.phase("router.auth", IMPORT):
+    from api.auth_endpoints import router as auth_router
 
 app.include_router(commands_router)
 app.include_router(queries_router)
@@ -30,15 +67,19 @@ app.include_router(auth_router)
 
 # הוספת Admin router
 try:
-    from api.admin_endpoints import router as admin_router
+    with STARTUP.phase("router.admin", IMPORT):
+        from api.admin_endpoints import router as admin_router
     app.include_router(admin_router)
     print("✅ Admin Router נטען בהצלחה")
 except ImportError as e:
     print(f"⚠️ Admin Router לא זמין: {e}")
 
 # הוספת AI router
+check_ai_health = None
+warm_up_ai = None
 try:
-    from api.ai_endpoints import router as ai_router
+    with STARTUP.phase("router.ai", IMPORT):
+        from api.ai_endpoints import router as ai_router, check_ai_health, warm_up_ai
     app.include_router(ai_router)
     print("✅ AI Router נטען בהצלחה")
 except ImportError as e:
@@ -46,7 +87,8 @@ except ImportError as e:
 
 # הוספת Trawex API router
 try:
-    from services.trawex_api import search_external_cars, get_external_locations, test_external_api
+    with STARTUP.phase("trawex", IMPORT):
+        from services.trawex_api import search_external_cars, get_external_locations, test_external_api
     TRAWEX_AVAILABLE = True
     print("✅ Trawex API נטען בהצלחה")
 except ImportError as e:
@@ -62,32 +104,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# מדדי בקשות לכל route (core.metrics) ו-span לכל בקשה - נרשמים אחרונים כדי לעטוף את כל שאר ה-middleware
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, MetricsMiddleware
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
 # ====================
-# חיבור לבסיס הנתונים PostgreSQL
+# בסיס הנתונים - PostgreSQL אם מתחבר, אחרת Event Store (נבחר בהפעלה, ראו get_database_service)
 # ====================
 
 try:
-    from database.postgres_connection import db
-    print("✅ חיבור PostgreSQL נטען בהצלחה")
-    DATABASE_AVAILABLE = True
+    with STARTUP.phase("database.postgres", IMPORT):
+        from database.postgres_connection import db
 except ImportError as e:
+    db = None
     print(f"⚠️ PostgreSQL לא זמין: {e}")
     print("💡 ודא שDocker רץ ושהחבילות psycopg2-binary ו-sqlalchemy מותקנות")
-    DATABASE_AVAILABLE = False
-    
-    # חיבור חלופי ל-Event Store
-    try:
-        from database.event_store import event_service
-        print("🔄 משתמש ב-Event Store כחלופה")
-    except ImportError:
-        print("❌ אין חיבור לבסיס נתונים")
+
+with STARTUP.phase("database.event_store", IMPORT):
+    from database.event_store import event_service
+
+# נקבע כשבסיס הנתונים נבחר
+DATABASE_AVAILABLE = False
 
 # ====================
 # מודלי נתונים (Pydantic)
 # ====================
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from enum import Enum
+from core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_BATCH_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+)
+from core.booking_calendar import BookingConflictError, InvalidDateRangeError, validate_range
+from core.http_cache import conditional_get
+from core.serialization import BulkCarSerializer, InvalidFieldsError, json_response, parse_features
+from core.locations import location_coords, location_name, resolve_location
+from core.geo import InvalidCoordinatesError, branch_index, validate_point
+from core.car_query import CarQuery, CarQueryEngine
+from core.live_updates import LiveUpdates
+from core.auth_service import require_admin
+from models.user_models import User
+from core.pricing import MAX_QUOTE_CARS, InvalidQuoteError, booking_price, rental_summary, sorted_quotes
 
 class CarType(str, Enum):
     ECONOMY = "economy"
@@ -103,15 +161,17 @@ class TransmissionType(str, Enum):
     AUTOMATIC = "automatic"
 
 class Car(BaseModel):
-    id: int
+    id: Union[int, str]  # PostgreSQL - SERIAL, Event Store - מחרוזת (car-1 / uuid)
     make: str  # יצרן
     model: str  # דגם
     year: int
     car_type: str
     transmission: str
     daily_rate: float  # מחיר יומי
+    effective_rate: Optional[float] = None  # מחיר דינמי ליום תחילת השאילתה (core.dynamic_pricing)
     available: bool
     location: str
+    location_id: Optional[str] = None  # מזהה מיקום קנוני (core.locations)
     fuel_type: str
     seats: int
     image_url: Optional[str] = None
@@ -120,12 +180,46 @@ class Car(BaseModel):
     updated_at: Optional[datetime] = None
 
 class CarSearchQuery(BaseModel):
+    q: Optional[str] = None  # חיפוש חופשי: יצרן, דגם, מיקום, ספק, תכונות
     location: Optional[str] = None
     car_type: Optional[str] = None
     max_price: Optional[float] = None
     transmission: Optional[str] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+class CarBatchQuery(BaseModel):
+    """שליפה מרוכזת של רכבים לפי מזהים"""
+    ids: List[Union[int, str]] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class QuoteRequest(BaseModel):
+    """הצעת מחיר לכמה רכבים - רשימת מזהים, או פילטרים כמו בחיפוש"""
+    start_date: date
+    end_date: date
+    car_ids: Optional[List[Union[int, str]]] = Field(None, min_length=1, max_length=MAX_QUOTE_CARS)
+    q: Optional[str] = None
+    location: Optional[str] = None
+    car_type: Optional[str] = None
+    max_price: Optional[float] = None
+    transmission: Optional[str] = None
+    limit: int = Field(MAX_QUOTE_CARS, ge=1, le=MAX_QUOTE_CARS)
+
+class CarPage(BaseModel):
+    """עמוד רכבים עם cursor לעמוד הבא"""
+    cars: List[Car]
+    next_cursor: Optional[str] = None
+    count: int
+    # פאסט -> ערך -> מספר רכבים (רק כשמבקשים facets=true, בעמוד הראשון)
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+
+# סריאליזציה בכמות - ולידציה אחת לכל העמוד ו-orjson
+car_serializer = BulkCarSerializer(Car)
+
+# רדיוס ברירת המחדל ורדיוס מקסימלי (ק"מ) לחיפוש סניפים קרובים
+NEARBY_RADIUS_KM = 25.0
+MAX_RADIUS_KM = 1000.0
 
 class ExternalCarSearchQuery(BaseModel):
     pickup_location: str
@@ -135,7 +229,7 @@ class ExternalCarSearchQuery(BaseModel):
     return_time: Optional[str] = "10:00"
 
 class BookingRequest(BaseModel):
-    car_id: int
+    car_id: Union[int, str]
     customer_name: str
     customer_email: str
     start_date: date
@@ -146,12 +240,77 @@ class BookingRequest(BaseModel):
 # פונקציות עזר לבסיס הנתונים
 # ====================
 
+_database_service = None
+_database_lock = threading.Lock()
+
 def get_database_service():
-    """החזרת שירות בסיס הנתונים הזמין"""
-    if DATABASE_AVAILABLE:
-        return db
-    else:
-        return event_service
+    """החזרת שירות בסיס הנתונים הזמין - נבחר ומאותחל פעם אחת (ב-lifespan, או בקריאה הראשונה)"""
+    global _database_service
+    if _database_service is None:
+        with _database_lock:
+            if _database_service is None:
+                service = _connect_database()
+                service.changes.subscribe(live_updates.publish)
+                _database_service = service
+    return _database_service
+
+def _connect_database():
+    global DATABASE_AVAILABLE
+    if db is not None:
+        try:
+            service = db.get_instance()
+            DATABASE_AVAILABLE = True
+            print("✅ חיבור PostgreSQL נטען בהצלחה")
+            return service
+        except Exception as e:
+            print(f"⚠️ PostgreSQL לא זמין: {e}")
+    print("🔄 משתמש ב-Event Store כחלופה")
+    return event_service.get_instance()
+
+# ערוץ העדכונים בזמן אמת (SSE) - שינויים מבסיס הנתונים הזמין; סטטוס ה-AI נבדק פעם אחת לכל השרת
+live_updates = LiveUpdates(
+    stats_provider=lambda: get_database_service().fleet_stats.cars_by_type(),
+    status_provider=check_ai_health
+)
+
+def get_query_engine() -> CarQueryEngine:
+    """מנוע שאילתות הרכבים מעל בסיס הנתונים הזמין"""
+    return CarQueryEngine(get_database_service())
+
+def find_cars_at_branches(branches: List[tuple], query: CarQuery,
+                          per_branch: int = DEFAULT_PAGE_SIZE) -> List[dict]:
+    """הרכבים המתאימים בכל סניף - branches היא רשימת (מזהה מיקום, מרחק) ממוינת לפי מרחק.
+    מחזיר רק סניפים שיש בהם רכב מתאים: [{location_id, name, distance_km, count, cars}]"""
+    location_ids = [location_id for location_id, _ in branches]
+    if not location_ids:
+        return []
+    
+    # שאילתה אחת לכל הסניפים, מהזול ליקר בכל סניף - החיתוך ל-per_branch נעשה ב-backend
+    # (CarQuery.per_location), ו-location_count הוא מספר הרכבים המתאימים בסניף
+    engine = get_query_engine()
+    fields = query.fields
+    rows = engine.rows(replace(
+        query, location_ids=location_ids, sort="rate", limit=None, per_location=per_branch,
+        fields=tuple(dict.fromkeys(fields + ("location_id",))) if fields else None
+    ))
+    cars_by_location = {}
+    counts = {}
+    for row in rows:
+        counts[row['location_id']] = row.pop('location_count')
+        cars_by_location.setdefault(row['location_id'], []).append(row)
+    
+    results = []
+    for location_id, distance in branches:
+        cars = cars_by_location.get(location_id)
+        if cars:
+            results.append({
+                "location_id": location_id,
+                "name": location_name(location_id),
+                "distance_km": distance,
+                "count": counts[location_id],
+                "cars": car_serializer.to_payload(cars, trusted=engine.trusted, fields=fields),
+            })
+    return results
 
 # ====================
 # API Endpoints (CQRS Pattern)
@@ -178,6 +337,16 @@ async def health_check():
         "external_api": "Trawex" if TRAWEX_AVAILABLE else "Not Available"
     }
 
+@app.get("/api/startup")
+async def startup_report():
+    """זמני ההפעלה: יבוא ואתחול לכל רכיב (core.startup)"""
+    return STARTUP.report()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """מדדי ביצועים בפורמט Prometheus: בקשות וזמני תגובה לכל route, קריאות ל-backends ושגיאות"""
+    return Response(content=METRICS_REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 # ====================
 # Trawex External API Endpoints
 # ====================
@@ -240,19 +409,27 @@ if TRAWEX_AVAILABLE:
         pickup_date: str,
         return_date: str,
         pickup_time: str = "10:00",
-        return_time: str = "10:00"
+        return_time: str = "10:00",
+        radius_km: float = Query(NEARBY_RADIUS_KM, gt=0, le=MAX_RADIUS_KM)
     ):
-        """חיפוש משולב - נתונים מקומיים + חיצוניים"""
+        """חיפוש משולב - נתונים מקומיים + חיצוניים.
+        רכבים מקומיים נלקחים מהסניפים ברדיוס radius_km ממיקום האיסוף, מהקרוב לרחוק"""
         try:
             # חיפוש בנתונים מקומיים
-            local_query = CarSearchQuery(location=pickup_location)
-            db_service = get_database_service()
+            pickup_id = resolve_location(pickup_location)
             
-            if DATABASE_AVAILABLE:
-                local_cars = db_service.search_cars({"location": pickup_location})
+            if location_coords(pickup_id):
+                branches = branch_index.within(*location_coords(pickup_id), radius_km)
+                local_cars = [
+                    dict(car, distance_km=branch["distance_km"])
+                    for branch in find_cars_at_branches(branches, CarQuery(), per_branch=MAX_PAGE_SIZE)
+                    for car in branch["cars"]
+                ][:MAX_PAGE_SIZE]
             else:
-                all_cars = db_service.get_all_cars()
-                local_cars = [car for car in all_cars if pickup_location.lower() in car.get('location', '').lower()]
+                # מיקום לא מוכר - חיפוש טקסט בשדה המיקום
+                local_cars = get_query_engine().rows(
+                    CarQuery(location=pickup_location, sort="rate", limit=MAX_PAGE_SIZE)
+                )
             
             # חיפוש בנתונים חיצוניים
             external_cars = search_external_cars(pickup_location, pickup_date, return_date, pickup_time, return_time)
@@ -272,156 +449,244 @@ if TRAWEX_AVAILABLE:
 # Query Endpoints (CQRS - Query Side)
 # ====================
 
-@app.get("/api/cars", response_model=List[Car])
-async def get_all_cars():
-    """החזרת כל הרכבים במערכת"""
+@app.get("/api/cars", response_model=CarPage)
+async def get_all_cars(
+    request: Request,
+    response: Response,
+    q: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)"),
+    facets: bool = Query(False, description="החזרת ספירות פאסטים (סוג, ספק, הילוכים, מיקום, מחיר)")
+):
+    """החזרת הרכבים במערכת - בעמודים לפי id (keyset), עם חיפוש חופשי וטווח תאריכים אופציונליים"""
     try:
         db_service = get_database_service()
-        cars_data = db_service.get_all_cars()
+        # Conditional GET - אם הנתונים לא השתנו מאז הבקשה הקודמת מחזירים 304
+        not_modified = conditional_get(request, response, db_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
         
-        cars = []
-        for car_data in cars_data:
-            # טיפול בתכונות JSON
-            if 'features' in car_data and isinstance(car_data['features'], str):
-                try:
-                    import json
-                    car_data['features'] = json.loads(car_data['features'])
-                except:
-                    car_data['features'] = []
-            
-            # המרה למבנה Pydantic
-            car = Car(**car_data)
-            cars.append(car)
+        window = validate_range(start_date, end_date)
+        selected = car_serializer.parse_fields(fields)
+        query = CarQuery(
+            q=q, start_date=window[0] if window else None, end_date=window[1] if window else None,
+            sort="id", limit=limit, fields=selected
+        )
+        
+        engine = CarQueryEngine(db_service)
+        cars_data, next_cursor = engine.page(query, cursor)
         
-        return cars
+        # ספירות הפאסטים לא תלויות בעמוד - מחושבות רק בעמוד הראשון
+        extra = {"facets": engine.facets(query)} if facets and not cursor else None
+        
+        return car_serializer.page_response(
+            cars_data, next_cursor, trusted=engine.trusted, headers=response.headers, fields=selected, extra=extra
+        )
+    except (InvalidCursorError, InvalidDateRangeError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בקבלת רכבים: {str(e)}")
 
+@app.post("/api/cars/batch")
+async def get_cars_batch(
+    query: CarBatchQuery,
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """שליפת כמה רכבים לפי מזהים בבקשה אחת - מחזיר את הרכבים שנמצאו ואת המזהים החסרים"""
+    try:
+        db_service = get_database_service()
+        selected = car_serializer.parse_fields(fields)
+        requested_ids = list(dict.fromkeys(str(car_id) for car_id in query.ids))
+        
+        if DATABASE_AVAILABLE:
+            cars_by_id = db_service.get_cars_by_ids(requested_ids, columns=selected)
+        else:
+            cars_by_id = db_service.get_cars_by_ids(requested_ids, fields=selected)
+        
+        return car_serializer.batch_response(
+            cars_by_id, requested_ids, trusted=not DATABASE_AVAILABLE, fields=selected
+        )
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה בשליפת רכבים: {str(e)}")
+
+@app.get("/api/cars/nearby")
+async def get_cars_nearby(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    location: Optional[str] = Query(None, description="מיקום מוכר כנקודת מוצא (במקום lat/lon)"),
+    radius_km: float = Query(NEARBY_RADIUS_KM, gt=0, le=MAX_RADIUS_KM),
+    k: int = Query(5, ge=1, le=len(branch_index) or 1, description="מספר סניפים מקסימלי"),
+    car_type: Optional[str] = None,
+    max_price: Optional[float] = None,
+    transmission: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    per_branch: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """הסניפים הקרובים לנקודה שיש בהם רכב מתאים - ממוינים לפי מרחק, עם הרכבים בכל סניף"""
+    try:
+        if lat is not None and lon is not None:
+            origin = {"lat": lat, "lon": lon}
+            validate_point(lat, lon)
+        elif location:
+            location_id = resolve_location(location)
+            if not location_coords(location_id):
+                raise HTTPException(status_code=400, detail=f"מיקום לא מוכר: {location}")
+            lat, lon = location_coords(location_id)
+            origin = {"lat": lat, "lon": lon, "location_id": location_id}
+        else:
+            raise HTTPException(status_code=400, detail="יש לציין lat ו-lon או location")
+        
+        window = validate_range(start_date, end_date)
+        query = CarQuery(
+            car_type=car_type, max_price=max_price, transmission=transmission,
+            start_date=window[0] if window else None, end_date=window[1] if window else None,
+            fields=car_serializer.parse_fields(fields)
+        )
+        
+        # כל הסניפים ברדיוס - k חל על הסניפים שיש בהם רכב מתאים
+        branches = find_cars_at_branches(branch_index.within(lat, lon, radius_km), query, per_branch=per_branch)[:k]
+        return json_response({"origin": origin, "radius_km": radius_km, "branches": branches, "count": len(branches)})
+    except HTTPException:
+        raise
+    except (InvalidCoordinatesError, InvalidDateRangeError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה בחיפוש סניפים קרובים: {str(e)}")
+
+@app.post("/api/cars/quote")
+async def quote_cars(
+    query: QuoteRequest,
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)")
+):
+    """הצעת מחיר לכל הרכבים המתאימים והפנויים בטווח - תוספת סוף שבוע והנחת השכרה ארוכה,
+    מחושבת לכל המועמדים במעבר וקטורי אחד וממוינת מהזול ליקר"""
+    try:
+        window = validate_range(query.start_date, query.end_date)
+        selected = car_serializer.parse_fields(fields)
+        columns = tuple(dict.fromkeys(selected + ("daily_rate",))) if selected else None
+        
+        engine = get_query_engine()
+        rows = engine.rows(CarQuery(
+            q=query.q, location=query.location, car_type=query.car_type, transmission=query.transmission,
+            max_price=query.max_price, car_ids=query.car_ids, start_date=window[0], end_date=window[1],
+            sort="rate", limit=query.limit, fields=columns
+        ))
+        cars = car_serializer.to_payload(rows, trusted=engine.trusted, fields=columns)
+        # מחירים לפי יום מהמטריצה הדינמית (כשקיימת) - בלי חישוב תמחור בבקשה
+        daily_rates = engine.daily_rates(cars, *window)
+        if daily_rates is None:
+            daily_rates = [car["daily_rate"] for car in cars]
+        # daily_rate נשלף בשביל החישוב - בתשובה רק השדות שביקשו
+        if selected and "daily_rate" not in selected:
+            cars = [{field: car[field] for field in selected} for car in cars]
+        quotes = sorted_quotes(cars, *window, daily_rates=daily_rates)
+        
+        payload = {
+            "start_date": window[0],
+            "end_date": window[1],
+            **rental_summary(*window),
+            "count": len(quotes),
+            "quotes": quotes,
+        }
+        if query.car_ids is not None:
+            # מזהים שאין להם הצעה - לא קיימים (כולל מזהים לא מספריים ב-PostgreSQL), לא זמינים או תפוסים בטווח
+            quoted = {str(quote["id"]) for quote in quotes}
+            payload["missing"] = [car_id for car_id in dict.fromkeys(str(car_id) for car_id in query.car_ids)
+                                  if car_id not in quoted]
+        return json_response(payload)
+    except (InvalidDateRangeError, InvalidFieldsError, InvalidQuoteError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה בחישוב הצעת מחיר: {str(e)}")
+
 @app.get("/api/cars/{car_id}", response_model=Car)
-async def get_car_by_id(car_id: str):
+async def get_car_by_id(car_id: str, request: Request, response: Response):
     """קבלת פרטי רכב לפי ID"""
     try:
         db_service = get_database_service()
+        not_modified = conditional_get(request, response, db_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
+        
         car_data = db_service.get_car_by_id(car_id)
         
         if not car_data:
             raise HTTPException(status_code=404, detail="רכב לא נמצא")
         
-        # טיפול בתכונות JSON
-        if 'features' in car_data and isinstance(car_data['features'], str):
-            try:
-                import json
-                car_data['features'] = json.loads(car_data['features'])
-            except:
-                car_data['features'] = []
-        
-        return Car(**car_data)
+        return Car(**parse_features(car_data))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בקבלת רכב: {str(e)}")
 
-@app.post("/api/cars/search", response_model=List[Car])
-async def search_cars(query: CarSearchQuery):
-    """חיפוש רכבים לפי קריטריונים"""
+@app.post("/api/cars/search", response_model=CarPage)
+async def search_cars(
+    query: CarSearchQuery,
+    fields: Optional[str] = Query(None, description="שדות להחזרה, מופרדים בפסיק (id תמיד נכלל)"),
+    facets: bool = Query(False, description="החזרת ספירות פאסטים (סוג, ספק, הילוכים, מיקום, מחיר)")
+):
+    """חיפוש רכבים לפי קריטריונים - בעמודים (keyset), עם ספירות פאסטים אופציונליות"""
     try:
         db_service = get_database_service()
+        selected = car_serializer.parse_fields(fields)
         
-        # המרת query ל-dict לDB
-        filters = {}
-        if query.location:
-            filters['location'] = query.location
-        if query.car_type:
-            filters['car_type'] = query.car_type
-        if query.max_price:
-            filters['max_price'] = query.max_price
-        if query.transmission:
-            filters['transmission'] = query.transmission
+        # טווח תאריכים - רק רכבים ללא הזמנה חופפת
+        window = validate_range(query.start_date, query.end_date)
+        car_query = CarQuery(
+            q=query.q, location=query.location, car_type=query.car_type, transmission=query.transmission,
+            max_price=query.max_price, start_date=window[0] if window else None,
+            end_date=window[1] if window else None, sort="rate", limit=query.limit, fields=selected
+        )
         
-        # חיפוש ברכבים
-        if DATABASE_AVAILABLE:
-            cars_data = db_service.search_cars(filters)
-        else:
-            # חיפוש ב-Event Store
-            all_cars = db_service.get_all_cars()
-            cars_data = []
-            
-            for car_data in all_cars:
-                # בדיקת זמינות
-                if not car_data.get('available', True):
-                    continue
-                
-                # סינון לפי מיקום
-                if query.location and query.location.lower() not in car_data.get('location', '').lower():
-                    continue
-                
-                # סינון לפי סוג רכב
-                if query.car_type and car_data.get('car_type') != query.car_type:
-                    continue
-                
-                # סינון לפי מחיר מקסימלי
-                if query.max_price and car_data.get('daily_rate', 0) > query.max_price:
-                    continue
-                
-                # סינון לפי תיבת הילוכים
-                if query.transmission and car_data.get('transmission') != query.transmission:
-                    continue
-                
-                cars_data.append(car_data)
+        # מהזול ליקר - מפתח המיון היציב הוא (daily_rate, id) בשני ה-backends
+        engine = CarQueryEngine(db_service)
+        cars_data, next_cursor = engine.page(car_query, query.cursor)
         
-        # המרה לרשימת Car objects
-        cars = []
-        for car_data in cars_data:
-            # טיפול בתכונות JSON
-            if 'features' in car_data and isinstance(car_data['features'], str):
-                try:
-                    import json
-                    car_data['features'] = json.loads(car_data['features'])
-                except:
-                    car_data['features'] = []
-            
-            cars.append(Car(**car_data))
+        # רישום פעולת חיפוש (פעם אחת - בעמוד הראשון בלבד) - נכנס לתור ונכתב ברקע
+        if hasattr(db_service, 'log_search') and not query.cursor:
+            query_dict = query.dict(exclude_unset=True, exclude={"cursor", "limit"})
+            db_service.log_search(query_dict, engine.total(car_query, cars_data, next_cursor))
         
-        # רישום פעולת חיפוש
-        if hasattr(db_service, 'log_search'):
-            query_dict = query.dict(exclude_unset=True)
-            db_service.log_search(query_dict, len(cars))
+        # ספירות הפאסטים - מחיתוך אינדקסים / שאילתה אחת, לא שאילתה לכל פאסט
+        extra = {"facets": engine.facets(car_query)} if facets and not query.cursor else None
         
-        return cars
+        return car_serializer.page_response(
+            cars_data, next_cursor, trusted=engine.trusted, fields=selected, extra=extra
+        )
+    except (InvalidCursorError, InvalidDateRangeError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בחיפוש רכבים: {str(e)}")
 
 @app.get("/api/stats/cars-by-type")
-async def get_cars_stats():
+async def get_cars_stats(request: Request, response: Response):
     """סטטיסטיקות רכבים לפי סוג - לגרפים"""
     try:
         db_service = get_database_service()
+        not_modified = conditional_get(request, response, db_service.get_data_version("cars"))
+        if not_modified:
+            return not_modified
         
-        if DATABASE_AVAILABLE:
-            # שימוש בפונקציית סטטיסטיקות של PostgreSQL
-            stats_data = db_service.get_cars_by_type_stats()
-        else:
-            # חישוב סטטיסטיקות מ-Event Store
-            cars = db_service.get_all_cars()
-            from collections import Counter
-            type_counts = Counter([car.get("car_type", "unknown") for car in cars])
-            stats_data = [
-                {"type": car_type, "count": count} 
-                for car_type, count in type_counts.items()
-            ]
-        
-        return {
-            "data": stats_data,
-            "total_cars": sum(item["count"] for item in stats_data)
-        }
+        # מונים שמתעדכנים מכל כתיבה/אירוע - בלי סריקה או GROUP BY בכל בקשה
+        return db_service.fleet_stats.cars_by_type()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה בקבלת סטטיסטיקות: {str(e)}")
 
 @app.get("/api/stats/search-analytics")
-async def get_search_analytics():
+async def get_search_analytics(request: Request, response: Response):
     """סטטיסטיקות חיפושים - לגרפים"""
     try:
         db_service = get_database_service()
+        not_modified = conditional_get(request, response, db_service.get_data_version("searches"))
+        if not_modified:
+            return not_modified
         
         if hasattr(db_service, 'get_search_statistics'):
             return db_service.get_search_statistics()
@@ -430,6 +695,16 @@ async def get_search_analytics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"שגיאה באנליטיקות: {str(e)}")
 
+@app.get("/api/events/stream")
+async def stream_events(request: Request):
+    """עדכונים בזמן אמת (Server-Sent Events) במקום polling: שינויי רכבים (car), זמינות (availability),
+    מוני הצי (stats) וסטטוס AI (status). חיבור מחדש עם Last-Event-ID משלים הודעות שפוספסו"""
+    return StreamingResponse(
+        live_updates.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ====================
 # Command Endpoints (CQRS - Command Side)
 # ====================
@@ -445,15 +720,7 @@ async def create_booking(booking: BookingRequest):
         if not car_data:
             raise HTTPException(status_code=404, detail="רכב לא נמצא")
         
-        # טיפול בתכונות JSON
-        if 'features' in car_data and isinstance(car_data['features'], str):
-            try:
-                import json
-                car_data['features'] = json.loads(car_data['features'])
-            except:
-                car_data['features'] = []
-        
-        car = Car(**car_data)
+        car = Car(**parse_features(car_data))
         if not car.available:
             raise HTTPException(status_code=400, detail="רכב לא זמין להזמנה")
         
@@ -462,7 +729,13 @@ async def create_booking(booking: BookingRequest):
         if days <= 0:
             raise HTTPException(status_code=400, detail="תאריכים לא תקינים")
         
-        total_price = car.daily_rate * days
+        # אותם כללי מחיר כמו בהצעת המחיר (מחיר דינמי, סוף שבוע, השכרה ארוכה)
+        daily_rates = get_query_engine().daily_rates([car_data], booking.start_date, booking.end_date)
+        price_breakdown = booking_price(
+            car.daily_rate, booking.start_date, booking.end_date,
+            daily_rates[0] if daily_rates is not None else None
+        )
+        total_price = price_breakdown["total"]
         
         # יצירת הזמנה
         booking_data = {
@@ -472,15 +745,18 @@ async def create_booking(booking: BookingRequest):
             "start_date": booking.start_date.isoformat(),
             "end_date": booking.end_date.isoformat(),
             "pickup_location": booking.pickup_location,
+            "daily_rate": price_breakdown["daily_rate"],
             "total_price": total_price,
             "days": days
         }
         
-        if hasattr(db_service, 'create_booking'):
-            booking_id = db_service.create_booking(booking_data)
-        else:
-            # שימוש ב-event service
+        # בדיקת החפיפה עם הזמנות קיימות והכתיבה - יחד, תחת נעילת הרכב / בטרנזקציה אחת
+        try:
             booking_id = db_service.create_booking(booking_data)
+        except BookingConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if booking_id is None:
+            raise HTTPException(status_code=500, detail="שגיאה ביצירת ההזמנה")
         
         return {
             "booking_id": booking_id,
@@ -489,7 +765,10 @@ async def create_booking(booking: BookingRequest):
             "customer": booking.customer_name,
             "dates": f"{booking.start_date} - {booking.end_date}",
             "days": days,
-            "daily_rate": car.daily_rate,
+            # ממוצע המחירים היומיים שחויבו (המחיר הדינמי של כל יום נמצא ב-price_breakdown)
+            "daily_rate": price_breakdown["daily_rate"],
+            # שורות המחיר - total_price כולל תוספת סוף שבוע והנחת השכרה ארוכה
+            "price_breakdown": price_breakdown,
             "total_price": total_price,
             "message": "🎉 ההזמנה אושרה בהצלחה!"
         }
@@ -501,6 +780,7 @@ async def create_booking(booking: BookingRequest):
 @app.get("/api/database-info")
 async def get_database_info():
     """מידע על בסיס הנתונים ושירותים חיצוניים"""
+    db_service = get_database_service()
     return {
         "database_type": "PostgreSQL" if DATABASE_AVAILABLE else "Event Store",
         "database_available": DATABASE_AVAILABLE,
@@ -512,12 +792,29 @@ async def get_database_info():
             "local_database": DATABASE_AVAILABLE,
             "external_api": TRAWEX_AVAILABLE,
             "ai_service": True  # תמיד זמין
-        }
+        },
+        # תור רישום החיפושים (כתיבה ברקע) - עומק, רשומות שנכתבו והושלכו
+        "search_log": db_service.search_log.stats(),
+        # מטריצת המחירים הדינמיים - גודל, זמן החישוב האחרון
+        "pricing": db_service.pricing.stats(),
+        # חיבורי ה-SSE הפתוחים והודעות שנשלחו
+        "live_updates": live_updates.stats()
     }
 
+@app.post("/api/pricing/recompute")
+async def recompute_pricing(admin_user: User = Depends(require_admin)):
+    """חישוב מחדש של מטריצת המחירים הדינמיים עכשיו (בלי לחכות לחישוב התקופתי) - מנהל בלבד.
+    החישוב רץ ב-thread כדי לא לחסום את ה-event loop"""
+    try:
+        pricing = get_database_service().pricing
+        await asyncio.to_thread(pricing.recompute)
+        return pricing.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה בחישוב מחירים: {str(e)}")
+
 if __name__ == "__main__":
     print("🚗 מפעיל שרת השכרת רכבים...")
-    print(f"📊 בסיס נתונים: {'PostgreSQL' if DATABASE_AVAILABLE else 'Event Store'}")
+    print(f"📊 בסיס נתונים: {'PostgreSQL (אם מתחבר) או Event Store' if db is not None else 'Event Store'} - נבחר בהפעלה")
     print(f"🌐 API חיצוני: {'Trawex זמין' if TRAWEX_AVAILABLE else 'לא זמין'}")
     uvicorn.run(
         "main:app",
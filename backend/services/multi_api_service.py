@@ -12,6 +12,9 @@ import asyncio
 import aiohttp
 from dataclasses import dataclass
 
+from core.locations import resolve_location
+from core.tracing import annotate, span
+
 # הגדרת logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,7 +52,11 @@ class MultiAPICarService:
         self.all_cars = []
         
     async def fetch_all_cars(self, search_params: Dict) -> List[CarData]:
-        """חיפוש רכבים מכל ה-APIs בו-זמנית"""
+        """חיפוש רכבים מכל ה-APIs בו-זמנית (span לכל החיפוש, ומתחתיו span לכל ספק)"""
+        with span("multi_api.fetch_all_cars", {"providers": len(self.apis)}):
+            return await self._fetch_all_cars(search_params)
+    
+    async def _fetch_all_cars(self, search_params: Dict) -> List[CarData]:
         logger.info("מתחיל חיפוש רכבים מכל ה-APIs...")
         
         # יצירת tasks לכל API
@@ -75,17 +82,23 @@ class MultiAPICarService:
         
         # הסרת כפילויות
         unique_cars = self._remove_duplicates(all_cars)
+        annotate(cars=len(all_cars), unique_cars=len(unique_cars))
         logger.info(f"סה\"כ {len(unique_cars)} רכבים ייחודיים")
         
         return unique_cars
     
     async def _fetch_from_api(self, api_name: str, api_instance, search_params: Dict) -> List[CarData]:
         """חיפוש מAPI ספציפי"""
-        try:
-            return await api_instance.search_cars(search_params)
-        except Exception as e:
-            logger.error(f"שגיאה ב-{api_name}: {e}")
-            return []
+        with span(f"multi_api.{api_name}", {"provider": api_name,
+                                             "pickup_location": search_params.get("pickup_location", "")}):
+            try:
+                cars = await api_instance.search_cars(search_params)
+                annotate(cars=len(cars))
+                return cars
+            except Exception as e:
+                annotate(error=str(e))
+                logger.error(f"שגיאה ב-{api_name}: {e}")
+                return []
     
     def _remove_duplicates(self, cars: List[CarData]) -> List[CarData]:
         """הסרת רכבים כפולים לפי make, model, year ומיקום"""
@@ -93,7 +106,9 @@ class MultiAPICarService:
         unique_cars = []
         
         for car in cars:
-            key = f"{car.make}_{car.model}_{car.year}_{car.location}_{car.supplier}"
+            # מיקום לפי מזהה קנוני - "Tel Aviv" ו"תל אביב" הם אותו מיקום
+            location = resolve_location(car.location) or car.location
+            key = f"{car.make}_{car.model}_{car.year}_{location}_{car.supplier}"
             if key not in seen:
                 seen.add(key)
                 unique_cars.append(car)
@@ -103,8 +118,11 @@ class MultiAPICarService:
     def sync_to_database(self, cars: List[CarData]):
         """סנכרון הרכבים לבסיס הנתונים"""
         try:
-            # ניסיון חיבור לבסיס נתונים
+            # רק אם PostgreSQL כבר מחובר (נבחר בהפעלה) - במצב Event Store לא מנסים להתחבר בכל סנכרון
             from database.postgres_connection import db
+            if not db.is_ready():
+                logger.warning("בסיס נתונים לא זמין - נתונים נשמרים בזיכרון בלבד")
+                return
             
             success_count = 0
             for car in cars:
@@ -118,6 +136,7 @@ class MultiAPICarService:
                     'transmission': car.transmission,
                     'daily_rate': car.daily_rate,
                     'location': car.location,
+                    'location_id': resolve_location(car.location),
                     'fuel_type': car.fuel_type,
                     'seats': car.seats,
                     'available': car.available,
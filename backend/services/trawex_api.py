@@ -8,6 +8,9 @@ from typing import Dict, List, Optional
 from datetime import datetime, date
 import os
 
+from core.metrics import record_error, timed
+from core.tracing import annotate
+
 class TrawexCarRentalAPI:
     """ממשק ל-Trawex Car Rental API"""
     
@@ -23,6 +26,7 @@ class TrawexCarRentalAPI:
             "Content-Type": "application/json"
         }
     
+    @timed("trawex")
     def search_cars(self, pickup_location: str, pickup_date: str, return_date: str, 
                    pickup_time: str = "10:00", return_time: str = "10:00") -> List[Dict]:
         """חיפוש רכבים זמינים"""
@@ -38,19 +42,26 @@ class TrawexCarRentalAPI:
                 "currency": "ILS"  # שקלים
             }
             
+            annotate(pickup_location=pickup_location, pickup_date=pickup_date, return_date=return_date)
             response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            annotate(http_status_code=response.status_code)
             
             if response.status_code == 200:
                 data = response.json()
-                return self.process_car_results(data)
+                cars = self.process_car_results(data)
+                annotate(cars=len(cars))
+                return cars
             else:
                 print(f"שגיאה בחיפוש רכבים: {response.status_code} - {response.text}")
+                record_error()
                 return []
                 
         except Exception as e:
             print(f"שגיאה בקריאה ל-Trawex API: {e}")
+            record_error(e)
             return []
     
+    @timed("trawex")
     def get_car_details(self, car_id: str) -> Optional[Dict]:
         """קבלת פרטי רכב ספציפי"""
         try:
@@ -62,12 +73,15 @@ class TrawexCarRentalAPI:
                 return response.json()
             else:
                 print(f"שגיאה בקבלת פרטי רכב: {response.status_code}")
+                record_error()
                 return None
                 
         except Exception as e:
             print(f"שגיאה בקבלת פרטי רכב: {e}")
+            record_error(e)
             return None
     
+    @timed("trawex")
     def get_locations(self, query: str = "") -> List[Dict]:
         """קבלת רשימת מיקומים זמינים"""
         try:
@@ -83,12 +97,15 @@ class TrawexCarRentalAPI:
                 return response.json().get("locations", [])
             else:
                 print(f"שגיאה בקבלת מיקומים: {response.status_code}")
+                record_error()
                 return []
                 
         except Exception as e:
             print(f"שגיאה בקבלת מיקומים: {e}")
+            record_error(e)
             return []
     
+    @timed("trawex")
     def create_booking(self, booking_data: Dict) -> Optional[Dict]:
         """יצירת הזמנה חדשה"""
         try:
@@ -100,10 +117,12 @@ class TrawexCarRentalAPI:
                 return response.json()
             else:
                 print(f"שגיאה ביצירת הזמנה: {response.status_code} - {response.text}")
+                record_error()
                 return None
                 
         except Exception as e:
             print(f"שגיאה ביצירת הזמנה: {e}")
+            record_error(e)
             return None
     
     def process_car_results(self, api_data: Dict) -> List[Dict]:
@@ -149,13 +168,15 @@ class TrawexCarRentalAPI:
         
         return category_mapping.get(api_category.upper(), "economy")
     
+    @timed("trawex")
     def test_connection(self) -> bool:
         """בדיקת חיבור ל-API"""
         try:
             url = f"{self.base_url}/locations"
             response = requests.get(url, headers=self.headers, timeout=10)
             return response.status_code == 200
-        except:
+        except Exception as e:
+            record_error(e)
             return False
 
 # יצירת instance גלובלי
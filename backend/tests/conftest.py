@@ -0,0 +1,24 @@
+"""
+הגדרות משותפות לבדיקות ה-backend
+הרצה מתיקיית backend:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def event_service(tmp_path, monkeypatch):
+    """EventSourcingService על Event Store חדש בתיקייה זמנית (עם נתוני הדוגמה)"""
+    monkeypatch.chdir(tmp_path)
+    from database.event_store import EventSourcingService
+    service = EventSourcingService()
+    yield service
+    service.search_log.close()
+    service.pricing.stop()
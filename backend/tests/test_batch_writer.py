@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from core.batch_writer import DROP_NEWEST, DROP_OLDEST, BatchWriter
+from database.event_store import Event, EventStore, EventType
+
+
+def _blocked_writer(drop_policy):
+    """כותב שנתקע על הקבוצה הראשונה עד release - כדי למלא את התור"""
+    release = threading.Event()
+    written = []
+
+    def write_batch(batch):
+        release.wait(5)
+        written.extend(batch)
+
+    writer = BatchWriter(write_batch, max_queue=2, batch_size=1, flush_interval_ms=10, drop_policy=drop_policy)
+    writer.submit(1)
+    deadline = time.monotonic() + 5
+    while writer.stats()["queued"] and time.monotonic() < deadline:
+        time.sleep(0.005)   # ה-thread לקח את 1 ונתקע בכתיבה
+    return writer, release, written
+
+
+@pytest.mark.parametrize("policy, accepted, expected", [
+    (DROP_NEWEST, [True, True, False], [1, 2, 3]),
+    (DROP_OLDEST, [True, True, True], [1, 3, 4]),
+])
+def test_full_queue_drop_policy(policy, accepted, expected):
+    writer, release, written = _blocked_writer(policy)
+    assert [writer.submit(item) for item in (2, 3, 4)] == accepted
+    release.set()
+    assert writer.flush()
+    writer.close()
+    assert written == expected
+    assert writer.stats()["dropped"] == 1 and writer.stats()["submitted"] == 4
+
+
+def test_failed_batches_are_counted():
+    def write_batch(batch):
+        raise RuntimeError("down")
+
+    writer = BatchWriter(write_batch, flush_interval_ms=10)
+    writer.submit("a")
+    assert writer.flush()
+    writer.close()
+    assert writer.failed == 1 and writer.written == 0
+
+
+def test_unknown_drop_policy():
+    with pytest.raises(ValueError):
+        BatchWriter(lambda batch: None, drop_policy="drop_random")
+
+
+def test_subscribers_never_run_concurrently(tmp_path):
+    # כתיבה בקבוצות מה-thread של ה-BatchWriter ובמקביל כתיבות מבקשות - המאזינים רצים אחד אחרי השני
+    store = EventStore(str(tmp_path / "events.db"))
+    active, overlaps, seen = [0], [], []
+
+    def subscriber(event):
+        active[0] += 1
+        if active[0] > 1:
+            overlaps.append(event.aggregate_id)
+        time.sleep(0.001)
+        seen.append(event.aggregate_id)
+        active[0] -= 1
+
+    store.subscribe(subscriber)
+    writer = BatchWriter(store.append_events, batch_size=5, flush_interval_ms=5)
+
+    def requests():
+        for i in range(20):
+            store.append_event(Event(EventType.CAR_UPDATED, f"car-{i}", {}))
+
+    thread = threading.Thread(target=requests)
+    thread.start()
+    for i in range(20):
+        writer.submit(Event(EventType.SEARCH_PERFORMED, f"search-{i}", {}))
+    thread.join()
+    assert writer.flush()
+    writer.close()
+    assert not overlaps and len(seen) == 40
@@ -0,0 +1,49 @@
+from core.bitmap_index import BitmapIndex, equality_filters, popcount
+
+
+def _car(car_type, transmission="automatic", location="tel-aviv", available=True, supplier=None):
+    return {"car_type": car_type, "transmission": transmission, "location_id": location,
+            "available": available, "supplier": supplier, "fuel_type": "בנזין"}
+
+
+def _index():
+    index = BitmapIndex()
+    index.upsert_car("a", _car("suv"))
+    index.upsert_car("b", _car("suv", transmission="manual", location="haifa"))
+    index.upsert_car("c", _car("compact", available=False))
+    index.upsert_car("d", _car("compact", supplier="Hertz"))
+    return index
+
+
+def test_match_and_count():
+    index = _index()
+    assert index.match_ids({"car_type": "suv"}) == {"a", "b"}
+    assert index.match_ids({"car_type": "suv", "transmission": "manual"}) == {"b"}
+    assert index.match_ids({"car_type": ["suv", "compact"], "location": "tel-aviv"}) == {"a", "c", "d"}
+    assert index.count(equality_filters({"car_type": "compact"})) == 1
+    assert index.match_ids({"car_type": "luxury"}) == set()
+    assert popcount(index.all_cars) == len(index) == 4
+
+
+def test_update_and_remove_reuse_ordinal():
+    index = _index()
+    index.update_car("a", {"location": "חיפה"})
+    assert index.match_ids({"location": "haifa"}) == {"a", "b"}
+    index.update_car("c", {"available": True})
+    assert index.match_ids(equality_filters({"car_type": "compact"})) == {"c", "d"}
+
+    index.remove_car("b")
+    assert index.match_ids({"car_type": "suv"}) == {"a"}
+    index.upsert_car("e", _car("suv"))
+    assert len(index) == 4 and index.match_ids({"car_type": "suv"}) == {"a", "e"}
+    assert index.bitmap("transmission", "manual") == 0
+
+
+def test_bits_and_ordered_filter():
+    index = _index()
+    bits = index.bits(["a", "d", "missing"])
+    assert set(index.ids(bits)) == {"a", "d"}
+    # המזהים מוחזרים לפי הסדר שניתן, רק אלה שב-bitmap
+    assert list(index.filter_ids(bits, ["d", "c", "b", "a"])) == ["d", "a"]
+    assert list(index.filter_ids(0, ["a", "b"])) == []
+    assert list(index.filter_ids(index.all_cars, ["x", "b"])) == ["b"]
@@ -0,0 +1,69 @@
+import threading
+from datetime import date
+
+import pytest
+
+from core.booking_calendar import BookingCalendar, BookingConflictError, InvalidDateRangeError, validate_range
+
+
+def test_half_open_intervals():
+    calendar = BookingCalendar()
+    calendar.add_booking("b1", "car-1", "2030-01-10", "2030-01-15")
+    assert not calendar.is_free("car-1", "2030-01-12", "2030-01-13")
+    assert not calendar.is_free("car-1", "2030-01-05", "2030-01-11")
+    # החזרה ביום 15 - פנוי לאיסוף באותו יום
+    assert calendar.is_free("car-1", "2030-01-15", "2030-01-20")
+    assert calendar.is_free("car-1", "2030-01-01", "2030-01-10")
+    assert calendar.is_free("car-2", "2030-01-12", "2030-01-13")
+
+
+def test_remove_booking_frees_range():
+    calendar = BookingCalendar()
+    calendar.add_booking("b1", "car-1", "2030-01-10", "2030-01-15")
+    calendar.remove_booking("b1")
+    assert calendar.is_free("car-1", "2030-01-10", "2030-01-15")
+    assert len(calendar) == 0
+
+
+def test_validate_range():
+    assert validate_range(None, None) is None
+    assert validate_range("2030-01-01", "2030-01-03") == (date(2030, 1, 1), date(2030, 1, 3))
+    with pytest.raises(InvalidDateRangeError):
+        validate_range("2030-01-01", None)
+    with pytest.raises(InvalidDateRangeError):
+        validate_range(None, "2030-01-03")
+    with pytest.raises(InvalidDateRangeError):
+        validate_range("2030-01-03", "2030-01-03")
+
+
+def _booking(car_id, start, end):
+    return {"car_id": car_id, "customer_name": "Dana Levi", "customer_email": "dana@example.com",
+            "start_date": start, "end_date": end, "pickup_location": "תל אביב", "total_price": 100.0, "days": 1}
+
+
+def test_overlapping_booking_conflicts(event_service):
+    car_id = event_service.get_all_cars()[0]["id"]
+    assert event_service.create_booking(_booking(car_id, "2030-02-01", "2030-02-05"))
+    with pytest.raises(BookingConflictError):
+        event_service.create_booking(_booking(car_id, "2030-02-04", "2030-02-06"))
+    assert event_service.create_booking(_booking(car_id, "2030-02-05", "2030-02-06"))
+
+
+def test_concurrent_bookings_only_one_wins(event_service):
+    car_id = event_service.get_all_cars()[0]["id"]
+    barrier = threading.Barrier(8)
+    results = []
+
+    def book():
+        barrier.wait()
+        try:
+            results.append(event_service.create_booking(_booking(car_id, "2030-03-01", "2030-03-05")))
+        except BookingConflictError:
+            results.append("conflict")
+
+    threads = [threading.Thread(target=book) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count("conflict") == 7
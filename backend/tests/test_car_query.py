@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+
+from core.car_query import CarQuery, CarQueryEngine
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_columns_include_sort_and_derived_fields():
+    assert CarQuery().columns() is None
+    assert CarQuery(fields=("make",), sort="rate").columns() == ("make", "daily_rate", "id")
+    assert CarQuery(fields=("effective_rate",)).columns() == ("id", "daily_rate")
+    assert CarQuery(fields=("make",), per_location=2).columns() == ("make", "id", "location_id")
+
+
+def test_lone_date_and_unknown_sort():
+    assert CarQuery(start_date=date(2030, 1, 1)).start_date is None
+    with pytest.raises(ValueError):
+        CarQuery(sort="make")
+
+
+def test_keyset_pages_by_rate(event_service):
+    engine = CarQueryEngine(event_service)
+    query = CarQuery(sort="rate", limit=3, transmission="automatic")
+    first, cursor = engine.page(query)
+    assert _ids(first) == ["car-1", "car-4", "car-3"]
+    assert cursor is None
+
+    query = CarQuery(sort="rate", limit=2)
+    first, cursor = engine.page(query)
+    second, last = engine.page(query, cursor)
+    assert _ids(first) == ["car-2", "car-1"] and _ids(second) == ["car-4", "car-3"] and last is None
+
+
+def test_sorted_candidates_follow_updates(event_service):
+    query = CarQuery(sort="rate", limit=None, car_type="compact")
+    assert _ids(event_service.query_cars(query)) == ["car-2", "car-1"]
+    event_service.update_car("car-2", {"daily_rate": 500.0})
+    assert _ids(event_service.query_cars(query)) == ["car-1", "car-2"]
+    event_service.update_car("car-1", {"car_type": "suv"})
+    assert _ids(event_service.query_cars(query)) == ["car-2"]
+
+
+def test_per_location_limit_and_counts(event_service):
+    query = CarQuery(location_ids=["tel-aviv", "haifa"], sort="rate", limit=None, per_location=1)
+    rows = event_service.query_cars(query)
+    assert [(row["id"], row["location_count"]) for row in rows] == [("car-2", 1), ("car-1", 2)]
+
+
+def test_effective_rate_falls_back_to_daily_rate(event_service):
+    engine = CarQueryEngine(event_service)
+    rows = engine.rows(CarQuery(car_ids=["car-3"], fields=("effective_rate",)))
+    assert len(rows) == 1 and rows[0]["effective_rate"] is not None
+
+
+def test_count_is_total_matches_not_page(event_service):
+    engine = CarQueryEngine(event_service)
+    # רק שוויון על bitmaps (ומחיר) - popcount
+    assert engine.count(CarQuery(car_type="compact", limit=1)) == 2
+    assert engine.count(CarQuery(max_price=200, limit=1)) == 2
+    # פילטר מחוץ ל-bitmaps - מספר המועמדים
+    assert engine.count(CarQuery(location="tel aviv", sort="rate", limit=1)) == 2
+
+    query = CarQuery(sort="rate", limit=3)
+    page, cursor = engine.page(query)
+    assert len(page) == 3 and engine.total(query, page, cursor) == 4
+    query = CarQuery(sort="rate", limit=10)
+    page, cursor = engine.page(query)
+    assert engine.total(query, page, cursor) == len(page) == 4
@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from core.dynamic_pricing import (
+    LAST_MINUTE_DAYS, MAX_MULTIPLIER, MIN_MULTIPLIER, DynamicPricingEngine, compute_rate_matrix
+)
+from core.http_cache import conditional_get
+from core.search_analytics import SearchAnalytics
+
+TODAY = date(2030, 1, 1)
+
+
+def _cars():
+    return [
+        {"id": "a", "daily_rate": 100.0, "location_id": "tel-aviv"},
+        {"id": "b", "daily_rate": 200.0, "location_id": "tel-aviv"},
+        {"id": "c", "daily_rate": 150.0, "location_id": "haifa"},
+    ]
+
+
+def test_rates_stay_within_bounds_and_default_outside_window():
+    matrix = compute_rate_matrix(_cars(), [], {}, TODAY, horizon=30)
+    assert matrix.rates.shape == (3, 30)
+    for row, car in enumerate(_cars()):
+        multipliers = matrix.rates[row] / 100 / car["daily_rate"]
+        assert multipliers.min() >= MIN_MULTIPLIER - 1e-6 and multipliers.max() <= MAX_MULTIPLIER + 1e-6
+    assert matrix.rate("a", TODAY + timedelta(days=30)) is None
+    assert matrix.rate("unknown", TODAY) is None
+    rates = matrix.daily_rates([{"id": "new", "daily_rate": 80.0}], TODAY, TODAY + timedelta(days=2))
+    assert rates.tolist() == [[80.0, 80.0]]
+
+
+def _fully_booked(*car_ids):
+    return [(car_id, TODAY, TODAY + timedelta(days=30)) for car_id in car_ids]
+
+
+def test_occupancy_and_last_minute_raise_the_price():
+    booked = _fully_booked("c") + [("a", TODAY + timedelta(days=20), TODAY + timedelta(days=25)),
+                                   ("b", TODAY + timedelta(days=20), TODAY + timedelta(days=25))]
+    matrix = compute_rate_matrix(_cars(), booked, {}, TODAY, horizon=30)
+    # הסניף מוזמן במלואו בימים 20-24 - יקר יותר מיום פנוי (שבו המחיר ברצפה)
+    assert matrix.rate("b", TODAY + timedelta(days=21)) > matrix.rate("b", TODAY + timedelta(days=15))
+    # רגע אחרון: היום יקר יותר מאחרי LAST_MINUTE_DAYS
+    assert matrix.rate("c", TODAY) > matrix.rate("c", TODAY + timedelta(days=LAST_MINUTE_DAYS))
+
+
+def test_demand_raises_busy_branch():
+    matrix = compute_rate_matrix(_cars(), _fully_booked("a", "b", "c"), {"tel-aviv": 30, "haifa": 10},
+                                 TODAY, horizon=30)
+    day = TODAY + timedelta(days=15)
+    assert matrix.rate("a", day) / 100.0 > matrix.rate("c", day) / 150.0
+
+
+def test_with_base_rate_patches_one_row_without_touching_the_original():
+    matrix = compute_rate_matrix(_cars(), [], {}, TODAY, horizon=10)
+    patched = matrix.with_base_rate("a", 200.0)
+    assert np.allclose(patched.rates[0], matrix.rates[0] * 2, atol=1)
+    assert (patched.rates[1:] == matrix.rates[1:]).all()
+    assert matrix.rate("a", TODAY) == matrix.rates[0, 0] / 100
+
+
+class _Backend:
+    def __init__(self):
+        self.cars = _cars()
+        self.search_analytics = SearchAnalytics()
+        self.on_query = None
+
+    def query_cars(self, query):
+        cars = [dict(car) for car in self.cars]
+        if self.on_query:
+            self.on_query()
+        return cars
+
+    def get_booked_intervals(self, start, end):
+        return []
+
+
+def test_update_during_recompute_is_not_lost():
+    backend = _Backend()
+    engine = DynamicPricingEngine(backend, horizon_days=10)
+    engine.recompute(TODAY)
+    old = engine.matrix.rate("a", TODAY)
+
+    # המחיר משתנה אחרי שהחישוב כבר קרא את הרכבים - המטריצה החדשה עדיין צריכה לכלול אותו
+    def change_rate():
+        backend.cars[0]["daily_rate"] = 300.0
+        engine.update_base_rate("a", 300.0)
+    backend.on_query = change_rate
+    engine.recompute(TODAY)
+    assert abs(engine.matrix.rate("a", TODAY) - old * 3) <= 0.02
+
+
+def test_etag_changes_when_rates_are_recomputed(event_service):
+    app = FastAPI()
+
+    @app.get("/cars")
+    def cars(request: Request, response: Response):
+        not_modified = conditional_get(request, response, event_service.get_data_version("cars"))
+        return not_modified or {"ok": True}
+
+    client = TestClient(app)
+    etag = client.get("/cars").headers["etag"]
+    assert client.get("/cars", headers={"If-None-Match": etag}).status_code == 304
+    # אותם אירועים, מטריצה חדשה - effective_rate עשוי להשתנות ולכן ה-ETag משתנה
+    event_service.pricing.recompute()
+    response = client.get("/cars", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    # יום המחיר הוא חלק מהגרסה (חצות מזיז את effective_rate)
+    assert event_service.pricing.version(TODAY) != event_service.pricing.version(TODAY + timedelta(days=1))
@@ -0,0 +1,142 @@
+import random
+from collections import Counter
+from dataclasses import replace
+from datetime import date
+from itertools import islice
+
+import pytest
+
+from core.car_query import CarQuery
+from core.facets import FacetIndex, facet_values, sort_facets
+from core.locations import resolve_location
+
+BOUNDS = (200, 300, 400)
+
+
+def _car(car_type, rate, transmission="automatic", location="tel-aviv", available=True):
+    return {"car_type": car_type, "daily_rate": rate, "transmission": transmission,
+            "location_id": location, "available": available}
+
+
+def _index():
+    index = FacetIndex(BOUNDS)
+    index.upsert_car("a", _car("suv", 450))
+    index.upsert_car("b", _car("suv", 250, transmission="manual", location="haifa"))
+    index.upsert_car("c", _car("compact", 150))
+    index.upsert_car("d", _car("compact", 180, available=False))
+    return index
+
+
+def test_facet_values_buckets():
+    assert facet_values(_car("suv", 200), BOUNDS)["price"] == 1
+    assert facet_values(_car("suv", 199.9), BOUNDS)["price"] == 0
+    assert facet_values(_car("suv", 999), BOUNDS)["price"] == 3
+
+
+def test_counts_are_disjunctive():
+    index = _index()
+    counts = index.counts()
+    assert counts["car_type"] == {"suv": 2, "compact": 1}  # d לא זמין
+    assert list(counts["price"].values()) == [1, 1, 0, 1]
+
+    counts = index.counts(filters={"car_type": index.bitmap("car_type", "suv")})
+    # הפאסט המסונן עצמו נספר בלי הסינון שלו
+    assert counts["car_type"] == {"suv": 2, "compact": 1}
+    assert counts["transmission"] == {"automatic": 1, "manual": 1}
+    assert counts["location"] == {"haifa": 1, "tel-aviv": 1}
+
+    counts = index.counts(base=index.bits(["a", "c"]))
+    assert counts["car_type"] == {"compact": 1, "suv": 1} and counts["transmission"] == {"automatic": 2}
+
+
+def test_updates_move_bitmaps_and_sort_orders():
+    index = _index()
+    index.update_car("a", {"daily_rate": 100})
+    index.update_car("d", {"available": True})
+    index.remove_car("b")
+    assert index.counts()["car_type"] == {"compact": 2, "suv": 1}
+    assert index.price("a") == 100 and len(index) == 3
+    everything = index.available_bits()
+    assert list(index.iter_sorted("rate", everything)) == ["a", "c", "d"]
+    assert list(index.iter_sorted("id", everything)) == ["a", "c", "d"]
+    # האורך הוא כל הרכבים באינדקס (אורך סדרי המיון), הזמינים נספרים בנפרד
+    index.update_car("c", {"available": False})
+    assert len(index) == 3 and index.available_count() == 2
+
+
+def test_price_buckets_rebucket():
+    index = _index()
+    index.set_price_buckets((300,))
+    assert list(index.counts()["price"].values()) == [2, 1]
+
+
+def test_iter_sorted_from_cursor_and_max_price():
+    index = _index()
+    bits = index.match({"available": True})
+    assert list(index.iter_sorted("rate", bits, after=(150.0, "c"))) == ["b", "a"]
+    assert list(index.iter_sorted("rate", bits, max_price=300)) == ["c", "b"]
+    assert list(index.iter_sorted("id", bits, after=("a",), max_price=300)) == ["b", "c"]
+    assert index.ids(index.price_bits(180)) and set(index.ids(index.price_bits(180))) == {"c", "d"}
+
+
+def test_iter_sorted_matches_full_sort():
+    rng = random.Random(7)
+    index = FacetIndex(BOUNDS)
+    cars = {}
+    for i in range(300):
+        car_id = f"car-{rng.randrange(10 ** 6):06d}"
+        cars[car_id] = _car(rng.choice(["suv", "compact", "luxury"]), round(rng.uniform(100, 500)),
+                            available=rng.random() < 0.8)
+        index.upsert_car(car_id, cars[car_id])
+    for car_id in rng.sample(sorted(cars), 40):
+        index.remove_car(car_id)
+        del cars[car_id]
+
+    bits = index.match({"available": True, "car_type": "suv"})
+    expected = sorted((car["daily_rate"], car_id) for car_id, car in cars.items()
+                      if car["available"] and car["car_type"] == "suv")
+    assert list(index.iter_sorted("rate", bits)) == [car_id for _, car_id in expected]
+    after = expected[len(expected) // 2]
+    page = list(islice(index.iter_sorted("rate", bits, after=after), 5))
+    assert page == [car_id for _, car_id in expected[len(expected) // 2 + 1:][:5]]
+
+
+def _reference_counts(service, query):
+    """ספירות מהחיפוש עצמו: לכל פאסט - תוצאות השאילתה בלי הסינון של הפאסט (כך נבנית גם השאילתה
+    ב-PostgreSQL), כדי שפאסטים וחיפוש יסכימו בכל backend"""
+    index = service.facet_index
+    own_filter = {"car_type": {"car_type": None}, "transmission": {"transmission": None},
+                  "price": {"max_price": None}, "supplier": {}, "location": {}}
+    if resolve_location(query.location):
+        own_filter["location"] = {"location": None}
+    counts = {}
+    for facet, cleared in own_filter.items():
+        rows = service.query_cars(replace(query, limit=None, **cleared))
+        values = Counter(facet_values(row, index.price_bounds)[facet] for row in rows)
+        values.pop(None, None)
+        counts[facet] = dict(values)
+    return sort_facets(counts, index.price_labels)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"car_type": "compact", "max_price": 300},
+    {"transmission": "automatic", "location": "tel aviv"},
+    {"location": "ירוש"},                            # מיקום שלא במילון - סינון בסיס, לא פאסט
+    {"q": "טויוטה"},
+    {"location_ids": ["tel-aviv", "haifa"], "car_type": "compact"},
+    {"car_ids": ["car-1", "car-3", "nope"]},
+    {"start_date": date(2030, 1, 1), "end_date": date(2030, 1, 5), "car_type": "suv"},
+    {"available_only": False, "transmission": "manual"},
+])
+def test_facets_match_search_results(event_service, filters):
+    event_service.update_car("car-4", {"available": False})
+    event_service.create_booking({"car_id": "car-1", "start_date": "2030-01-02", "end_date": "2030-01-04",
+                                  "customer_name": "a", "total_price": 1})
+    query = CarQuery(**filters)
+    assert event_service.get_facet_counts(query.filters()) == _reference_counts(event_service, query)
+
+
+def test_facets_omit_what_a_backend_cannot_count():
+    assert list(sort_facets({"car_type": {"suv": 1}}, ("עד 100", "100+"), facets=("car_type", "price"))) == \
+        ["car_type", "price"]
@@ -0,0 +1,42 @@
+import pytest
+
+from core import geo
+from core.car_query import CarQuery
+from core.geo import BranchIndex, InvalidCoordinatesError, haversine_km, validate_point
+
+TEL_AVIV = (32.0853, 34.7818)
+
+
+def test_haversine_and_validation():
+    assert haversine_km(*TEL_AVIV, 31.7683, 35.2137) == pytest.approx(53.9, abs=0.1)
+    assert haversine_km(*TEL_AVIV, *TEL_AVIV) == 0
+    assert validate_point(*TEL_AVIV) == TEL_AVIV
+    with pytest.raises(InvalidCoordinatesError):
+        validate_point(91, 34)
+
+
+@pytest.mark.parametrize("use_tree", [True, False])
+def test_nearest_is_ordered_by_distance(monkeypatch, use_tree):
+    if not use_tree:
+        monkeypatch.setattr(geo, "cKDTree", None)   # בלי scipy - סריקה לינארית, אותן תוצאות
+    index = BranchIndex()
+    branches = index.nearest(*TEL_AVIV)
+    distances = [distance for _, distance in branches]
+    assert len(branches) == len(index) and distances == sorted(distances)
+    assert [location_id for location_id, _ in branches[:3]] == ["tel-aviv", "herzliya", "ben-gurion-airport"]
+    assert index.nearest(*TEL_AVIV, k=1) == [("tel-aviv", 0.0)]
+    # רדיוס 30 ק"מ: עד נתניה, בלי אשדוד (34 ק"מ)
+    assert [location_id for location_id, _ in index.within(*TEL_AVIV, 30)] == \
+        ["tel-aviv", "herzliya", "ben-gurion-airport", "netanya"]
+    assert index.nearest(29.0, 34.0, k=2, max_km=10) == []
+
+
+def test_empty_index():
+    assert BranchIndex({}).nearest(*TEL_AVIV) == [] and BranchIndex({"x": {"name": "x"}}).within(0, 0, 10) == []
+
+
+def test_cheapest_cars_per_branch(event_service):
+    # השאילתה שמאחורי חיפוש הסניפים הקרובים: מהזול ליקר, per_location רכבים לכל סניף
+    rows = event_service.query_cars(CarQuery(location_ids=["tel-aviv", "haifa"], sort="rate", per_location=1))
+    assert {(row["location_id"], row["id"], row["location_count"]) for row in rows} == \
+        {("tel-aviv", "car-1", 2), ("haifa", "car-2", 1)}
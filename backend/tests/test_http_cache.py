@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from core.http_cache import conditional_get
+
+
+def _client(versions):
+    """endpoint שהגרסה שלו נקראת מהרשימה (None = בלי ETag)"""
+    app = FastAPI(version="1.0")
+
+    @app.get("/cars")
+    def cars(request: Request, response: Response, q: str = ""):
+        not_modified = conditional_get(request, response, versions[0])
+        return not_modified or {"q": q}
+
+    return TestClient(app)
+
+
+def test_etag_is_strong_and_depends_on_version_and_query():
+    versions = ["v1"]
+    client = _client(versions)
+    response = client.get("/cars")
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and response.headers["cache-control"] == "no-cache"
+    assert client.get("/cars").headers["etag"] == etag
+    assert client.get("/cars?q=suv").headers["etag"] != etag
+    versions[0] = "v2"
+    assert client.get("/cars").headers["etag"] != etag
+
+
+@pytest.mark.parametrize("header, status", [
+    ("{etag}", 304),
+    ("W/{etag}", 304),                       # השוואה חלשה
+    ('"other", {etag}', 304),                # רשימת ETags
+    ("*", 304),
+    ('"other"', 200),
+    ('W/"other"', 200),
+])
+def test_if_none_match(header, status):
+    client = _client(["v1"])
+    etag = client.get("/cars").headers["etag"]
+    response = client.get("/cars", headers={"If-None-Match": header.format(etag=etag)})
+    assert response.status_code == status
+    # גם תשובת 304 נושאת את ה-ETag
+    assert response.headers["etag"] == etag
+    if status == 304:
+        assert response.content == b""
+
+
+def test_stale_etag_gets_full_response():
+    versions = ["v1"]
+    client = _client(versions)
+    etag = client.get("/cars").headers["etag"]
+    versions[0] = "v2"
+    response = client.get("/cars", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json() == {"q": ""}
+
+
+def test_no_version_means_no_etag():
+    client = _client([None])
+    response = client.get("/cars", headers={"If-None-Match": "*"})
+    assert response.status_code == 200 and "etag" not in response.headers
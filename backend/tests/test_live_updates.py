@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+from core.live_updates import CAR, RESYNC, STATS, ChangeFeed, LiveUpdates, format_event
+
+
+def _parse(message: bytes):
+    """הודעת SSE -> (id, event, data)"""
+    fields = {}
+    for line in message.decode("utf-8").strip().split("\n"):
+        key, _, value = line.partition(": ")
+        fields[key] = value
+    event_id = fields.get("id")
+    return (int(event_id) if event_id else None), fields.get("event"), json.loads(fields.get("data", "null"))
+
+
+def _live(**kwargs):
+    return LiveUpdates(stats_provider=lambda: {"total_cars": 0}, stats_delay=60, **kwargs)
+
+
+def _car(car_id):
+    return {"type": CAR, "op": "updated", "id": car_id, "data": {"daily_rate": 100}}
+
+
+def test_format_event():
+    event_id, event_type, data = _parse(format_event(CAR, {"id": "car-1", "name": "רכב"}, 7))
+    assert (event_id, event_type, data) == (7, CAR, {"id": "car-1", "name": "רכב"})
+
+
+def test_replay_returns_missed_messages():
+    live = _live(buffer_size=10)
+    for i in range(5):
+        live._broadcast(CAR, _car(f"car-{i}"))
+    replayed = [_parse(message) for message in live._replay("2")]
+    assert [event_id for event_id, _, _ in replayed] == [3, 4, 5]
+    assert live._replay("5") == []
+    assert live._replay(None) == []
+
+
+def test_replay_resyncs_when_buffer_wrapped():
+    live = _live(buffer_size=3)
+    for i in range(6):
+        live._broadcast(CAR, _car(f"car-{i}"))
+    # הודעות 2-3 כבר נזרקו מהחוצץ (נשארו 4-6)
+    [(event_id, event_type, data)] = [_parse(message) for message in live._replay("1")]
+    assert event_type == RESYNC and data["reason"] == "expired" and event_id == 6
+    # מי שראה את 3 עדיין יכול להשלים מהחוצץ
+    assert [_parse(message)[0] for message in live._replay("3")] == [4, 5, 6]
+    [(_, event_type, data)] = [_parse(message) for message in live._replay("abc")]
+    assert event_type == RESYNC and data["reason"] == "invalid_id"
+
+
+def test_slow_subscriber_gets_resync_after_overflow():
+    async def scenario():
+        live = _live(queue_size=2)
+        stream = live.stream()
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+        assert _parse(await stream.__anext__())[1] == STATS
+        # הלקוח לא קורא - התור מתמלא
+        for i in range(5):
+            live._broadcast(CAR, _car(f"car-{i}"))
+        message = _parse(await stream.__anext__())
+        await stream.aclose()
+        return live, message
+
+    live, (event_id, event_type, data) = asyncio.run(scenario())
+    assert event_type == RESYNC and data["reason"] == "overflow" and event_id == 5
+    assert live.overflows == 1
+    assert live.stats()["subscribers"] == 0
+
+
+def test_change_feed_isolates_failing_subscriber():
+    feed = ChangeFeed()
+    received = []
+
+    def failing(change):
+        raise RuntimeError("boom")
+
+    feed.subscribe(failing)
+    feed.subscribe(received.append)
+    feed.publish(_car("car-1"))
+    feed.unsubscribe(received.append)
+    feed.publish(_car("car-2"))
+    assert [change["id"] for change in received] == ["car-1"]
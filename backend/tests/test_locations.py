@@ -0,0 +1,28 @@
+import pytest
+
+from core.locations import find_location, resolve_location
+
+
+@pytest.mark.parametrize("text, location_id", [
+    ("Tel Aviv-Yafo", "tel-aviv"),
+    ("ת\"א", "tel-aviv"),
+    ("  ירושלים ", "jerusalem"),
+    ("מודיעין", None),
+])
+def test_resolve_location(text, location_id):
+    assert resolve_location(text) == location_id
+
+
+@pytest.mark.parametrize("text, location_id", [
+    ("רכב משפחתי בתל אביב", "tel-aviv"),
+    ("איסוף מחיפה", "haifa"),
+    ("ומירושלים לאילת", "jerusalem"),
+    ("שבנתניה", "netanya"),
+    ("איסוף לבן גוריון", "ben-gurion-airport"),
+    # אותיות שימוש מוסרות רק כשהשארית היא כינוי מוכר
+    ("לבש בגדים ויצא בשבת", None),
+    ("מהמודיעין", None),
+    ("בת א", None),
+])
+def test_find_location_strips_prefix_only_for_known_places(text, location_id):
+    assert find_location(text) == location_id
@@ -0,0 +1,120 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from core import tracing
+from core.metrics import (BACKEND_ERRORS, BACKEND_LATENCY, HTTP_REQUESTS, Counter, Histogram, MetricsMiddleware,
+                          record_error, timed, track)
+from core.tracing import TracingMiddleware
+
+
+def _errors(backend, operation):
+    return BACKEND_ERRORS.labels(backend, operation).value
+
+
+def _requests(method, route, status):
+    return HTTP_REQUESTS.labels(method, route, status).value
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """tracing פעיל עם exporter בזיכרון (בלי לשנות את ה-provider הגלובלי)"""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("tests"))
+    return exporter
+
+
+def test_render_counter_and_histogram():
+    counter = Counter("jobs_total", "Jobs", ("kind",))
+    counter.labels("a").inc(2)
+    assert counter.render()[-1] == 'jobs_total{kind="a"} 2'
+    histogram = Histogram("wait_seconds", "Wait", buckets=(0.1, 1.0))
+    histogram.labels().observe(0.5)
+    assert histogram.render()[2:] == ['wait_seconds_bucket{le="0.1"} 0', 'wait_seconds_bucket{le="1"} 1',
+                                      'wait_seconds_bucket{le="+Inf"} 1', "wait_seconds_sum 0.5",
+                                      "wait_seconds_count 1"]
+
+
+def test_timed_counts_raised_and_swallowed_errors():
+    @timed("tests", "raises")
+    def raises():
+        raise RuntimeError("down")
+
+    @timed("tests", "swallows")
+    def swallows():
+        try:
+            raise RuntimeError("down")
+        except Exception as e:
+            record_error(e)
+            return []
+
+    before = _errors("tests", "raises"), _errors("tests", "swallows")
+    calls = BACKEND_LATENCY.labels("tests", "swallows").snapshot()[0]
+    with pytest.raises(RuntimeError):
+        raises()
+    assert swallows() == []
+    assert (_errors("tests", "raises"), _errors("tests", "swallows")) == (before[0] + 1, before[1] + 1)
+    assert sum(BACKEND_LATENCY.labels("tests", "swallows").snapshot()[0]) == sum(calls) + 1
+
+
+def test_record_error_outside_or_with_explicit_labels():
+    before = _errors("tests", "sync")
+    record_error(RuntimeError("no call"))   # לא בתוך קריאה מדודה - לא נספר
+    record_error(None, "tests", "sync")
+    with track("tests", "block"):
+        record_error()
+    assert _errors("tests", "sync") == before + 1
+    assert _errors("tests", "block") >= 1
+
+
+def test_swallowed_error_marks_span(spans):
+    @timed("tests", "traced")
+    def swallows():
+        record_error(RuntimeError("down"))
+
+    swallows()
+    span, = spans.get_finished_spans()
+    assert span.name == "tests.traced" and span.status.status_code == StatusCode.ERROR
+    assert span.events[0].name == "exception"
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(TracingMiddleware)
+    return TestClient(app)
+
+
+def test_metrics_middleware_labels_by_route_template():
+    client = _app()
+    before = (_requests("GET", "/items/{item_id}", 200), _requests("GET", "/items/{item_id}", 404),
+              _requests("GET", "unmatched", 404))
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/0")
+    client.get("/nowhere")
+    assert (_requests("GET", "/items/{item_id}", 200), _requests("GET", "/items/{item_id}", 404),
+            _requests("GET", "unmatched", 404)) == (before[0] + 2, before[1] + 1, before[2] + 1)
+
+
+def test_tracing_middleware_continues_trace(spans):
+    client = _app()
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    client.get("/items/7", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+    span, = spans.get_finished_spans()
+    assert span.name == "GET /items/{item_id}"
+    assert format(span.context.trace_id, "032x") == trace_id
+    assert span.attributes["http.response.status_code"] == 200
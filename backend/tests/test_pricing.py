@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from core.pricing import InvalidQuoteError, booking_price, quote_car, quote_totals, rental_summary, sorted_quotes
+
+THURSDAY = date(2030, 1, 3)
+
+
+def _days(n):
+    return THURSDAY + timedelta(days=n)
+
+
+def test_weekend_surcharge_on_friday_and_saturday():
+    assert quote_car(100, THURSDAY, _days(1))["total"] == 100.0
+    # חמישי, שישי, שבת
+    assert quote_car(100, THURSDAY, _days(3))["total"] == 330.0
+    # ראשון עד חמישי - בלי סוף שבוע
+    assert quote_car(100, _days(3), _days(8))["total"] == 500.0
+    assert rental_summary(THURSDAY, _days(3)) == {"days": 3, "weekend_days": 2, "discount_rate": 0.0}
+
+
+@pytest.mark.parametrize("days, subtotal, discount, total", [
+    (6, 630.0, 0.0, 630.0),
+    (7, 730.0, 73.0, 657.0),       # מהיום השביעי - 10%
+    (29, 3020.0, 302.0, 2718.0),
+    (30, 3135.0, 627.0, 2508.0),   # מהיום השלושים - 20% (והיום הנוסף הוא שישי)
+])
+def test_long_rental_thresholds(days, subtotal, discount, total):
+    assert quote_car(100, THURSDAY, _days(days)) == {"subtotal": subtotal, "discount": discount, "total": total}
+
+
+def test_daily_matrix_matches_vector():
+    vector = quote_totals([100, 250], THURSDAY, _days(7))
+    matrix = quote_totals(np.array([[100] * 7, [250] * 7]), THURSDAY, _days(7))
+    assert vector["total"].tolist() == matrix["total"].tolist() == [657.0, 1642.5]
+    with pytest.raises(InvalidQuoteError):
+        quote_totals(np.array([[100] * 6]), THURSDAY, _days(7))
+
+
+def test_empty_or_reversed_range():
+    with pytest.raises(InvalidQuoteError):
+        quote_car(100, THURSDAY, THURSDAY)
+    with pytest.raises(InvalidQuoteError):
+        rental_summary(_days(2), THURSDAY)
+
+
+def test_sorted_quotes_cheapest_first_and_stable():
+    cars = [{"id": "a", "daily_rate": 200}, {"id": "b", "daily_rate": 100}, {"id": "c", "daily_rate": 200}]
+    quotes = sorted_quotes(cars, THURSDAY, _days(3))
+    assert [quote["id"] for quote in quotes] == ["b", "a", "c"]
+    assert quotes[0]["total"] == 330.0
+    # מחירים דינמיים במקום daily_rate - בלי daily_rate ברכבים
+    quotes = sorted_quotes([{"id": "a"}, {"id": "b"}], THURSDAY, _days(1), daily_rates=[50, 40])
+    assert [(quote["id"], quote["total"]) for quote in quotes] == [("b", 40.0), ("a", 50.0)]
+
+
+def test_booking_price_reports_the_rates_charged():
+    # מחיר דינמי לכל יום: הממוצע שחויב, ולא daily_rate הקבוע, מתאים ל-subtotal
+    breakdown = booking_price(100, THURSDAY, _days(3), daily_rates=[120, 90, 90])
+    assert breakdown["daily_rates"] == [120.0, 90.0, 90.0] and breakdown["daily_rate"] == 100.0
+    assert breakdown["subtotal"] == 120 + 90 * 1.15 * 2 and breakdown["weekend_days"] == 2
+    assert booking_price(100, THURSDAY, _days(3)) == {
+        "days": 3, "weekend_days": 2, "discount_rate": 0.0, "daily_rates": [100.0] * 3,
+        "daily_rate": 100.0, "subtotal": 330.0, "discount": 0.0, "total": 330.0,
+    }
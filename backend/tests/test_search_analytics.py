@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from core.search_analytics import CountMinSketch, HeavyHitters, HyperLogLog, SearchAnalytics, TimeRollup
+
+NOW = datetime(2030, 6, 15, 12, 30)
+
+
+def test_count_min_never_underestimates():
+    sketch = CountMinSketch(width=64, depth=4)
+    truth = {}
+    for i in range(2000):
+        key = f"k{i % 300}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in truth.items())
+    assert sketch.estimate("k0") <= truth["k0"] + 2000 // 64 * 4
+
+
+def test_heavy_hitters_keep_frequent_keys():
+    hitters = HeavyHitters(k=3)
+    for i in range(1000):
+        hitters.add(f"rare-{i}")
+        if i % 2:
+            hitters.add("tel-aviv")
+        if i % 3 == 0:
+            hitters.add("haifa")
+        if i % 5 == 0:
+            hitters.add("eilat")
+    assert list(hitters.top()) == ["tel-aviv", "haifa", "eilat"]
+    assert hitters.top(1)["tel-aviv"] >= 500
+
+
+def test_hyperloglog_estimate():
+    hll = HyperLogLog()
+    for i in range(20000):
+        hll.add(f"query-{i % 5000}")
+    assert abs(hll.count() - 5000) < 5000 * 0.05
+    assert HyperLogLog().count() == 0
+
+
+def test_rollup_evicts_by_time_not_by_count():
+    rollup = TimeRollup(60, retention=60)  # שעה אחרונה
+    rollup.add(NOW - timedelta(minutes=90), now=NOW)   # מחוץ לחלון - לא נשמר
+    rollup.add(NOW - timedelta(minutes=50), now=NOW)
+    rollup.add(NOW - timedelta(minutes=50), now=NOW)
+    rollup.add(NOW, now=NOW)
+    assert len(rollup) == 2
+    assert rollup.total_since(NOW - timedelta(hours=3), now=NOW) == 3
+
+    # אחרי 20 דקות בלי חיפושים, החלון של לפני 50 דקות כבר ישן מדי - גם בלי שנוסף חלון
+    later = NOW + timedelta(minutes=20)
+    assert rollup.total_since(NOW - timedelta(hours=3), now=later) == 1
+    assert [entry["count"] for entry in rollup.series(now=later)] == [1]
+    # חלון חדש מפנה את החלונות שפגו
+    rollup.add(later, now=later)
+    assert len(rollup) == 2
+
+
+def test_rollup_keeps_burst_within_retention():
+    # הרבה חלונות קצרים בתוך חלון השמירה לא דוחקים חלונות שעוד בתוקף
+    rollup = TimeRollup(1, retention=3600)
+    for second in range(3000):
+        rollup.add(NOW - timedelta(seconds=second), now=NOW)
+    assert rollup.total_since(NOW - timedelta(hours=1), now=NOW) == 3000
+
+
+def test_snapshot_and_demand():
+    analytics = SearchAnalytics(top_k=2, recent=2)
+    analytics.record({"location": "Tel Aviv", "car_type": "suv"}, 3, NOW - timedelta(days=1))
+    analytics.record({"location": "תל אביב"}, 0, NOW)
+    analytics.record({"location": "חיפה"}, 5, NOW)
+    snapshot = analytics.snapshot()
+    assert snapshot["total_searches"] == 3 and snapshot["empty_searches"] == 1
+    assert list(snapshot["popular_locations"].items())[0] == ("תל אביב", 2)
+    assert len(snapshot["recent_searches"]) == 2
+    assert analytics.snapshot() is snapshot
+    assert analytics.location_demand(7, now=NOW) == {"tel-aviv": 2, "haifa": 1}
+    assert analytics.location_demand(1, now=NOW) == {"tel-aviv": 1, "haifa": 1}
+
+
+def test_daily_summary():
+    analytics = SearchAnalytics()
+    today = datetime.now()
+    analytics.record({}, 4, today - timedelta(days=1))
+    analytics.record({}, 0, today)
+    analytics.record({}, 2, today)
+    summary = analytics.daily_summary()
+    assert [day["daily_searches"] for day in summary] == [2, 1]
+    assert [day["avg_results"] for day in summary] == [1.0, 4.0]
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from api.queries import car_queries
+from core.serialization import InvalidFieldsError, dumps, parse_features
+from core.startup import LazyService
+
+ROW = {"id": 1, "make": "Toyota", "model": "Corolla", "year": "2023", "car_type": "compact",
+       "transmission": "automatic", "daily_rate": Decimal("180.50"), "available": True,
+       "location": "תל אביב", "fuel_type": "gasoline", "seats": "5", "internal": "x"}
+
+serializer = car_queries.car_serializer
+
+
+def test_parse_fields_keeps_model_order_and_id():
+    assert serializer.parse_fields(None) is None and serializer.parse_fields("") is None
+    assert serializer.parse_fields(" daily_rate , make") == ("id", "make", "daily_rate")
+    with pytest.raises(InvalidFieldsError):
+        serializer.parse_fields("make,internal")
+
+
+def test_trusted_rows_are_only_sliced():
+    car, = serializer.to_payload([ROW], trusted=True, fields=("id", "year", "daily_rate"))
+    # בלי ולידציה: הערכים עוברים כמו שהם
+    assert car == {"id": 1, "year": "2023", "daily_rate": Decimal("180.50")}
+
+
+def test_untrusted_rows_are_validated_once():
+    car, = serializer.to_payload([dict(ROW)])
+    assert car["year"] == 2023 and car["seats"] == 5 and car["daily_rate"] == 180.5
+    assert "internal" not in car and car["image_url"] is None
+    assert serializer.to_payload([dict(ROW)], fields=("id", "seats")) == [{"id": 1, "seats": 5}]
+    with pytest.raises(ValidationError):
+        serializer.to_payload([{"id": 2, "make": "Mazda"}])
+
+
+def test_dumps_and_features():
+    assert orjson.loads(dumps({"rate": Decimal("99.90"), 1: "a"})) == {"rate": 99.9, "1": "a"}
+    assert parse_features({"features": '["GPS"]'})["features"] == ["GPS"]
+    assert parse_features({"features": "not json"})["features"] == []
+
+
+@pytest.fixture
+def client(event_service, monkeypatch):
+    monkeypatch.setattr(car_queries, "event_service", LazyService("event_store", lambda: event_service))
+    app = FastAPI()
+    app.include_router(car_queries.router)
+    return TestClient(app)
+
+
+def test_fields_projection_and_invalid_fields(client):
+    response = client.get("/api/queries/cars", params={"fields": "make,daily_rate"})
+    assert response.status_code == 200
+    assert {tuple(car) for car in response.json()["cars"]} == {("id", "make", "daily_rate")}
+    response = client.get("/api/queries/cars", params={"fields": "make,secret"})
+    assert response.status_code == 400 and "secret" in response.json()["detail"]
+    response = client.post("/api/queries/cars/batch", params={"fields": "nope"}, json={"ids": ["car-1"]})
+    assert response.status_code == 400 and "nope" in response.json()["detail"]
@@ -0,0 +1,51 @@
+import pytest
+
+from core.slow_query_log import SlowQueryLog, fingerprint, normalize
+
+
+def test_normalize_replaces_values():
+    assert normalize("SELECT *  FROM cars\n WHERE id = 12 AND make = 'O''Brien'") == \
+        "SELECT * FROM cars WHERE id = ? AND make = ?"
+    assert normalize("SELECT * FROM cars WHERE id IN (%(id_1)s, %(id_2)s, %(id_3)s)") == \
+        "SELECT * FROM cars WHERE id IN (...)"
+
+
+def test_fingerprint_ignores_values_and_whitespace():
+    assert fingerprint("SELECT * FROM cars WHERE id = 1") == fingerprint("SELECT *\nFROM cars WHERE id = 2")
+    assert fingerprint("SELECT * FROM cars WHERE id IN (1, 2)") == fingerprint("SELECT * FROM cars WHERE id IN (3, 4, 5)")
+    assert fingerprint("SELECT * FROM cars") != fingerprint("SELECT * FROM bookings")
+
+
+def test_stats_per_fingerprint():
+    log = SlowQueryLog(threshold_ms=100)
+    log.record("SELECT * FROM cars WHERE id = 1", {}, 10, rows=1)
+    log.record("SELECT * FROM cars WHERE id = 2", {}, 30, rows=1)
+    log.record("SELECT * FROM bookings", {}, 5, rows=7)
+    report = log.report(sort="calls")
+    assert report["fingerprints"] == 2
+    top = report["queries"][0]
+    assert top["calls"] == 2 and top["total_ms"] == 40 and top["max_ms"] == 30 and top["mean_ms"] == 20
+    assert top["slow_calls"] == 0 and report["recent_slow"] == []
+    with pytest.raises(ValueError):
+        log.report(sort="bogus")
+
+
+def test_slow_sample_redacts_parameter_values():
+    log = SlowQueryLog(threshold_ms=100)
+    log.record("SELECT * FROM users WHERE email = %(email)s AND password_hash = 'secret'",
+               {"email": "dana@example.com", "limit": 5, "since": None}, 250)
+    [sample] = log.report()["recent_slow"]
+    assert sample["parameters"] == {"email": "str", "limit": "int", "since": "NULL"}
+    assert "dana@example.com" not in repr(sample) and "secret" not in repr(sample)
+    assert sample["statement"] == "SELECT * FROM users WHERE email = ? AND password_hash = ?"
+    assert log.report()["queries"][0]["slow_calls"] == 1
+
+    log.record("INSERT INTO cars (make) VALUES (%s)", [("Toyota",), ("Mazda",)], 300, executemany=True)
+    assert log.report()["recent_slow"][0]["parameters"] == [["str"], ["str"]]
+
+
+def test_reset():
+    log = SlowQueryLog(threshold_ms=0)
+    log.record("SELECT 1", {}, 1)
+    log.reset()
+    assert log.report()["fingerprints"] == 0 and log.report()["recent_slow"] == []
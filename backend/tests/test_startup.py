@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from core.startup import IMPORT, INIT, LazyService, StartupProfile
+
+
+def test_lazy_service_builds_once_on_first_use():
+    built = []
+
+    class Service:
+        def __init__(self):
+            built.append(threading.current_thread().name)
+            time.sleep(0.01)
+            self.value = 42
+
+    service = LazyService("service", Service)
+    assert not service.is_ready() and built == [] and "not loaded" in repr(service)
+    threads = [threading.Thread(target=lambda: service.value) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and service.is_ready()
+    service.value = 7   # כתיבה עוברת לשירות עצמו
+    assert service.get_instance().value == 7
+
+
+def test_failed_build_is_remembered_then_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("down")
+        return "ready"
+
+    service = LazyService("flaky", factory, retry_after_s=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            service.get_instance()
+    assert len(attempts) == 1   # הניסיון השני מחזיר את השגיאה השמורה בלי לבנות שוב
+    time.sleep(0.06)
+    assert service.get_instance() == "ready" and len(attempts) == 2
+
+
+def test_profile_report_totals_and_errors():
+    profile = StartupProfile()
+    with profile.phase("core.metrics", IMPORT):
+        pass
+    with pytest.raises(RuntimeError):
+        with profile.phase("postgres", INIT):
+            raise RuntimeError("no driver")
+    profile.mark_ready()
+    report = profile.report()
+    assert [entry["component"] for entry in report["components"]] == ["core.metrics", "postgres"]
+    assert report["components"][1]["error"] == "RuntimeError: no driver"
+    assert set(report["totals_ms"]) == {IMPORT, INIT} and report["ready_ms"] is not None
+    assert "postgres" in profile.format() and "❌" in profile.format()
@@ -0,0 +1,54 @@
+from core.text_index import MAX_PREFIX_LENGTH, CarTextIndex, normalize_text, to_tsquery, tokenize
+
+
+def _index():
+    index = CarTextIndex()
+    index.index_car("a", {"make": "טויוטה", "model": "קורולה", "location": "תל אביב", "features": ["מזגן"]})
+    index.index_car("b", {"make": "Toyota", "model": "RAV4", "location": "חיפה", "supplier": "Hertz"})
+    index.index_car("c", {"make": "מאזדה", "model": "CX-5", "location": "ירושלים", "features": ["גג נפתח"]})
+    return index
+
+
+def test_normalize_final_letters_niqqud_and_case():
+    # אותיות סופיות, ניקוד וגרשיים מנורמלים - אותה מילה בכל כתיב
+    assert normalize_text("יְרוּשָׁלַיִם") == normalize_text("ירושלים") == "ירושלימ"
+    assert tokenize("צה״ל, Tel-Aviv") == ["צהל", "tel", "aviv"]
+    assert tokenize("ÉILAT") == ["eilat"]
+    assert tokenize(None) == []
+
+
+def test_token_and_prefix_match_across_final_letters():
+    index = _index()
+    # "ירושלים" עם ם סופית מול prefix "ירושל" / "ירושלימ"
+    assert index.search("ירושלים") == {"c"}
+    assert index.search("ירושל") == {"c"}
+    assert index.search("יְרוּשָׁלַיִם") == {"c"}
+    # prefix שנכתב עם נ רגילה (כמו באמצע הקלדה) מוצא את "מזגן" עם ן סופית
+    assert index.search("מזג") == index.search("מזגנ") == index.search("מזגן") == {"a"}
+    assert index.search("toy") == {"b"} and index.search("TOYOTA rav") == {"b"}
+    assert index.search("טויוטה חיפה") == set()
+
+
+def test_location_only_search_and_updates():
+    index = _index()
+    # "חיפה" נמצא רק בשדה המיקום; Hertz לא נמצא בחיפוש מיקום
+    assert index.search(location="חיפ") == {"b"}
+    assert index.search(location="hertz") == set()
+    index.update_car("b", {"location": "אילת"})
+    assert index.search(location="חיפה") == set() and index.search(location="אילת") == {"b"}
+    index.remove_car("a")
+    assert "a" not in index and index.search("קורולה") == set() and len(index) == 2
+
+
+def test_long_tokens_are_verified_against_full_tokens():
+    index = CarTextIndex()
+    word = "a" * MAX_PREFIX_LENGTH
+    index.index_car("long", {"model": word + "bc"})
+    index.index_car("other", {"model": word + "xy"})
+    assert index.search(word) == {"long", "other"}
+    assert index.search(word + "b") == {"long"}
+
+
+def test_to_tsquery():
+    assert to_tsquery("קורולה", "תל אביב") == "'קורולה':* & 'תל':*A & 'אביב':*A"
+    assert to_tsquery() is None
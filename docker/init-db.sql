@@ -46,3 +46,59 @@ CREATE TABLE IF NOT EXISTS bookings (
     special_requests TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- יומן חיפושים (נכתב בקבוצות מה-backend; אנליטיקת החיפושים ממשיכה ממנו לפי id)
+CREATE TABLE IF NOT EXISTS search_logs (
+    id SERIAL PRIMARY KEY,
+    query_params JSONB,
+    results_count INTEGER,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- אינדקסים לעימוד keyset של רשימות רכבים
+CREATE INDEX IF NOT EXISTS idx_cars_available_id ON cars(available, id);
+CREATE INDEX IF NOT EXISTS idx_cars_rate_id ON cars(daily_rate, id) WHERE available = true;
+
+-- אינדקס טקסט הפוך לחיפוש חופשי (הטוקנים מנורמלים בצד ה-Python)
+ALTER TABLE cars ADD COLUMN IF NOT EXISTS search_vector tsvector;
+CREATE INDEX IF NOT EXISTS idx_cars_search_vector ON cars USING GIN(search_vector);
+
+-- אינדקס מרווחי הזמנות לכל רכב - לבדיקת זמינות בטווח תאריכים
+CREATE INDEX IF NOT EXISTS idx_bookings_car_dates ON bookings(car_id, start_date, end_date);
+
+-- גרסת נתונים לכל תחום (ETag ל-Conditional GET) - מתעדכנת אוטומטית בטריגרים
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO data_versions (name, version) VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (name) DO UPDATE SET version = data_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cars_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cars
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('cars');
+CREATE TRIGGER bookings_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON bookings
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('cars');
+CREATE TRIGGER search_logs_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON search_logs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('searches');
+-- גרסת הצי (רק טבלת cars) - כל worker טוען מחדש את מוני הצי כשהיא משתנה
+CREATE TRIGGER cars_fleet_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cars
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('fleet');
+
+-- מילון מיקומים קנוני (השורות מסונכרנות מ-backend/core/locations.py בעליית השרת)
+CREATE TABLE IF NOT EXISTS locations (
+    id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    aliases TEXT[] NOT NULL DEFAULT '{}',
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION
+);
+
+-- מזהה מיקום קנוני לכל רכב - חיפוש לפי מיקום בשוויון במקום ILIKE
+ALTER TABLE cars ADD COLUMN IF NOT EXISTS location_id VARCHAR(50) REFERENCES locations(id);
+CREATE INDEX IF NOT EXISTS idx_cars_location_rate ON cars(location_id, daily_rate, id) WHERE available = true;
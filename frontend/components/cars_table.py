@@ -10,7 +10,9 @@
 """
 
 import os
+import sys
 import requests
+from collections import OrderedDict
 from typing import Dict, List, Optional
 
 from PySide6.QtWidgets import (
@@ -21,10 +23,22 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QTimer, QDate, Signal, QSize, QPropertyAnimation
 from PySide6.QtGui import QFont, QPixmap, QPainter
 
+# הוספת נתיב לחיפוש מודולים
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.live_updates import live_updates_client
+
 # ===== הגדרות API =====
 API_BASE_URL = "http://localhost:8000"
 API_CARS_URL = f"{API_BASE_URL}/api/cars"
 SERVER_FILTERING = True  # True = סינון בצד השרת דרך פרמטרים; False = סינון בצד הלקוח
+# השדות שכרטיס רכב ודיאלוג ההזמנה צריכים (fields= - תשובה קטנה יותר מהשרת)
+CARD_FIELDS = "make,model,car_type,daily_rate,available,seats,image_url"
+# כמה כרטיסים נטענים בכל בקשה בסינון שרת - העמוד הבא רק בלחיצה על "הצג עוד"
+PAGE_SIZE = 24
+# סוג רכב -> גודל בפאנל הפילטרים (small/medium/large)
+CAR_SIZES = {"small": "small", "medium": "medium", "large": "large",
+             "compact": "small", "family": "medium", "suv": "large", "luxury": "large"}
 
 # תמונת הרקע של ה-HERO (מהודעתך)
 HERO_IMAGE_URL = ("https://lh3.googleusercontent.com/aida-public/"
@@ -35,16 +49,63 @@ HERO_IMAGE_URL = ("https://lh3.googleusercontent.com/aida-public/"
 # עזרי רשת
 # ============================
 
+# מטמון Conditional GET: (url, פרמטרים) -> (ETag, JSON אחרון). כל צירוף פילטרים / cursor הוא מפתח,
+# ולכן המטמון חסום - הצירופים שלא נקראו הכי הרבה זמן מפונים
+ETAG_CACHE_SIZE = 64
+_etag_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
 def http_get_json(url: str, params: Optional[dict] = None, timeout: int = 8):
+    """GET עם If-None-Match - על 304 מוחזרת התשובה השמורה בלי להוריד אותה מחדש"""
+    params = params or {}
+    cache_key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+    cached = _etag_cache.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
     try:
-        r = requests.get(url, params=params or {}, timeout=timeout)
+        r = requests.get(url, params=params, headers=headers, timeout=timeout)
+        if r.status_code == 304 and cached:
+            if cache_key in _etag_cache:
+                _etag_cache.move_to_end(cache_key)
+            return cached[1]
         if r.status_code == 200:
-            return r.json()
+            data = r.json()
+            etag = r.headers.get("ETag")
+            if etag:
+                _etag_cache[cache_key] = (etag, data)
+                _etag_cache.move_to_end(cache_key)
+                while len(_etag_cache) > ETAG_CACHE_SIZE:
+                    _etag_cache.popitem(last=False)
+            else:
+                _etag_cache.pop(cache_key, None)
+            return data
     except Exception as e:
         print(f"GET {url} failed: {e}")
     return None
 
 
+def http_get_all_pages(url: str, params: Optional[dict] = None, timeout: int = 8, max_pages: int = 50,
+                       meta: Optional[dict] = None):
+    """טעינת endpoint מעומד (cursor) ואיחוד כל העמודים לרשימה אחת.
+       תומך גם בשרת ישן שמחזיר רשימה ישירות.
+       meta - מקבל את השדות הנוספים של העמוד הראשון (למשל facets)"""
+    params = dict(params or {})
+    cars: List[Dict] = []
+    for _ in range(max_pages):
+        data = http_get_json(url, params=params, timeout=timeout)
+        if isinstance(data, list):
+            return data
+        if not isinstance(data, dict):
+            return cars or data
+        if meta is not None and not cars:
+            meta.update({k: v for k, v in data.items() if k not in ("cars", "next_cursor", "count")})
+        cars.extend(data.get("cars", []))
+        next_cursor = data.get("next_cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+    return cars
+
+
 # ============================
 # דיאלוג הזמנה
 # ============================
@@ -419,6 +480,7 @@ class CarCardWidget(QFrame):
 
 class CarsCardsList(QWidget):
     car_booked = Signal(dict)
+    load_more_requested = Signal()
 
     def __init__(self):
         super().__init__()
@@ -431,11 +493,22 @@ class CarsCardsList(QWidget):
         self.cards_container.setSpacing(14)
         self.vbox.addLayout(self.cards_container)
 
+        self.more_btn = QPushButton("הצג עוד")
+        self.more_btn.setCursor(Qt.PointingHandCursor)
+        self.more_btn.setStyleSheet("padding:8px 14px; border-radius:10px; font-weight:600;")
+        self.more_btn.clicked.connect(self.load_more_requested.emit)
+        self.more_btn.hide()
+        self.vbox.addWidget(self.more_btn, 0, Qt.AlignCenter)
+
         self.total_label = QLabel("")
         self.total_label.setAlignment(Qt.AlignRight)
         self.total_label.setStyleSheet("background:#F1F5F9; border-radius:10px; padding:8px 12px; color:#0F172A; font-weight:600;")
         self.vbox.addWidget(self.total_label)
 
+    def set_has_more(self, has_more: bool):
+        """כפתור "הצג עוד" - רק כשלשרת יש עמוד נוסף"""
+        self.more_btn.setVisible(has_more)
+
     def set_cars(self, cars: List[Dict]):
         self.data = cars
         for i in reversed(range(self.cards_container.count())):
@@ -532,10 +605,40 @@ class FiltersPanel(QWidget):
 
         form.addLayout(btn_row)
 
+        # הערך של כל אפשרות נשמר כ-data, כי הטקסט מקבל את ספירת הפאסט מהשרת
+        for combo in (self.size_combo, self.supplier_combo, self.price_combo):
+            for i in range(combo.count()):
+                combo.setItemData(i, combo.itemText(i))
+
         self.size_combo.currentIndexChanged.connect(self.filters_changed.emit)
         self.supplier_combo.currentIndexChanged.connect(self.filters_changed.emit)
         self.price_combo.currentIndexChanged.connect(self.filters_changed.emit)
 
+    @staticmethod
+    def value(combo: QComboBox) -> str:
+        """הערך של האפשרות הנבחרת (בלי הספירה)"""
+        return combo.currentData() or combo.currentText()
+
+    def set_facets(self, facets: Optional[Dict]):
+        """ספירות הפאסטים מהשרת ליד כל אפשרות - אפשרות בלי רכבים מושבתת.
+           facets=None מחזיר את האפשרויות למצב הרגיל"""
+        sizes: Dict[str, int] = {}
+        for car_type, count in (facets or {}).get("car_type", {}).items():
+            size = CAR_SIZES.get(str(car_type).lower())
+            if size:
+                sizes[size.capitalize()] = sizes.get(size.capitalize(), 0) + count
+        self._annotate(self.size_combo, sizes if facets else None)
+        self._annotate(self.supplier_combo, facets.get("supplier") if facets else None)
+
+    def _annotate(self, combo: QComboBox, counts: Optional[Dict[str, int]]):
+        model = combo.model()
+        for i in range(1, combo.count()):  # 0 = "הכל"
+            base = combo.itemData(i)
+            # בלי ספירות (או ספק שהשרת לא מחזיר) - טקסט רגיל
+            count = counts.get(base, 0) if counts else None
+            combo.setItemText(i, base if count is None else f"{base} ({count})")
+            model.item(i).setEnabled(count is None or count > 0 or i == combo.currentIndex())
+
     def reset_filters(self):
         self.free_search.clear()
         self.size_combo.setCurrentIndex(0)
@@ -555,14 +658,28 @@ class CarsWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.all_cars_data: List[Dict] = []
+        self._last_shown_cars: List[Dict] = []
+        # העמוד הבא של החיפוש הנוכחי (סינון שרת): הפרמטרים וה-cursor שהשרת החזיר
+        self._page_params: Dict = {}
+        self._next_cursor: Optional[str] = None
         self.server_connected: bool = False
         self.setup_ui()
         self.load_all_from_api()   # טוען רשימה התחלתית מה-API
         self.apply_filters()       # מציג לפי מצב ראשוני
 
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.load_all_from_api)
-        self.refresh_timer.start(30000)
+        # עדכונים בזמן אמת מהשרת במקום רענון כל 30 שניות.
+        # כל שינוי מוחל על השורות המקומיות; רצף שינויים מרוכז לציור אחד.
+        # טעינה מלאה מהשרת רק כשהערוץ מודיע שפוספסו הודעות (resync)
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(300)
+        self.render_timer.timeout.connect(self.render_shown_cars)
+
+        live = live_updates_client()
+        live.car_changed.connect(self.on_live_car_change)
+        live.availability_changed.connect(self.on_live_availability_change)
+        live.resync_required.connect(self.reload_from_server)
+        live.connection_changed.connect(self.on_live_connection)
 
     # ---------- UI ----------
     def setup_ui(self):
@@ -595,6 +712,7 @@ class CarsWidget(QWidget):
         left = QVBoxLayout()
         self.cards_list = CarsCardsList()
         self.cards_list.car_booked.connect(self.on_car_booked)
+        self.cards_list.load_more_requested.connect(self.load_more)
         left.addWidget(self.cards_list, 0)
         left_wrap = QWidget(); left_wrap.setLayout(left)
         content.addWidget(left_wrap, 1)
@@ -613,9 +731,12 @@ class CarsWidget(QWidget):
 
     # ---------- API ----------
     def load_all_from_api(self):
-        """טעינת כל הרכבים מה-API (ללא סינון) כדי שנוכל לדעת את המצב הכללי.
-           אם לא קיים endpoint כזה – עדיין ננסה לעבוד בסינון שרת עם פרמטרים ב-apply_filters()."""
-        data = http_get_json(API_CARS_URL)
+        """טעינת כל הרכבים מה-API (ללא סינון) - רק לסינון בצד הלקוח.
+           בסינון שרת לא מורידים את כל הצי: apply_filters() טוען עמוד אחד, והרכבים שנטענו נשמרים
+           ב-all_cars_data (לעדכונים בזמן אמת)"""
+        if SERVER_FILTERING:
+            return
+        data = http_get_all_pages(API_CARS_URL)
         if isinstance(data, list):
             self.all_cars_data = data
             self.server_connected = True
@@ -627,6 +748,82 @@ class CarsWidget(QWidget):
         available = sum(1 for c in current if c.get("available", True))
         self.topbar.update_status(self.server_connected, available)
 
+    # ---------- עדכונים בזמן אמת ----------
+    def on_live_car_change(self, change: Dict):
+        """רכב נוסף / עודכן / נמחק - עדכון השורה ברשימה המלאה וברשימה המוצגת (לפי הפילטרים)"""
+        car_id = str(change.get("id"))
+        op = change.get("op")
+        data = change.get("data") or {}
+
+        car = self._find_car(self.all_cars_data, car_id)
+        if op == "deleted":
+            if car is not None:
+                self.all_cars_data.remove(car)
+        elif car is None:
+            car = {**data, "id": data.get("id", change.get("id"))}
+            self.all_cars_data.append(car)
+        else:
+            car.update(data)  # בעדכון data מכיל רק את השדות שהשתנו
+
+        shown = self._find_car(self._last_shown_cars, car_id)
+        if op == "deleted" or car is None:
+            if shown is not None:
+                self._last_shown_cars.remove(shown)
+        elif not self._client_side_filter([car]):
+            # השינוי הוציא את הרכב מהפילטרים הנוכחיים
+            if shown is not None:
+                self._last_shown_cars.remove(shown)
+        elif shown is None:
+            self._last_shown_cars.append(dict(car))
+        else:
+            shown.update(data)
+        self.render_timer.start()
+
+    def on_live_availability_change(self, change: Dict):
+        """הזמנה נוספה / בוטלה - רלוונטי רק אם היא חופפת לטווח התאריכים שנבחר"""
+        car_id = change.get("car_id")
+        start, end = change.get("start_date"), change.get("end_date")
+        if car_id is None or not start or not end:
+            return
+        selected_start = self.filters.start_date.date().toString("yyyy-MM-dd")
+        selected_end = self.filters.end_date.date().toString("yyyy-MM-dd")
+        # טווחים חצי-פתוחים [start, end) כמו ב-core.booking_calendar - יום ההחזרה פנוי לאיסוף
+        if str(start)[:10] >= selected_end or str(end)[:10] <= selected_start:
+            return
+
+        car_id = str(car_id)
+        shown = self._find_car(self._last_shown_cars, car_id)
+        if change.get("op") == "booked":
+            if shown is not None:
+                self._last_shown_cars.remove(shown)
+                self.render_timer.start()
+        elif shown is None:
+            # ההזמנה ששחררה את הטווח בוטלה - הרכב חוזר אם הוא עונה לפילטרים
+            car = self._find_car(self.all_cars_data, car_id)
+            if car is not None and self._client_side_filter([car]):
+                self._last_shown_cars.append(dict(car))
+                self.render_timer.start()
+
+    @staticmethod
+    def _find_car(cars: List[Dict], car_id: str) -> Optional[Dict]:
+        return next((c for c in cars if str(c.get("id")) == car_id), None)
+
+    def render_shown_cars(self):
+        """ציור הרשימה המוצגת אחרי שינויים מקומיים (בלי בקשה לשרת)"""
+        self.cards_list.set_cars(self._last_shown_cars)
+        available = sum(1 for c in self._last_shown_cars if c.get("available", True))
+        self.topbar.update_status(self.server_connected, available)
+
+    def reload_from_server(self):
+        """טעינה מלאה - אחרי resync"""
+        self.load_all_from_api()
+        self.apply_filters()
+
+    def on_live_connection(self, connected: bool):
+        self.server_connected = connected
+        current = getattr(self, "_last_shown_cars", [])
+        self.topbar.update_status(connected, sum(1 for c in current if c.get("available", True)))
+
     def _build_server_params_from_filters(self) -> dict:
         """ממפה את פילטרי ה-UI לפרמטרים לבקשת GET מהשרת.
            שמנו גם אלטרנטיבות שמות (size/car_type, price_min/max) כדי להגדיל סיכוי תאימות."""
@@ -637,18 +834,18 @@ class CarsWidget(QWidget):
 
         # גודל
         size_map = {"Small": "small", "Medium": "medium", "Large": "large"}
-        size_ui = self.filters.size_combo.currentText()
+        size_ui = self.filters.value(self.filters.size_combo)
         if size_ui in size_map:
             params["size"] = size_map[size_ui]
             params["car_type"] = size_map[size_ui]  # אלטרנטיבי
 
         # ספק
-        supplier = self.filters.supplier_combo.currentText()
+        supplier = self.filters.value(self.filters.supplier_combo)
         if supplier and supplier != "הכל":
             params["supplier"] = supplier
 
         # טווח מחיר
-        price = self.filters.price_combo.currentText()
+        price = self.filters.value(self.filters.price_combo)
         if price == "עד 200₪":
             params["price_max"] = 200
         elif price == "200-300₪":
@@ -664,6 +861,8 @@ class CarsWidget(QWidget):
         params["start_date"] = sd
         params["end_date"] = ed
 
+        params["fields"] = CARD_FIELDS
+        params["facets"] = "true"
         return params
 
     # ---------- סינון והצגה ----------
@@ -679,11 +878,22 @@ class CarsWidget(QWidget):
            אחרת – מסננים את self.all_cars_data בצד הלקוח."""
         cars: List[Dict] = []
 
+        self._next_cursor = None
         if SERVER_FILTERING:
-            params = self._build_server_params_from_filters()
-            data = http_get_json(API_CARS_URL, params=params)
-            if isinstance(data, list):
+            # רק העמוד הראשון - שאר העמודים ב"הצג עוד" (load_more)
+            self._page_params = self._build_server_params_from_filters()
+            data = http_get_json(API_CARS_URL, params=dict(self._page_params, limit=PAGE_SIZE))
+            if isinstance(data, dict):
+                cars = data.get("cars", [])
+                self._next_cursor = data.get("next_cursor")
+                self._remember_cars(cars)
+                self.server_connected = True
+                # כמה רכבים יחזרו לכל אפשרות בפילטרים - בלי בקשה נוספת
+                self.filters.set_facets(data.get("facets"))
+            elif isinstance(data, list):
+                # שרת ישן שמחזיר רשימה ישירות
                 cars = data
+                self._remember_cars(cars)
                 self.server_connected = True
             else:
                 # אם שרת לא מחזיר רשימה — ננסה נפילה חיננית לסינון לקוח
@@ -694,10 +904,37 @@ class CarsWidget(QWidget):
 
         # הצגה
         self.cards_list.set_cars(cars)
+        self.cards_list.set_has_more(bool(self._next_cursor))
         self._last_shown_cars = cars  # לשימושי טופ-בר
         available = sum(1 for c in cars if c.get("available", True))
         self.topbar.update_status(self.server_connected, available)
 
+    def load_more(self):
+        """העמוד הבא של החיפוש הנוכחי - נוסף לרשימה המוצגת"""
+        if not self._next_cursor:
+            return
+        params = dict(self._page_params, limit=PAGE_SIZE, cursor=self._next_cursor)
+        params.pop("facets", None)
+        data = http_get_json(API_CARS_URL, params=params)
+        if not isinstance(data, dict):
+            return
+        cars = data.get("cars", [])
+        self._next_cursor = data.get("next_cursor")
+        self._remember_cars(cars)
+        self._last_shown_cars.extend(cars)
+        self.cards_list.set_has_more(bool(self._next_cursor))
+        self.render_shown_cars()
+
+    def _remember_cars(self, cars: List[Dict]):
+        """הרכבים שנטענו מצטרפים ל-all_cars_data - עדכון בזמן אמת מוצא אותם בלי טעינת כל הצי"""
+        known = {str(c.get("id")): c for c in self.all_cars_data}
+        for car in cars:
+            existing = known.get(str(car.get("id")))
+            if existing is None:
+                self.all_cars_data.append(dict(car))
+            else:
+                existing.update(car)
+
     def _client_side_filter(self, cars_in: List[Dict]) -> List[Dict]:
         cars = list(cars_in)
 
@@ -705,17 +942,15 @@ class CarsWidget(QWidget):
         if q:
             cars = [c for c in cars if any(q in str(c.get(k, "")).lower() for k in ("make","model","car_type","supplier","location"))]
 
-        size = self.filters.size_combo.currentText()
+        size = self.filters.value(self.filters.size_combo)
         if size != "הכל":
-            norm = {"Small":"small","Medium":"medium","Large":"large",
-                    "compact":"small","family":"medium","suv":"large","luxury":"large"}
-            cars = [c for c in cars if norm.get(str(c.get("car_type","")).lower(), str(c.get("car_type","")).lower()) == norm[size]]
+            cars = [c for c in cars if CAR_SIZES.get(str(c.get("car_type","")).lower(), str(c.get("car_type","")).lower()) == size.lower()]
 
-        supplier = self.filters.supplier_combo.currentText()
+        supplier = self.filters.value(self.filters.supplier_combo)
         if supplier != "הכל":
             cars = [c for c in cars if c.get("supplier") == supplier]
 
-        price = self.filters.price_combo.currentText()
+        price = self.filters.value(self.filters.price_combo)
         if price != "כל מחיר":
             out = []
             for c in cars:
@@ -21,6 +21,7 @@ from PySide6.QtWidgets import (
 
 # אימות (נלקח מהפרויקט שלך)
 from ui.login_dialog import session_manager
+from components.live_updates import live_updates_client
 
 API_BASE_URL = "http://localhost:8000"
 
@@ -278,9 +279,8 @@ class RAGStatusWidget(QWidget):
         self.setLayoutDirection(Qt.RightToLeft)
         self.setup_ui()
         self.check_status()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_status)
-        self.timer.start(30000)
+        # הסטטוס נבדק בשרת ונדחף רק כשהוא משתנה - בלי טיימר בכל לקוח
+        live_updates_client().status_changed.connect(self.show_status)
 
     def setup_ui(self):
         h = QHBoxLayout(self)
@@ -294,12 +294,14 @@ class RAGStatusWidget(QWidget):
     def check_status(self):
         try:
             r = requests.get(f"{API_BASE_URL}/api/ai/health", timeout=6)
-            ok = r.status_code == 200 and (r.json() or {}).get("status") == "available"
-            self.dot.setStyleSheet(f"background:{OK_GREEN if ok else DANGER}; border-radius:5px;")
-            self.label.setText(f"שרת AI: {'מחובר' if ok else 'מנותק'}")
+            self.show_status((r.json() or {}) if r.status_code == 200 else {})
         except Exception:
-            self.dot.setStyleSheet(f"background:{DANGER}; border-radius:5px;")
-            self.label.setText("שרת AI: מנותק")
+            self.show_status({})
+
+    def show_status(self, status: Dict):
+        ok = status.get("status") == "available"
+        self.dot.setStyleSheet(f"background:{OK_GREEN if ok else DANGER}; border-radius:5px;")
+        self.label.setText(f"שרת AI: {'מחובר' if ok else 'מנותק'}")
 
 # ---------- WIDGET ראשי של יועץ AI ----------
 class AIChatWidget(QTabWidget):
@@ -0,0 +1,143 @@
+"""
+לקוח ערוץ העדכונים בזמן אמת של השרת (Server-Sent Events, /api/events/stream)
+חיבור אחד לכל האפליקציה במקום טיימר polling בכל רכיב: thread ברקע קורא את הזרם
+ומפיץ signals (רכב, זמינות, סטטיסטיקות, סטטוס AI). אחרי ניתוק מתחבר מחדש עם Last-Event-ID
+"""
+
+import json
+import time
+from typing import Optional
+
+import requests
+from PySide6.QtCore import QThread, Signal
+
+API_BASE_URL = "http://localhost:8000"
+STREAM_URL = f"{API_BASE_URL}/api/events/stream"
+
+# השרת שולח keepalive כל 15 שניות - זמן קריאה ארוך יותר מזה מסמן חיבור מת
+READ_TIMEOUT = 45
+MAX_RECONNECT_DELAY = 30
+
+
+class LiveUpdatesClient(QThread):
+    car_changed = Signal(dict)            # {"op": added/updated/deleted, "id", "data"}
+    availability_changed = Signal(dict)   # {"op": booked/released, "car_id", "start_date", "end_date"}
+    stats_changed = Signal(dict)          # {"data": [{"type", "count"}], "total_cars"}
+    status_changed = Signal(dict)         # תשובת /api/ai/health
+    resync_required = Signal()            # פוספסו הודעות - לטעון הכול מחדש
+    connection_changed = Signal(bool)
+
+    def __init__(self, url: str = STREAM_URL, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.last_event_id: Optional[str] = None
+        self.connected = False
+        self._stopping = False
+        self._response = None
+
+    def run(self):
+        delay = 1
+        while not self._stopping:
+            headers = {"Accept": "text/event-stream"}
+            if self.last_event_id:
+                headers["Last-Event-ID"] = self.last_event_id
+            try:
+                with requests.get(self.url, stream=True, headers=headers, timeout=(5, READ_TIMEOUT)) as r:
+                    r.raise_for_status()
+                    r.encoding = "utf-8"
+                    self._response = r
+                    self._set_connected(True)
+                    delay = 1
+                    self._read(r)
+            except Exception as e:
+                if not self._stopping:
+                    print(f"ערוץ העדכונים נותק: {e}")
+            self._response = None
+            self._set_connected(False)
+
+            # המתנה לפני חיבור מחדש (גדלה עד MAX_RECONNECT_DELAY), בצעדים קטנים כדי לעצור מהר
+            deadline = time.monotonic() + delay
+            while not self._stopping and time.monotonic() < deadline:
+                time.sleep(0.2)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def stop(self):
+        """עצירת ה-thread וסגירת החיבור"""
+        self._stopping = True
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+        self.wait(2000)
+
+    # ---------- פענוח הזרם ----------
+
+    def _read(self, response):
+        event_type, data, event_id = "message", [], None
+        for line in response.iter_lines(decode_unicode=True):
+            if self._stopping:
+                return
+            if line is None:
+                continue
+            if line == "":
+                # סוף הודעה
+                if data:
+                    self._emit(event_type, "\n".join(data))
+                if event_id is not None:
+                    self.last_event_id = event_id
+                event_type, data, event_id = "message", [], None
+                continue
+            if line.startswith(":"):
+                continue  # keepalive
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event_type = value
+            elif field == "data":
+                data.append(value)
+            elif field == "id":
+                event_id = value
+
+    def _emit(self, event_type: str, raw: str):
+        if event_type == "resync":
+            self.resync_required.emit()
+            return
+        signal = {
+            "car": self.car_changed,
+            "availability": self.availability_changed,
+            "stats": self.stats_changed,
+            "status": self.status_changed,
+        }.get(event_type)
+        if signal is None:
+            return
+        try:
+            signal.emit(json.loads(raw))
+        except ValueError as e:
+            print(f"הודעה לא תקינה בערוץ העדכונים: {e}")
+
+    def _set_connected(self, connected: bool):
+        if connected != self.connected:
+            self.connected = connected
+            self.connection_changed.emit(connected)
+
+
+_client: Optional[LiveUpdatesClient] = None
+
+
+def live_updates_client() -> LiveUpdatesClient:
+    """החיבור המשותף לכל הרכיבים (נפתח בקריאה הראשונה)"""
+    global _client
+    if _client is None:
+        _client = LiveUpdatesClient()
+        _client.start()
+    return _client
+
+
+def stop_live_updates():
+    """סגירת החיבור המשותף ביציאה מהאפליקציה (אם נפתח)"""
+    global _client
+    if _client is not None:
+        _client.stop()
+        _client = None
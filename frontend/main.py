@@ -27,6 +27,9 @@ from PySide6.QtGui import QFont, QPalette, QColor, QPixmap, QPainter
 # הוספת imports למערכת אוטנטיקציה
 from ui.login_dialog import LoginDialog, session_manager
 
+# ערוץ העדכונים בזמן אמת מהשרת (במקום טיימרי polling)
+from components.live_updates import live_updates_client, stop_live_updates
+
 # הוספת import לרכיב הרכבים החדש
 try:
     from components.cars_table import CarsWidget
@@ -147,25 +150,45 @@ class CarRentalStyles:
 class CarRentalAPI:
     """ממשק לתקשורת עם שרת ה-FastAPI"""
     
+    MAX_PAGES = 50
+    
     @staticmethod
     def get_all_cars():
-        """קבלת כל הרכבים"""
+        """קבלת כל הרכבים (מעבר על כל העמודים)"""
+        cars = []
+        params = {}
         try:
-            response = requests.get(f"{API_BASE_URL}/api/cars")
-            return response.json() if response.status_code == 200 else []
+            for _ in range(CarRentalAPI.MAX_PAGES):
+                response = requests.get(f"{API_BASE_URL}/api/cars", params=params)
+                if response.status_code != 200:
+                    break
+                page = response.json()
+                cars.extend(page.get("cars", []))
+                if not page.get("next_cursor"):
+                    break
+                params["cursor"] = page["next_cursor"]
         except Exception as e:
             print(f"שגיאה בקבלת רכבים: {e}")
-            return []
+        return cars
     
     @staticmethod
     def search_cars(query_data):
-        """חיפוש רכבים"""
+        """חיפוש רכבים (מעבר על כל העמודים)"""
+        cars = []
+        body = dict(query_data)
         try:
-            response = requests.post(f"{API_BASE_URL}/api/cars/search", json=query_data)
-            return response.json() if response.status_code == 200 else []
+            for _ in range(CarRentalAPI.MAX_PAGES):
+                response = requests.post(f"{API_BASE_URL}/api/cars/search", json=body)
+                if response.status_code != 200:
+                    break
+                page = response.json()
+                cars.extend(page.get("cars", []))
+                if not page.get("next_cursor"):
+                    break
+                body["cursor"] = page["next_cursor"]
         except Exception as e:
             print(f"שגיאה בחיפוש: {e}")
-            return []
+        return cars
     
     @staticmethod
     def get_car_stats():
@@ -249,10 +272,10 @@ class SimpleChartsWidget(QTabWidget):
         self.setup_ui()
         
         if CHARTS_AVAILABLE:
-            # Timer לרענון נתונים - רק אם הגרפים זמינים
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.safe_refresh_all_charts)
-            self.timer.start(60000)  # רענון כל דקה
+            # מוני הצי נדחפים מהשרת בכל שינוי (core.live_updates) - בלי רענון כל דקה
+            live = live_updates_client()
+            live.stats_changed.connect(self.on_stats_pushed)
+            live.resync_required.connect(self.safe_refresh_all_charts)
     
     def setup_ui(self):
         if not CHARTS_AVAILABLE:
@@ -365,13 +388,21 @@ class SimpleChartsWidget(QTabWidget):
         widget.setLayout(layout)
         return widget
     
-    def safe_refresh_pie_chart(self):
-        """רענון בטוח של גרף העוגה"""
+    def on_stats_pushed(self, data):
+        """מוני הצי מערוץ העדכונים - הגרפים מתעדכנים מהנתונים שנדחפו, בלי בקשה נוספת"""
+        if not CHARTS_AVAILABLE or not self.charts_created:
+            return
+        self.safe_refresh_pie_chart(data)
+        self.safe_refresh_bar_chart(data)
+        self.safe_refresh_stats()
+    
+    def safe_refresh_pie_chart(self, data=None):
+        """רענון בטוח של גרף העוגה (data - מוני הצי אם כבר התקבלו)"""
         if not CHARTS_AVAILABLE or not self.charts_created:
             return
             
         try:
-            data = CarRentalAPI.get_car_stats()
+            data = data or CarRentalAPI.get_car_stats()
             
             if hasattr(self, 'pie_series') and self.pie_series:
                 self.pie_series.clear()
@@ -394,13 +425,13 @@ class SimpleChartsWidget(QTabWidget):
         except Exception as e:
             print(f"שגיאה ברענון גרף העוגה: {e}")
     
-    def safe_refresh_bar_chart(self):
-        """רענון בטוח של גרף העמודות"""
+    def safe_refresh_bar_chart(self, data=None):
+        """רענון בטוח של גרף העמודות (data - מוני הצי אם כבר התקבלו)"""
         if not CHARTS_AVAILABLE or not self.charts_created:
             return
             
         try:
-            data = CarRentalAPI.get_car_stats()
+            data = data or CarRentalAPI.get_car_stats()
             data_items = data.get("data", [])
             
             if not data_items:
@@ -552,6 +583,8 @@ class MainWindow(QMainWindow):
 def main():
     """הפעלת האפליקציה עם מערכת אוטנטיקציה"""
     app = QApplication(sys.argv)
+    # ה-thread של ערוץ העדכונים נסגר לפני היציאה (אחרת QThread נהרס כשהוא עוד רץ)
+    app.aboutToQuit.connect(stop_live_updates)
     
     # עיצוב כללי
     app.setStyleSheet(CarRentalStyles.get_main_style())